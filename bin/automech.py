@@ -12,7 +12,11 @@ from lib.amech_io import parser
 from lib.amech_io import printer
 from lib.reaction import direction as rxndirn
 from lib.filesys.build import prefix_fs
+from lib.filesys import spcdb
+from routines.pf.thermo import basis as thmbasis
+from routines.pf import runner as pfrunner
 from lib.submission import print_host_name
+from lib.submission import run_graph
 
 
 # Set runtime options based on user input
@@ -80,6 +84,14 @@ print('{}'.format(RUN_INP_DCT['run_prefix']))
 prefix_fs(RUN_INP_DCT['save_prefix'])
 print('{}'.format(RUN_INP_DCT['save_prefix']))
 
+# Use the index databases of the save filesystem, if requested
+if RUN_INP_DCT['index_db']:
+    print('\nUsing index databases of the save filesystem energies')
+    spcdb.activate()
+
+# Keep the basis species found by the thermochem reference schemes
+thmbasis.set_ref_cache_path(RUN_INP_DCT['save_prefix'])
+
 # Print messages describing drivers and tasks running
 print('\nDrivers and tasks user has requested to be run...')
 RUN_ES = bool('es' in RUN_JOBS_LST)
@@ -109,152 +121,292 @@ if RUN_TRANS:
 
 printer.program_exit('inp')
 
+# Build the graph of driver tasks: one task for each driver on each PES
+# (or on the species list), depending on the tasks whose data it needs
+# and run after the tasks of the same driver on the same species
+if RUN_OBJ_DCT['pes']:
+    RUN_LST_DCT = RUN_PES_DCT
+else:
+    RUN_LST_DCT = {None: RUN_SPC_LST_DCT}
+RUN_SPC_DCT = {
+    key: set(spc for spc, _ in parser.species.build_spc_queue(run_lst))
+    for key, run_lst in RUN_LST_DCT.items()}
+MECH_SPC_QUEUE, MECH_SPC_USE_DCT = parser.species.build_mech_spc_queue(
+    RUN_LST_DCT)
+
+# Determine the basis species of the heats of formation of all species of
+# the mechanism at once, rather than in each thermo task, and add the
+# reference species not in the mechanism to the species dct, with the
+# models and PESs of the species using them, to run the spc tasks for them
+REF_PLAN_DCT = None
+MECH_REF_USE_DCT = {}
+if RUN_NASA:
+    REF_PLAN_DCT = thermodriver.plan_refs(
+        SPC_DCT, SPC_MODEL_DCT,
+        parser.species.split_queue(
+            [(SPC, MODEL) for SPC in MECH_SPC_QUEUE
+             for MODEL in MECH_SPC_USE_DCT[SPC]['models']]),
+        nprocs=RUN_INP_DCT['nprocs'])
+    for BASIS_DCT, UNIREF_DCT in REF_PLAN_DCT.values():
+        REF_NAME_DCT = {
+            SPEC['inchi']: REF for REF, SPEC in UNIREF_DCT.items()
+            if 'inchi' in SPEC}
+        for SPC, (SPC_BASIS, _) in BASIS_DCT.items():
+            for REF in (REF_NAME_DCT[ICH] for ICH in SPC_BASIS
+                        if ICH in REF_NAME_DCT):
+                SPC_DCT[REF] = UNIREF_DCT[REF]
+                REF_USE_DCT = MECH_REF_USE_DCT.setdefault(
+                    REF, {'models': [], 'pes_keys': []})
+                for KEY in ('models', 'pes_keys'):
+                    REF_USE_DCT[KEY].extend(
+                        VAL for VAL in MECH_SPC_USE_DCT[SPC][KEY]
+                        if VAL not in REF_USE_DCT[KEY])
+
+TSK_NODE_DCT, TSK_DEP_DCT, TSK_ORD_DCT, TSK_SPC_DCT = {}, {}, {}, {}
+
+
+def _run_driver(drv, key, drv_fxn, *args, **kwargs):
+    """ Run a driver for a PES, a species or the species list with its
+        messages
+    """
+    printer.program_header('es' if drv == 'ts' else drv)
+    if key in RUN_PES_DCT:
+        formula, pes_idx, sub_pes_idx = key
+        print('\nRunning {} for PES {}: {}, SUB PES {}'.format(
+            drv, pes_idx, formula, sub_pes_idx))
+        for rxn in RUN_PES_DCT[key]:
+            print('  Channel {}: {} = {}'.format(
+                rxn['chn_idx'],
+                '+'.join(rxn['reacs']),
+                '+'.join(rxn['prods'])))
+    elif key in MECH_SPC_USE_DCT:
+        print('\nRunning {} for species: {}'.format(drv, key))
+        if RUN_OBJ_DCT['pes']:
+            print('  on PESs {}'.format(', '.join(
+                str(pes_key[1])
+                for pes_key in MECH_SPC_USE_DCT[key]['pes_keys'])))
+    else:
+        for spc in RUN_SPC_DCT.get(key, (key,)):
+            print('\nRunning {} for species: {}'.format(drv, spc))
+    drv_fxn(*args, **kwargs)
+    printer.program_exit('es' if drv == 'ts' else drv)
+
+
+def _add_task(drv, key, spcs, drv_fxn, args, kwargs, dep_drvs,
+              grp=None, deps=(), order_drvs=()):
+    """ Add a driver task to the graph. The task depends on the earlier
+        tasks of the dep_drvs drivers that share species with it (or that
+        are for the same PES), whose data it needs, and is skipped if any
+        of them fails. It is only run after the earlier tasks of the
+        order_drvs drivers that share species with it, so that the same
+        driver is never run on the same species at the same time, but
+        whether they fail or not. The ES tasks are also named by the
+        group of ES tasks they run, and can be given extra dependencies
+    """
+    name = (drv, key) if grp is None else (drv, key, grp)
+    TSK_DEP_DCT[name] = [
+        tsk for tsk, tsk_spcs in TSK_SPC_DCT.items()
+        if tsk[0] in dep_drvs and (tsk[1] == key or spcs & tsk_spcs)]
+    TSK_DEP_DCT[name].extend(
+        tsk for tsk in deps if tsk not in TSK_DEP_DCT[name])
+    TSK_ORD_DCT[name] = [
+        tsk for tsk, tsk_spcs in TSK_SPC_DCT.items()
+        if tsk[0] in order_drvs and (tsk[1] == key or spcs & tsk_spcs)]
+    TSK_NODE_DCT[name] = (
+        _run_driver, (drv, key, drv_fxn) + tuple(args), kwargs)
+    # The TSs of a PES are only needed by the other tasks for that PES
+    TSK_SPC_DCT[name] = spcs if drv != 'ts' else set()
+
+
 # ESDriver
 if RUN_ES:
 
-    printer.program_header('es')
-
     # Build the elec struct tsk lst
     ES_TSK_LST = parser.run.build_run_es_tsks_lst(
         ES_TSK_STR, SPC_MODEL_DCT, THY_DCT)
 
-    # Call ESDriver for spc in each PES or SPC
-    if RUN_OBJ_DCT['pes']:
-        for (formula, pes_idx, sub_pes_idx), rxn_lst in RUN_PES_DCT.items():
-
-            # Print PES form and SUB PES Channels
-            print('\nRunning PES {}: {}, SUB PES {}'.format(
-                pes_idx, formula, sub_pes_idx))
-            for rxn in rxn_lst:
-                print('  Running Channel {}: {} = {}'.format(
-                    rxn['chn_idx'],
-                    '+'.join(rxn['reacs']),
-                    '+'.join(rxn['prods'])))
-
-            esdriver.run(
-                pes_idx,
-                rxn_lst,
-                SPC_DCT,
-                CLA_DCT,
-                ES_TSK_LST,
-                THY_DCT,
-                RUN_INP_DCT
-            )
-    else:
-        PES_IDX = 0
-        esdriver.run(
-            PES_IDX,
-            RUN_SPC_LST_DCT,
-            SPC_DCT,
-            CLA_DCT,
-            ES_TSK_LST,
-            THY_DCT,
-            RUN_INP_DCT
-        )
-
-    printer.program_exit('es')
-
+    # Split the tasks into groups of consecutive spc tasks and of
+    # consecutive ts and vdw tasks, which are run in the order given
+    ES_GRP_LST = []
+    for TSK_IDX, (OBJ, _, _) in enumerate(ES_TSK_LST):
+        DRV = 'es' if OBJ == 'spc' else 'ts'
+        if ES_GRP_LST and ES_GRP_LST[-1][0] == DRV:
+            ES_GRP_LST[-1][1].append(TSK_IDX)
+        else:
+            ES_GRP_LST.append((DRV, [TSK_IDX]))
+
+    for GRP, (DRV, TSK_IDXS) in enumerate(ES_GRP_LST):
+        if DRV == 'es':
+            # Run the spc tasks once for each species of the whole
+            # mechanism, however many PESs and models it has, after the
+            # ts tasks of the previous group on those PESs, and for each
+            # of the reference species of their heats of formation
+            for SPC in MECH_SPC_QUEUE + list(MECH_REF_USE_DCT):
+                if SPC in MECH_SPC_USE_DCT:
+                    SPC_USE_DCT = MECH_SPC_USE_DCT[SPC]
+                    DEPS = [('ts', PES_KEY, GRP-1)
+                            for PES_KEY in SPC_USE_DCT['pes_keys']
+                            if GRP > 0]
+                else:
+                    SPC_USE_DCT, DEPS = MECH_REF_USE_DCT[SPC], []
+                _add_task(
+                    'es', SPC, {SPC}, esdriver.run,
+                    (0,
+                     {'all': {'species': [
+                         (SPC, MODEL) for MODEL in SPC_USE_DCT['models']]}},
+                     SPC_DCT,
+                     CLA_DCT,
+                     ES_TSK_LST,
+                     THY_DCT,
+                     RUN_INP_DCT),
+                    {'tsk_idxs': tuple(TSK_IDXS)},
+                    ('es',), grp=GRP, deps=DEPS)
+        else:
+            # Run the ts and vdw tasks for each PES, after the spc tasks
+            # of its reactants and products
+            for PES_KEY, RUN_LST in RUN_LST_DCT.items():
+                PES_IDX = PES_KEY[1] if PES_KEY is not None else 0
+                _add_task(
+                    'ts', PES_KEY, RUN_SPC_DCT[PES_KEY], esdriver.run,
+                    (PES_IDX,
+                     RUN_LST,
+                     SPC_DCT,
+                     CLA_DCT,
+                     ES_TSK_LST,
+                     THY_DCT,
+                     RUN_INP_DCT),
+                    {'tsk_idxs': tuple(TSK_IDXS)},
+                    ('es', 'ts'), grp=GRP)
 
 # ThermoDriver
 if WRITE_MESSPF or RUN_MESSPF or RUN_NASA:
 
-    printer.program_header('thermo')
-
-    # Call ThermoDriver for spc in PES
-    if RUN_OBJ_DCT['pes']:
-        for _, rxn_lst in RUN_PES_DCT.items():
-            thermodriver.run(
-                SPC_DCT,
-                PES_MODEL_DCT, SPC_MODEL_DCT,
-                THY_DCT,
-                rxn_lst,
-                RUN_INP_DCT,
-                write_messpf=WRITE_MESSPF,
-                run_messpf=RUN_MESSPF,
-                run_nasa=RUN_NASA,
-            )
-    else:
-        for spc in RUN_SPC_LST_DCT:
-            print('\nCalculating Thermochem for species: {}'.format(spc))
-        thermodriver.run(
-            SPC_DCT,
-            PES_MODEL_DCT, SPC_MODEL_DCT,
-            THY_DCT,
-            RUN_SPC_LST_DCT,
-            RUN_INP_DCT,
-            write_messpf=WRITE_MESSPF,
-            run_messpf=RUN_MESSPF,
-            run_nasa=RUN_NASA,
-        )
-
-    printer.program_exit('thermo')
-
+    # Call ThermoDriver for spc in PES, after the spc tasks of the
+    # reference species its species use
+    for PES_KEY, RUN_LST in RUN_LST_DCT.items():
+        _add_task(
+            'thermo', PES_KEY, RUN_SPC_DCT[PES_KEY], thermodriver.run,
+            (SPC_DCT,
+             PES_MODEL_DCT, SPC_MODEL_DCT,
+             THY_DCT,
+             RUN_LST,
+             RUN_INP_DCT),
+            {'write_messpf': WRITE_MESSPF,
+             'run_messpf': RUN_MESSPF,
+             'run_nasa': RUN_NASA,
+             'ref_plan_dct': REF_PLAN_DCT},
+            ('es',), order_drvs=('thermo',),
+            deps=[TSK for TSK in TSK_NODE_DCT
+                  if TSK[0] == 'es' and TSK[1] in MECH_REF_USE_DCT and
+                  PES_KEY in MECH_REF_USE_DCT[TSK[1]]['pes_keys']])
 
 # TransportDriver
 if RUN_TRANS:
 
-    printer.program_header('trans')
-    
     # Build the elec struct tsk lst
     TRANS_TSK_LST = parser.run.build_run_trans_tsks_lst(
         TRANS_TSK_STR, THY_DCT)
 
-    # Call ThermoDriver for spc in PES
-    if RUN_OBJ_DCT['pes']:
-        for _, rxn_lst in RUN_PES_DCT.items():
-            transdriver.run(
-                SPC_DCT,
-                THY_DCT,
-                rxn_lst,
-                TRANS_TSK_LST,
-                RUN_INP_DCT
-            )
-    else:
-        for spc in RUN_SPC_LST_DCT:
-            print('\nCalculating Transport for species: {}'.format(spc))
-        transdriver.run(
-            SPC_DCT,
-            THY_DCT,
-            RUN_SPC_LST_DCT,
-            TRANS_TSK_LST,
-            RUN_INP_DCT
-        )
-
-# kTPDriver
+    # Call TransportDriver for spc in PES
+    for PES_KEY, RUN_LST in RUN_LST_DCT.items():
+        _add_task(
+            'trans', PES_KEY, RUN_SPC_DCT[PES_KEY], transdriver.run,
+            (SPC_DCT,
+             THY_DCT,
+             RUN_LST,
+             TRANS_TSK_LST,
+             RUN_INP_DCT),
+            {},
+            ('es',), order_drvs=('trans',))
+
+# kTPDriver: write the MESS inputs of all the SUB PESs as tasks of the graph
+KTP_ARGS_DCT = {}
 if WRITE_MESSRATE or RUN_MESSRATE or RUN_FITS:
 
-    printer.program_header('ktp')
-
-    # Call kTPDriver for each SUB PES
     if RUN_OBJ_DCT['pes']:
-        for (formula, pes_idx, sub_pes_idx), rxn_lst in RUN_PES_DCT.items():
-
-            # Print PES form and SUB PES Channels
-            print('\nCalculating Rates for PES {}: {}, SUB PES {}'.format(
-                pes_idx, formula, sub_pes_idx))
-            for chn_idx, rxn in enumerate(rxn_lst):
-                print('  Including Channel {}: {} = {}'.format(
-                    rxn['chn_idx'],
-                    '+'.join(rxn['reacs']),
-                    '+'.join(rxn['prods'])))
-
-            ktpdriver.run(
-                formula, pes_idx, sub_pes_idx,
+        for PES_KEY, RUN_LST in RUN_PES_DCT.items():
+            KTP_ARGS_DCT[PES_KEY] = PES_KEY + (
                 SPC_DCT,
                 CLA_DCT,
                 THY_DCT,
-                rxn_lst,
+                RUN_LST,
                 PES_MODEL_DCT, SPC_MODEL_DCT,
-                RUN_INP_DCT,
-                write_messrate=WRITE_MESSRATE,
-                run_messrate=RUN_MESSRATE,
-                run_fits=RUN_FITS
-            )
+                RUN_INP_DCT)
+            if WRITE_MESSRATE:
+                _add_task(
+                    'ktp', PES_KEY, RUN_SPC_DCT[PES_KEY], ktpdriver.run,
+                    KTP_ARGS_DCT[PES_KEY],
+                    {'write_messrate': True,
+                     'run_messrate': False,
+                     'run_fits': False},
+                    ('es', 'ts'), order_drvs=('ktp',))
     else:
         print("Can't run kTPDriver without a PES being specified")
 
+# Run the tasks, as many at once as requested by njobs
+TSK_STATUS_DCT = run_graph(
+    TSK_NODE_DCT, TSK_DEP_DCT, nprocs=RUN_INP_DCT['njobs'],
+    order_dct=TSK_ORD_DCT)
+
+# kTPDriver: run MESS for all the SUB PESs with written inputs at once,
+# then fit the rates of the SUB PESs where MESS ran successfully
+KTP_FAIL_LST = [
+    PES_KEY for PES_KEY in KTP_ARGS_DCT
+    if any(STATUS is not True for TSK, STATUS in TSK_STATUS_DCT.items()
+           if (TSK[0] in ('ktp', 'ts') and TSK[1] == PES_KEY) or
+           (TSK[0] == 'es' and TSK[1] in RUN_SPC_DCT[PES_KEY]))]
+KTP_ARGS_DCT = {
+    PES_KEY: ARGS for PES_KEY, ARGS in KTP_ARGS_DCT.items()
+    if PES_KEY not in KTP_FAIL_LST}
+if RUN_MESSRATE and KTP_ARGS_DCT:
+    printer.program_header('ktp')
+    print('\nRunning MESS for {} SUB PESs, {} at a time...'.format(
+        len(KTP_ARGS_DCT), RUN_INP_DCT['nprocs']))
+    for PES_KEY, SUCCESS in zip(KTP_ARGS_DCT, pfrunner.run_rates_lst(
+            [pfrunner.messrate_path(
+                RUN_INP_DCT['run_prefix'], PES_KEY[0], PES_KEY[2])
+             for PES_KEY in KTP_ARGS_DCT],
+            nprocs=RUN_INP_DCT['nprocs'])):
+        if not SUCCESS:
+            KTP_FAIL_LST.append(PES_KEY)
     printer.program_exit('ktp')
+if RUN_FITS:
+    FIT_NODE_DCT = {}
+    for PES_KEY, ARGS in KTP_ARGS_DCT.items():
+        if PES_KEY not in KTP_FAIL_LST:
+            FIT_NODE_DCT[('ktp', PES_KEY)] = (
+                _run_driver, ('ktp', PES_KEY, ktpdriver.run) + ARGS,
+                {'write_messrate': False,
+                 'run_messrate': False,
+                 'run_fits': True})
+    FIT_STATUS_DCT = run_graph(
+        FIT_NODE_DCT, {}, nprocs=RUN_INP_DCT['njobs'])
+    KTP_FAIL_LST.extend(
+        PES_KEY for (_, PES_KEY), SUCCESS in FIT_STATUS_DCT.items()
+        if not SUCCESS)
+if KTP_FAIL_LST:
+    print('\nkTPDriver failed for the SUB PESs:')
+    for FORMULA, PES_IDX, SUB_PES_IDX in KTP_FAIL_LST:
+        print('  PES {}: {}, SUB PES {}'.format(
+            PES_IDX, FORMULA, SUB_PES_IDX))
+
+# Report the driver tasks that failed (False) or were skipped (None)
+TSK_FAIL_LST = [
+    (TSK, STATUS) for TSK, STATUS in TSK_STATUS_DCT.items()
+    if STATUS is not True]
+if RUN_FITS:
+    TSK_FAIL_LST.extend(
+        (TSK, STATUS) for TSK, STATUS in FIT_STATUS_DCT.items()
+        if STATUS is not True)
+if TSK_FAIL_LST:
+    print('\nDriver tasks that did not finish successfully:')
+    for TSK, STATUS in TSK_FAIL_LST:
+        print('  {} for {}: {}'.format(
+            TSK[0], TSK[1] if TSK[1] is not None else 'species list',
+            'failed' if STATUS is False else 'skipped'))
 
 # Exit Program
 print('\n\n')
 printer.program_exit('amech')
+if TSK_FAIL_LST or KTP_FAIL_LST:
+    sys.exit(1)
@@ -11,7 +11,8 @@ def run(pes_idx,
         cla_dct,
         es_tsk_lst,
         thy_dct,
-        run_inp_dct):
+        run_inp_dct,
+        tsk_idxs=None):
     """ Central driver for all electronic structure tasks.
 
         :param pes_idx: index for the PES where the channel/spc belong to
@@ -28,6 +29,9 @@ def run(pes_idx,
         :type thy_dct: dict[]
         :param run_inp_dct: information from input section of run.dat
         :type run_inp_dct: dict[]
+        :param tsk_idxs: indices of the tasks of es_tsk_lst to run (all
+            of them by default)
+        :type tsk_idxs: tuple(int)
     """
 
     # Pull stuff from dcts for now
@@ -42,10 +46,12 @@ def run(pes_idx,
 
     # Loop over Tasks
     print('\nRunning electronic structure tasks given in the input...')
-    for tsk_lst in es_tsk_lst:
+    for tsk_idx, tsk_lst in enumerate(es_tsk_lst):
 
         # Unpack the options
         [obj, tsk, es_keyword_dct] = tsk_lst
+        if tsk_idxs is not None and tsk_idx not in tsk_idxs:
+            continue
 
         # Build the queue of species based on user request
         if obj == 'spc':
@@ -64,8 +70,13 @@ def run(pes_idx,
         elif obj == 'vdw':
             spc_queue = []
 
-        # Run the electronic structure task for all spc in queue
+        # Run the electronic structure task for all spc in queue, once
+        # for each spc even if it is in several reactions
+        run_spcs = []
         for spc_name, _ in spc_queue:
+            if spc_name in run_spcs:
+                continue
+            run_spcs.append(spc_name)
             run_tsk(tsk, spc_dct, spc_name,
                     thy_dct, es_keyword_dct,
                     run_prefix, save_prefix)
@@ -137,5 +137,7 @@ def run(pes_formula, pes_idx, sub_pes_idx,
             pes_formula, label_dct,
             es_info, pf_model,
             mess_path, fit_method, pdep_fit,
-            arrfit_thresh)
+            arrfit_thresh, nprocs=run_inp_dct['nprocs'],
+            conn_pairs=ktproutines.label.make_pes_conn_pairs(
+                rxn_lst, label_dct))
         writer.ckin.write_rxn_file(ckin_str_dct, pes_formula, ckin_path)
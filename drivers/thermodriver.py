@@ -4,6 +4,7 @@
 """
 
 import os
+import sys
 from routines.pf import thermo as thmroutines
 from routines.pf import runner as pfrunner
 from routines.pf.models import ene
@@ -21,8 +22,13 @@ def run(spc_dct,
         run_inp_dct,
         write_messpf=True,
         run_messpf=True,
-        run_nasa=True):
+        run_nasa=True,
+        ref_plan_dct=None):
     """ main driver for thermo run
+
+        The basis species of the heats of formation can be given as
+        ref_plan_dct, as returned by plan_refs, if they were determined
+        beforehand.
     """
 
     # Pull stuff from dcts for now
@@ -57,6 +63,9 @@ def run(spc_dct,
             pf_models[mod]['ref_enes'] = (
                 spc_model_dct[mod]['options']['ref_enes']
                 if 'ref_enes' in spc_model_dct[mod]['options'] else 'none')
+    # Species for which the thermochemistry failed
+    failed_spc_lst = []
+
     # Write and Run MESSPF inputs to generate the partition functions
     if write_messpf:
 
@@ -95,10 +104,35 @@ def run(spc_dct,
                '--------------------------------------'))
         print('\nRunning MESSPF calculations for all species')
 
+        # Run the MESSPF files of all species and models at once,
+        # running each file only once if a species is in the queue twice
+        messpf_paths = []
+        for idx, (_, (_, spc_models, _, _)) in enumerate(spc_queue):
+            for spc_model in spc_models:
+                if thm_paths[idx][spc_model][0] not in messpf_paths:
+                    messpf_paths.append(thm_paths[idx][spc_model][0])
+        run_flags = pfrunner.run_pfs(
+            messpf_paths, nprocs=run_inp_dct['nprocs'])
+
+        # Skip the species with a MESSPF run that failed
+        failed_paths = [path for path, success in zip(messpf_paths, run_flags)
+                        if not success]
+        ok_idxs = []
+        for idx, (spc_name, (_, spc_models, _, _)) in enumerate(spc_queue):
+            if any(thm_paths[idx][spc_model][0] in failed_paths
+                   for spc_model in spc_models):
+                print('*ERROR: MESSPF failed for {}. Skipping it...'
+                      .format(spc_name))
+                failed_spc_lst.append(spc_name)
+            else:
+                ok_idxs.append(idx)
+        spc_queue = [spc_queue[idx] for idx in ok_idxs]
+        thm_paths = [thm_paths[idx] for idx in ok_idxs]
+
+        # Combine the partition functions of the models of each species
         for idx, (spc_name, (pes_model, spc_models, coeffs, operators)) in enumerate(spc_queue):
             print('\n{}'.format(spc_name))
             for midx, spc_model in enumerate(spc_models):
-                pfrunner.run_pf(thm_paths[idx][spc_model][0])
                 temps, logq, dq_dt, d2q_dt2 = pfrunner.mess.read_messpf(
                     thm_paths[idx][spc_model][0])
                 if midx == 0:
@@ -132,6 +166,13 @@ def run(spc_dct,
 
         chn_basis_ene_dct = {}
 
+        # Determine the basis species of all species at once, unless
+        # they were determined for the whole mechanism
+        if ref_plan_dct is None:
+            ref_plan_dct = plan_refs(
+                spc_dct, spc_model_dct, spc_queue,
+                nprocs=run_inp_dct['nprocs'])
+
         for idx, (spc_name, (pes_model, spc_models, _, _)) in enumerate(spc_queue):
             print('\n{}'.format(spc_name))
             spc_model = spc_models[0]
@@ -141,9 +182,8 @@ def run(spc_dct,
             ref_scheme = spc_model_dct[spc_model]['options']['ref_scheme']
             ref_enes = spc_model_dct[spc_model]['options']['ref_enes']
 
-            # Determine info about the basis species used in thermochem calcs
-            basis_dct, uniref_dct = thmroutines.basis.prepare_refs(
-                ref_scheme, spc_dct, [[spc_name, None]])
+            # Get info about the basis species used in thermochem calcs
+            basis_dct, uniref_dct = ref_plan_dct[ref_scheme]
 
             # Get the basis info for the spc of interest
             spc_basis, coeff_basis = basis_dct[spc_name]
@@ -179,28 +219,81 @@ def run(spc_dct,
                 ene_spc, ene_basis, spc_basis, coeff_basis, ref_set=ref_enes)
             spc_dct[spc_name]['Hfs'] = [hf0k]
 
-        # Write the NASA polynomials in CHEMKIN format
-        ckin_nasa_str = ''
-        ckin_path = os.path.join(starting_path, 'ckin')
-        for idx, (spc_name, (pes_model, spc_models, _, _)) in enumerate(spc_queue):
-
+        # Read the temperatures from the pf.dat files, check if viable
+        temps_lst = []
+        for idx, (spc_name, _) in enumerate(spc_queue):
             print("\n\nStarting NASA polynomials calculation for ", spc_name)
-
-            # Read the temperatures from the pf.dat file, check if viable
             temps = pfrunner.read_messpf_temps(thm_paths[idx]['final'][0])
             thmroutines.nasapoly.print_nasa_temps(temps)
+            temps_lst.append(temps)
+
+        # Fit the NASA polynomials of all species at once
+        poly_strs, failed_names = thmroutines.nasapoly.build_polynomials(
+            [spc_name for spc_name, _ in spc_queue], spc_dct, temps_lst,
+            [thm_paths[idx]['final'][0] for idx in range(len(spc_queue))],
+            [thm_paths[idx]['final'][1] for idx in range(len(spc_queue))],
+            nprocs=run_inp_dct['nprocs'])
+        failed_spc_lst.extend(failed_names)
+
+        # Write the NASA polynomials in CHEMKIN format, in queue order
+        ckin_nasa_str = ''
+        ckin_path = os.path.join(starting_path, 'ckin')
+        for (spc_name, (_, spc_models, _, _)), poly_str in zip(spc_queue, poly_strs):
+
+            if poly_str is None:
+                continue
 
             # Write the NASA polynomial in CHEMKIN-format string
             ref_scheme = spc_model_dct[spc_model]['options']['ref_scheme']
             for spc_model in spc_models:
                 ckin_nasa_str += writer.ckin.model_header(
                     pf_levels[spc_model], pf_models[spc_model], refscheme=ref_scheme)
-
-            # Build POLY
-            ckin_nasa_str += thmroutines.nasapoly.build_polynomial(
-                spc_name, spc_dct, temps,
-                thm_paths[idx]['final'][0], thm_paths[idx]['final'][1], starting_path)
+            ckin_nasa_str += poly_str
             ckin_nasa_str += '\n\n'
 
         # Write all of the NASA polynomial strings
         writer.ckin.write_nasa_file(ckin_nasa_str, ckin_path)
+
+    # Report the species that failed, so the run does not look successful
+    if failed_spc_lst:
+        print('\n*ERROR: Thermochemistry failed for the species:')
+        for spc_name in failed_spc_lst:
+            print(' - {}'.format(spc_name))
+        sys.exit(1)
+
+
+def plan_refs(spc_dct, spc_model_dct, spc_queue, nprocs=1):
+    """ Determine the basis species of all of the species of a queue at
+        once for each reference scheme used in it
+
+        Each reference species not in the species dct is given the same
+        name for all of the schemes, so that the reference species of all
+        schemes can be added to the species dct together.
+
+        :return: the basis of each species and the reference species not
+            in spc_dct, for each scheme
+        :rtype: dict[ref_scheme: (basis_dct, uniref_dct)]
+    """
+
+    ref_spc_dct = {}
+    for spc_name, (_, spc_models, _, _) in spc_queue:
+        ref_scheme = spc_model_dct[spc_models[0]]['options']['ref_scheme']
+        ref_spc_dct.setdefault(ref_scheme, [])
+        if [spc_name, None] not in ref_spc_dct[ref_scheme]:
+            ref_spc_dct[ref_scheme].append([spc_name, None])
+
+    ref_plan_dct = {}
+    ref_name_dct = {}
+    for ref_scheme, ref_spc_queue in ref_spc_dct.items():
+        basis_dct, uniref_dct = thmroutines.basis.prepare_refs(
+            ref_scheme, spc_dct, ref_spc_queue,
+            parallel=nprocs > 1, nprocs=nprocs)
+        named_uniref_dct = {}
+        for ref_name, spec in uniref_dct.items():
+            if 'inchi' in spec:
+                ref_name = ref_name_dct.setdefault(
+                    spec['inchi'], 'REF_{}'.format(len(ref_name_dct)+1))
+            named_uniref_dct[ref_name] = spec
+        ref_plan_dct[ref_scheme] = (basis_dct, named_uniref_dct)
+
+    return ref_plan_dct
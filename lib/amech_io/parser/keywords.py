@@ -12,12 +12,16 @@ RUN_INP_SUPPORTED_KEYWORDS = [
     'spc',
     'run_prefix',
     'save_prefix',
-    'print_mech'
+    'print_mech',
+    'index_db',
+    'njobs',
+    'nprocs'
 ]
 RUN_INP_KEY_DCT = {
     'mech': ['chemkin'],
     'spc': ['csv'],
-    'print_mech': [True, False]
+    'print_mech': [True, False],
+    'index_db': [True, False]
 }
 RUN_SUPPORTED_KEYWORDS = [
     'es',
@@ -90,9 +94,9 @@ ES_TSK_KEYWORDS_SUPPORTED_DCT = {
     'init_geom': ['runlvl', 'inplvl', 'retryfail', 'overwrite'],
     'find_ts': ['runlvl', 'inplvl', 'rxndirn',
                 'var_splvl1', 'var_splvl2', 'var_scnlvl',
-                'nobarrier', 'retryfail', 'overwrite'],
+                'nobarrier', 'njobs', 'retryfail', 'overwrite'],
     'find_sadpt': ['runlvl', 'inplvl', 'rxndirn',
-                   'nobarrier', 'retryfail', 'overwrite'],
+                   'nobarrier', 'njobs', 'retryfail', 'overwrite'],
     'find_molrad_vtst': ['runlvl', 'inplvl', 'rxndirn',
                          'var_splvl1', 'var_splvl2', 'var_scnlvl',
                          'nobarrier', 'retryfail', 'overwrite'],
@@ -103,15 +107,17 @@ ES_TSK_KEYWORDS_SUPPORTED_DCT = {
     'find_vrctst': ['runlvl', 'inplvl', 'rxndirn',
                     'var_splvl1', 'var_splvl2', 'var_scnlvl',
                     'nobarrier', 'retryfail', 'overwrite'],
-    'conf_samp': ['runlvl', 'inplvl', 'cnf_range', 'retryfail', 'overwrite'],
-    'conf_energy': ['runlvl', 'inplvl', 'cnf_range', 'retryfail', 'overwrite'],
+    'conf_samp': ['runlvl', 'inplvl', 'cnf_range', 'njobs',
+                  'retryfail', 'overwrite'],
+    'conf_energy': ['runlvl', 'inplvl', 'cnf_range', 'njobs',
+                    'retryfail', 'overwrite'],
     'conf_grad': ['runlvl', 'inplvl', 'cnf_range', 'retryfail', 'overwrite'],
     'conf_hess': ['runlvl', 'inplvl', 'cnf_range', 'retryfail', 'overwrite'],
     'conf_vpt2': ['runlvl', 'inplvl', 'cnf_range', 'retryfail', 'overwrite'],
     'conf_prop': ['runlvl', 'inplvl', 'cnf_range', 'retryfail', 'overwrite'],
     'conf_opt': ['runlvl', 'inplvl', 'cnf_range', 'retryfail', 'overwrite'],
-    'hr_scan': ['runlvl', 'inplvl', 'tors_model', 'resamp_min',
-                'retryfail', 'overwrite'],
+    'hr_scan': ['runlvl', 'inplvl', 'tors_model', 'resamp_min', 'njobs',
+                'hr_adapt', 'retryfail', 'overwrite'],
     'hr_grad': ['runlvl', 'inplvl', 'tors_model',
                 'retryfail', 'overwrite'],
     'hr_hess': ['runlvl', 'inplvl', 'tors_model',
@@ -122,7 +128,8 @@ ES_TSK_KEYWORDS_SUPPORTED_DCT = {
                 'retryfail', 'overwrite'],
     'hr_reopt': ['runlvl', 'inplvl', 'tors_model',
                  'retryfail', 'overwrite', 'hrthresh'],
-    'tau_samp': ['runlvl', 'inplvl', 'retryfail', 'overwrite'],
+    'tau_samp': ['runlvl', 'inplvl', 'njobs', 'tau_conv',
+                 'retryfail', 'overwrite'],
     'tau_energy': ['runlvl', 'inplvl', 'retryfail', 'overwrite'],
     'tau_grad': ['runlvl', 'inplvl', 'retryfail', 'overwrite'],
     'tau_hess': ['runlvl', 'inplvl', 'hessmax', 'retryfail', 'overwrite'],
@@ -142,7 +149,8 @@ ES_TSK_KEYWORDS_VAL_SUPPORTED_DCT = {
     'retryfail': [True, False],
     'overwrite': [True, False],
     'rxndirn': ['forw', 'back', 'exo'],
-    'resamp_min': [True, False]
+    'resamp_min': [True, False],
+    'hr_adapt': [True, False]
 }
 ES_TSK_KEYWORDS_DEFAULT_DCT = {
     'runlvl': None,
@@ -157,6 +165,9 @@ ES_TSK_KEYWORDS_DEFAULT_DCT = {
     'overwrite': False,
     'rxndirn': 'forw',
     'hessmax': 1000,
+    'njobs': 1,
+    'hr_adapt': False,
+    'tau_conv': None,
     'hrthresh': -0.5,
     'pot_thresh': 0.3
 }
@@ -31,6 +31,12 @@ def build_run_inp_dct(job_path):
         keyword_dct['spc'] = 'csv'
     if 'print_mech' not in keyword_dct:
         keyword_dct['print_mech'] = False
+    if 'index_db' not in keyword_dct:
+        keyword_dct['index_db'] = False
+    if 'njobs' not in keyword_dct:
+        keyword_dct['njobs'] = 1
+    if 'nprocs' not in keyword_dct:
+        keyword_dct['nprocs'] = 1
 
     # Check if section specified fully and supported
     check_run_keyword_dct(keyword_dct)
@@ -76,6 +82,10 @@ def check_run_keyword_dct(dct):
     if dct['spc'] not in RUN_INP_KEY_DCT['spc']:
         print('*ERROR: Unallowed value for spc keyword')
         sys.exit()
+    for key in ('njobs', 'nprocs'):
+        if not isinstance(dct[key], int) or dct[key] < 1:
+            print('*ERROR: {} keyword must be a positive integer'.format(key))
+            sys.exit()
 
 
 # PARSE THE OBJ SECTION OF THE FILE #
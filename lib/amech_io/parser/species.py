@@ -126,6 +126,30 @@ def build_spc_queue(rxn_lst):
     return spc_queue
 
 
+def build_mech_spc_queue(run_pes_dct):
+    """ Build the queue of the unique species over all of the PESs
+        of a mechanism, and the models and PESs that use each species
+        :return spc_queue: each species of the mechanism, once
+        :rtype: list[species]
+        :return spc_use_dct: the models each species has on the PESs
+            and the keys of the PESs it is on
+        :rtype: dict[species: dict['models': list, 'pes_keys': list]]
+    """
+
+    spc_queue, spc_use_dct = [], {}
+    for pes_key, rxn_lst in run_pes_dct.items():
+        for spc_name, model in build_spc_queue(rxn_lst):
+            if spc_name not in spc_use_dct:
+                spc_queue.append(spc_name)
+                spc_use_dct[spc_name] = {'models': [], 'pes_keys': []}
+            if model not in spc_use_dct[spc_name]['models']:
+                spc_use_dct[spc_name]['models'].append(model)
+            if pes_key not in spc_use_dct[spc_name]['pes_keys']:
+                spc_use_dct[spc_name]['pes_keys'].append(pes_key)
+
+    return spc_queue, spc_use_dct
+
+
 def read_spc_amech(job_path):
     """ Read an amech style input file for the species
     """
@@ -207,13 +207,23 @@ def check_es_tsks_supported(es_tsks, thy_dct):
                         #         print('*ERROR: mr theory level only avail',
                         #               'for molpro')
                         #         sys.exit()
-                elif key == 'hessmax':
+                elif key in ('hessmax', 'njobs'):
                     if not isinstance(val, int):
                         print('{} must be set to an integer'.format(key))
                 elif key == 'pot_thresh':
                     print(key, val, type(val))
                     if not isinstance(val, float):
                         print('{} must be set to an float'.format(key))
+                elif key == 'tau_conv':
+                    try:
+                        tau_conv = float(val)
+                    except ValueError:
+                        tau_conv = None
+                    if tau_conv is None or tau_conv <= 0.0:
+                        print('*ERROR: {} must be set to a'.format(key),
+                              'positive number (percent error)')
+                        sys.exit()
+                    keyword_dct[key] = tau_conv
                 elif key == 'cnf_range':
                     if 'n' in val or 'e' in val:
                         val2 = val[1:]
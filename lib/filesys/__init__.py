@@ -3,18 +3,26 @@ Moldriver libs
 """
 
 from lib.filesys import build
+from lib.filesys import cache
+from lib.filesys import cnfidx
 from lib.filesys import inf
 from lib.filesys import mincnf
 from lib.filesys import models
+from lib.filesys import spcdb
 from lib.filesys._save import save_struct
 from lib.filesys._save import _read as read_zma_geo
+from lib.filesys._lock import locked
 
 
 __all__ = [
     'build',
+    'cache',
+    'cnfidx',
     'inf',
     'mincnf',
     'models',
+    'spcdb',
     'save_struct',
-    'read_zma_geo'
+    'read_zma_geo',
+    'locked'
 ]
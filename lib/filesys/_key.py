@@ -0,0 +1,18 @@
+"""
+  Keys of the structures and levels of theory in the index files kept in
+  the layers of the save filesystem (spcdb and cnfidx)
+"""
+
+import json
+
+
+def locs_key(locs):
+    """ Key for the locators of a structure
+    """
+    return json.dumps(locs, sort_keys=True)
+
+
+def thy_key(mod_thy_info):
+    """ Key for a level of theory
+    """
+    return '_'.join(mod_thy_info[1:4])
@@ -0,0 +1,25 @@
+"""
+ lock directories of the filesystem while updating shared files
+"""
+
+import os
+import fcntl
+import contextlib
+
+
+LOCK_NAME = '.amech.lock'
+
+
+@contextlib.contextmanager
+def locked(path):
+    """ Hold an exclusive lock on a directory of the filesystem so that
+        read-modify-write updates of its files (e.g. sample counters)
+        from concurrent processes are not lost
+    """
+    os.makedirs(path, exist_ok=True)
+    with open(os.path.join(path, LOCK_NAME), 'w') as lock_obj:
+        fcntl.flock(lock_obj, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_obj, fcntl.LOCK_UN)
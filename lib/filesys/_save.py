@@ -6,6 +6,8 @@ import automol
 import elstruct
 import autofile
 from routines.es import runner as es_runner
+from lib.filesys import cache
+from lib.filesys import spcdb
 
 
 def save_struct(run_fs, save_fs, locs, job, mod_thy_info,
@@ -33,8 +35,8 @@ def save_struct(run_fs, save_fs, locs, job, mod_thy_info,
         save_fs[-1].create(locs)
         save_fs[-1].file.geometry_info.write(inf_obj, locs)
         save_fs[-1].file.geometry_input.write(inp_str, locs)
-        save_fs[-1].file.geometry.write(geo, locs)
-        save_fs[-1].file.energy.write(ene, locs)
+        cache.write(save_fs[-1].file.geometry, geo, locs)
+        cache.write(save_fs[-1].file.energy, ene, locs)
 
         # Save zma information seperately, if required
         if not in_zma_fs:
@@ -42,9 +44,9 @@ def save_struct(run_fs, save_fs, locs, job, mod_thy_info,
             zma_save_fs[-1].create(zma_locs)
             zma_save_fs[-1].file.geometry_info.write(inf_obj, zma_locs)
             zma_save_fs[-1].file.geometry_input.write(inp_str, zma_locs)
-            zma_save_fs[-1].file.zmatrix.write(zma, zma_locs)
+            cache.write(zma_save_fs[-1].file.zmatrix, zma, zma_locs)
         else:
-            save_fs[-1].file.zmatrix.write(zma, locs)
+            cache.write(save_fs[-1].file.zmatrix, zma, locs)
 
         # Saving the energy to an SP filesys
         print(" - Saving energy...")
@@ -52,7 +54,8 @@ def save_struct(run_fs, save_fs, locs, job, mod_thy_info,
         sp_save_fs[-1].create(mod_thy_info[1:4])
         sp_save_fs[-1].file.input.write(inp_str, mod_thy_info[1:4])
         sp_save_fs[-1].file.info.write(inf_obj, mod_thy_info[1:4])
-        sp_save_fs[-1].file.energy.write(ene, mod_thy_info[1:4])
+        cache.write(sp_save_fs[-1].file.energy, ene, mod_thy_info[1:4])
+        spcdb.record(save_fs, locs, mod_thy_info, ene)
 
         saved = True
 
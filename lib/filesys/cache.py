@@ -0,0 +1,97 @@
+"""
+  Process-wide read-through cache for files of the filesystem
+
+  Reads are keyed on the path of the file and its modification time and
+  size: a file is read from disk the first time it is asked for, and
+  again only once it has changed, so that files written by other
+  programs or another AutoMech run are seen. A hit costs a stat of the
+  file instead of opening, reading and parsing it. Files written with
+  cache.write are stored as written. Since the modification times of
+  some (e.g., networked) filesystems are coarse, the cache is also
+  emptied in both the child and the parent at each fork, as forked
+  workers (e.g., those of lib.submission) may save files.
+  Use as, e.g., cache.read(sp_fs[-1].file.energy, mod_thy_info[1:4]).
+"""
+
+import os
+import copy
+import collections
+
+
+MAX_SIZE = 50000
+_CACHE = collections.OrderedDict()
+
+
+def read(data_file, locs=()):
+    """ Read a file of the filesystem (energy, geometry, zmatrix, hessian,
+        info object, ...) through the cache
+    """
+
+    path = data_file.path(locs)
+    stamp = file_stamp(path)
+    if stamp is not None and _CACHE.get(path, (None,))[0] == stamp:
+        _CACHE.move_to_end(path)
+        obj = _CACHE[path][1]
+    else:
+        obj = data_file.read(locs)
+        if stamp is not None:
+            _add(path, stamp, obj)
+
+    return _copy(obj)
+
+
+def write(data_file, obj, locs=()):
+    """ Write a file of the filesystem and store what was written in the
+        cache
+    """
+    data_file.write(obj, locs)
+    path = data_file.path(locs)
+    _add(path, file_stamp(path), _copy(obj))
+
+
+def invalidate(path=None):
+    """ Drop the cached contents of a file, or of all of the files in a
+        directory, or of all files if no path is given
+    """
+    if path is None:
+        _CACHE.clear()
+    else:
+        _CACHE.pop(path, None)
+        dir_path = os.path.join(path, '')
+        for file_path in [file_path for file_path in _CACHE
+                          if file_path.startswith(dir_path)]:
+            _CACHE.pop(file_path)
+
+
+# Workers forked by this process may save files
+os.register_at_fork(after_in_child=invalidate, after_in_parent=invalidate)
+
+
+def file_stamp(path):
+    """ Modification time and size of a file; None if it does not exist
+    """
+    try:
+        stat = os.stat(path)
+        stamp = (stat.st_mtime_ns, stat.st_size)
+    except FileNotFoundError:
+        stamp = None
+    return stamp
+
+
+def _add(path, stamp, obj):
+    """ Add an object, read from a file with the given stamp, to the
+        cache, evicting the least recently used
+    """
+    _CACHE[path] = (stamp, obj)
+    _CACHE.move_to_end(path)
+    while len(_CACHE) > MAX_SIZE:
+        _CACHE.popitem(last=False)
+
+
+def _copy(obj):
+    """ Copy mutable objects (e.g. info objects) so callers can not
+        change the cached version
+    """
+    if isinstance(obj, (float, int, str, bool, tuple, type(None))):
+        return obj
+    return copy.deepcopy(obj)
@@ -0,0 +1,201 @@
+"""
+  Persistent index of the conformers in a save filesystem, used to find
+  the saved conformers a new structure could be the same as without
+  re-reading and comparing against every saved conformer
+
+  The index of a level of theory holds the energy, geometry, Coulomb
+  spectrum and a distance fingerprint of each conformer, sorted by
+  energy. The candidates for a new structure are the conformers in an
+  energy window, found by bisection, whose fingerprint hashes to the
+  same or a neighbouring bucket as that of the structure.
+
+  The index is trusted as long as the conformer layer has not changed:
+  it is only synced with the save filesystem (by listing the conformers
+  and reading those missing from it) once the modification time of the
+  layer directory shows that conformers were added or removed by a
+  process not using it. Conformers rewritten in place are not seen;
+  removing the index file rebuilds it.
+"""
+
+import os
+import json
+import bisect
+import numpy
+import automol
+import autofile
+from lib.filesys._lock import locked
+from lib.filesys import _key
+from lib.filesys import cache
+
+
+INDEX_NAME = 'cnf_index.json'
+# Width of the fingerprint buckets (bohr): the largest distance change
+# allowed for two geometries to have the same distance matrix
+FP_WIDTH = 3e-1
+
+
+def read(cnf_save_fs, mod_thy_info):
+    """ Read the index of the conformers saved at a level of theory,
+        syncing it with the save filesystem if the conformer layer has
+        changed since it was written. Conformers no longer in the
+        filesystem (or with no geometry or energy) are dropped.
+
+        :returns: (index, locs of conformers newly added to the index)
+        :rtype: (dict, list)
+    """
+
+    thy_key = _key.thy_key(mod_thy_info)
+    lvl_dct = _read_file(cnf_save_fs).get(thy_key, {})
+    ent_dct = lvl_dct.get('ents', {})
+    stamp = _layer_stamp(cnf_save_fs)
+
+    # Sync the entries with the conformers in the save filesystem
+    new_locs = []
+    synced = False
+    if stamp is None or lvl_dct.get('stamp') != stamp:
+        saved_ent_dct = {}
+        for locs in cnf_save_fs[-1].existing():
+            key = _key.locs_key(locs)
+            if key in ent_dct:
+                saved_ent_dct[key] = ent_dct[key]
+                continue
+            cnf_path = cnf_save_fs[-1].path(locs)
+            sp_save_fs = autofile.fs.single_point(cnf_path)
+            if (cnf_save_fs[-1].file.geometry.exists(locs) and
+                    sp_save_fs[-1].file.energy.exists(mod_thy_info[1:4])):
+                geo = cache.read(cnf_save_fs[-1].file.geometry, locs)
+                ene = cache.read(
+                    sp_save_fs[-1].file.energy, mod_thy_info[1:4])
+                saved_ent_dct[key] = _entry(locs, geo, ene)
+                new_locs.append(list(locs))
+        synced = stamp is not None
+        ent_dct = saved_ent_dct
+
+    # Build the index sorted by energy
+    ents = sorted(ent_dct.values(), key=lambda ent: ent['ene'])
+    cnf_idx = {
+        'locs': [ent['locs'] for ent in ents],
+        'enes': [ent['ene'] for ent in ents],
+        'geos': [automol.geom.from_data(ent['symbs'], ent['xyzs'])
+                 for ent in ents],
+        'specs': [tuple(ent['spec']) for ent in ents],
+        'fps': [ent['fp'] for ent in ents]
+    }
+
+    if synced:
+        write(cnf_save_fs, mod_thy_info, cnf_idx)
+
+    return cnf_idx, new_locs
+
+
+def write(cnf_save_fs, mod_thy_info, cnf_idx):
+    """ Write the index of the conformers at a level of theory, leaving
+        the index for other levels unchanged
+
+        The index is taken to hold all of the conformers of the layer as
+        it is now, e.g., once the conformers saved by this process have
+        been added to it.
+    """
+
+    idx_path = os.path.join(cnf_save_fs[0].path(), INDEX_NAME)
+    ent_dct = {}
+    for locs, ene, geo, spec, fpt in zip(
+            cnf_idx['locs'], cnf_idx['enes'], cnf_idx['geos'],
+            cnf_idx['specs'], cnf_idx['fps']):
+        ent_dct[_key.locs_key(locs)] = _entry(
+            locs, geo, ene, spec=spec, fpt=fpt)
+
+    with locked(cnf_save_fs[0].path()):
+        idx_dct = _read_file(cnf_save_fs)
+        # Create the file before stamping the layer, which it is in
+        if not os.path.exists(idx_path):
+            with open(idx_path, 'w') as idx_obj:
+                json.dump({}, idx_obj)
+        idx_dct[_key.thy_key(mod_thy_info)] = {
+            'stamp': _layer_stamp(cnf_save_fs),
+            'ents': ent_dct
+        }
+        with open(idx_path, 'w') as idx_obj:
+            json.dump(idx_dct, idx_obj)
+
+
+def add(cnf_idx, locs, geo, ene):
+    """ Add a newly saved conformer to the index, keeping it sorted by
+        energy
+    """
+    pos = bisect.bisect(cnf_idx['enes'], ene)
+    cnf_idx['locs'].insert(pos, list(locs))
+    cnf_idx['enes'].insert(pos, ene)
+    cnf_idx['geos'].insert(pos, geo)
+    cnf_idx['specs'].insert(pos, automol.geom.coulomb_spectrum(geo))
+    cnf_idx['fps'].insert(pos, fingerprint(geo))
+
+
+def window(cnf_idx, ene, etol, geo=None):
+    """ Get the positions in the index of the conformers with an energy
+        within etol of ene and, if a geometry is given, whose fingerprint
+        is in the same or a neighbouring bucket as that of the geometry
+    """
+    lo_pos = bisect.bisect_left(cnf_idx['enes'], ene - etol)
+    hi_pos = bisect.bisect_right(cnf_idx['enes'], ene + etol)
+    poss = range(lo_pos, hi_pos)
+    if geo is not None:
+        fpt = fingerprint(geo)
+        poss = [pos for pos in poss if abs(cnf_idx['fps'][pos] - fpt) <= 1]
+    return list(poss)
+
+
+def fingerprint(geo):
+    """ Distance fingerprint of a geometry: the bucket of its largest
+        interatomic distance. Geometries whose distance matrices differ
+        by no more than FP_WIDTH (whatever the order of their atoms) are
+        in the same or neighbouring buckets.
+    """
+    xyzs = numpy.array(automol.geom.coordinates(geo), dtype=float)
+    max_dist = 0.0
+    if len(xyzs) > 1:
+        max_dist = numpy.max(numpy.linalg.norm(
+            xyzs[:, numpy.newaxis, :] - xyzs[numpy.newaxis, :, :], axis=-1))
+    return int(numpy.floor(max_dist / FP_WIDTH))
+
+
+def _read_file(cnf_save_fs):
+    """ Read the index file, for all levels of theory; indices written in
+        an older format are dropped, so that they are rebuilt
+    """
+    idx_path = os.path.join(cnf_save_fs[0].path(), INDEX_NAME)
+    idx_dct = {}
+    if os.path.exists(idx_path):
+        try:
+            with open(idx_path, 'r') as idx_obj:
+                idx_dct = json.load(idx_obj)
+        except ValueError:
+            print(' - Conformer index at {} is corrupt. Rebuilding...'
+                  .format(idx_path))
+    return {thy_key: lvl_dct for thy_key, lvl_dct in idx_dct.items()
+            if isinstance(lvl_dct, dict) and 'ents' in lvl_dct}
+
+
+def _layer_stamp(cnf_save_fs):
+    """ Modification time and size of the conformer layer directory; None
+        if it does not exist
+    """
+    stamp = cache.file_stamp(cnf_save_fs[0].path())
+    return list(stamp) if stamp is not None else None
+
+
+def _entry(locs, geo, ene, spec=None, fpt=None):
+    """ Build the index entry for a conformer
+    """
+    if spec is None:
+        spec = automol.geom.coulomb_spectrum(geo)
+    if fpt is None:
+        fpt = fingerprint(geo)
+    return {
+        'locs': list(locs),
+        'ene': ene,
+        'symbs': list(automol.geom.symbols(geo)),
+        'xyzs': [list(xyz) for xyz in automol.geom.coordinates(geo)],
+        'spec': [float(val) for val in spec],
+        'fp': fpt
+    }
@@ -6,6 +6,8 @@ import sys
 import automol
 import autofile
 from phydat import phycon
+from lib.filesys import cache
+from lib.filesys import spcdb
 
 
 def get_zma_geo(filesys, locs):
@@ -45,7 +47,10 @@ def conformer_locators(cnf_save_fs, mod_thy_info, cnf_range='min'):
     """ locators for minimum energy conformer
     """
 
-    cnf_locs_lst = cnf_save_fs[-1].existing()
+    if spcdb.is_active():
+        cnf_locs_lst = spcdb.locators(cnf_save_fs)
+    else:
+        cnf_locs_lst = cnf_save_fs[-1].existing()
     fin_locs_lst, fin_paths_lst = [], []
 
     if cnf_locs_lst:
@@ -53,6 +58,7 @@ def conformer_locators(cnf_save_fs, mod_thy_info, cnf_range='min'):
         cnf_locs_lst, cnf_enes_lst = _sorted_cnf_lsts(
             cnf_locs_lst, cnf_save_fs, mod_thy_info)
 
+    if cnf_locs_lst:
         if cnf_range == 'min':
             fin_locs_lst = [cnf_locs_lst[0]]
         elif cnf_range == 'all':
@@ -75,14 +81,23 @@ def _sorted_cnf_lsts(cnf_locs_lst, cnf_save_fs, mod_thy_info):
     cnf_enes_lst = []
     if len(cnf_locs_lst) == 1:
         cnf_enes_lst = [10]
+    elif spcdb.is_active():
+        cnf_enes_lst = spcdb.energies(cnf_save_fs, cnf_locs_lst, mod_thy_info)
     else:
         for locs in cnf_locs_lst:
             cnf_path = cnf_save_fs[-1].path(locs)
             sp_fs = autofile.fs.single_point(cnf_path)
-            cnf_enes_lst.append(sp_fs[-1].file.energy.read(mod_thy_info[1:4]))
-
-    # Sort the cnf locs and cnf enes
-    cnf_enes_lst, cnf_locs_lst = zip(*sorted(zip(cnf_enes_lst, cnf_locs_lst)))
+            cnf_enes_lst.append(
+                cache.read(sp_fs[-1].file.energy, mod_thy_info[1:4]))
+
+    # Drop the conformers with no energy at the level, then sort the cnf
+    # locs and cnf enes
+    ene_locs_lst = [(ene, locs) for ene, locs in zip(cnf_enes_lst, cnf_locs_lst)
+                    if ene is not None]
+    if ene_locs_lst:
+        cnf_enes_lst, cnf_locs_lst = zip(*sorted(ene_locs_lst))
+    else:
+        cnf_enes_lst, cnf_locs_lst = (), ()
 
     return cnf_locs_lst, cnf_enes_lst
 
@@ -162,7 +177,7 @@ def locs_sort(save_fs):
     """
     locs_lst = save_fs[-1].existing()
     if locs_lst:
-        enes = [save_fs[-1].file.energy.read(locs)
+        enes = [cache.read(save_fs[-1].file.energy, locs)
                 for locs in locs_lst]
         sorted_locs = []
         for _, loc in sorted(zip(enes, locs_lst), key=lambda x: x[0]):
@@ -180,10 +195,10 @@ def traj_sort(save_fs, mod_thy_info):
             cnf_path = save_fs[-1].path(locs)
             sp_fs = autofile.fs.single_point(cnf_path)
             enes.append(
-                sp_fs[-1].file.energy.read(mod_thy_info[1:4]))
+                cache.read(sp_fs[-1].file.energy, mod_thy_info[1:4]))
         # enes = [save_fs[-1].file.energy.read(locs)
         #         for locs in locs_lst]
-        geos = [save_fs[-1].file.geometry.read(locs)
+        geos = [cache.read(save_fs[-1].file.geometry, locs)
                 for locs in locs_lst]
         traj = []
         traj_sort_data = sorted(zip(enes, geos, locs_lst), key=lambda x: x[0])
@@ -0,0 +1,215 @@
+"""
+  Optional index database of the energies saved in a layer of the save
+  filesystem (e.g., the conformers of a species or the points of a scan)
+
+  The database is a JSON file at the root of the layer that holds the
+  locators of the structures of the layer and maps the locators of each
+  structure to its energies at each level of theory. It is kept in sync
+  when structures and energies are saved, so lookups for the
+  minimum-energy conformer, energy ranges of conformers and scan grids
+  read a single file instead of walking the layer and reading an energy
+  file per structure.
+
+  Entries are validated against the directories that hold the
+  structures, not the energy files: the entries of the structures in a
+  directory are dropped, and read again from the filesystem, once the
+  modification time of the directory shows that structures were added
+  to or removed from it by a process not using the database. A lookup
+  costs one stat per directory (one for the conformers of a species).
+  Energies rewritten in place without the database are therefore not
+  seen; removing the database file rebuilds it. Only energies are
+  indexed (not, e.g., zero-point energies or imaginary frequencies).
+"""
+
+import os
+import json
+import autofile
+from lib.filesys._lock import locked
+from lib.filesys import _key
+from lib.filesys import cache
+
+
+DB_NAME = 'index_db.json'
+DB_VERSION = 2
+_ACTIVE = [False]
+_DB_DCT = {}
+
+
+def activate(active=True):
+    """ Turn the use of the index databases on (or off) for the process
+    """
+    _ACTIVE[0] = active
+
+
+def is_active():
+    """ Check if the index databases are being used
+    """
+    return _ACTIVE[0]
+
+
+def locators(save_fs):
+    """ Get the locators of the structures of a single-level filesystem
+        layer (e.g., the conformers of a species), listing the layer only
+        if structures were added to or removed from it since the last
+        listing
+    """
+    stamp = cache.file_stamp(save_fs[0].path())
+    layer_dct = _read(save_fs).get('layer', {})
+    if stamp is not None and layer_dct.get('stamp') == list(stamp):
+        locs_lst = layer_dct['locs']
+    else:
+        locs_lst = save_fs[-1].existing()
+        if stamp is not None:
+            _update(save_fs, layer={'stamp': list(stamp),
+                                    'locs': list(locs_lst)})
+    return locs_lst
+
+
+def energies(save_fs, locs_lst, mod_thy_info):
+    """ Get the energies at a level of theory for a set of locators of a
+        filesystem layer, reading any not in the database from the
+        filesystem; None is given for structures with no energy
+    """
+
+    thy_key = _key.thy_key(mod_thy_info)
+    dir_dct = _read(save_fs).get('dirs', {})
+
+    # Stat each directory holding the structures once, dropping the
+    # entries of the directories that have changed
+    dir_keys = [_dir_key(save_fs, locs) for locs in locs_lst]
+    stamp_dct = {}
+    for dir_key in set(dir_keys):
+        stamp = cache.file_stamp(os.path.join(save_fs[0].path(), dir_key))
+        stamp_dct[dir_key] = list(stamp) if stamp is not None else None
+
+    enes, new_dct = [], {}
+    for locs, dir_key in zip(locs_lst, dir_keys):
+        key = _key.locs_key(locs)
+        ent_dct = dir_dct.get(dir_key, {})
+        ene = None
+        if (stamp_dct[dir_key] is not None and
+                ent_dct.get('stamp') == stamp_dct[dir_key]):
+            ene = ent_dct['enes'].get(key, {}).get(thy_key)
+        if ene is None and stamp_dct[dir_key] is not None:
+            # Not in the database: the energy may not have been run yet
+            ene_file = _energy_file(save_fs, locs)
+            if ene_file.exists(mod_thy_info[1:4]):
+                ene = cache.read(ene_file, mod_thy_info[1:4])
+                new_dct.setdefault(dir_key, {})[key] = ene
+        enes.append(ene)
+
+    if new_dct:
+        _update(save_fs, thy_key=thy_key, new_dct=new_dct,
+                stamp_dct=stamp_dct)
+
+    return enes
+
+
+def energy(save_fs, locs, mod_thy_info):
+    """ Get the energy at a level of theory for a structure of a
+        filesystem layer; None if there is no energy
+    """
+    ene, = energies(save_fs, [locs], mod_thy_info)
+    return ene
+
+
+def record(save_fs, locs, mod_thy_info, ene):
+    """ Add the energy of a newly saved structure to the database
+    """
+    records(save_fs, [locs], mod_thy_info, [ene])
+
+
+def records(save_fs, locs_lst, mod_thy_info, enes):
+    """ Add the energies of a set of newly saved structures to the
+        database at once
+
+        The directories holding the structures are taken to have changed
+        only by these structures being saved in them.
+    """
+    if is_active() and locs_lst:
+        new_dct, stamp_dct = {}, {}
+        for locs, ene in zip(locs_lst, enes):
+            dir_key = _dir_key(save_fs, locs)
+            if dir_key not in stamp_dct:
+                stamp = cache.file_stamp(
+                    os.path.join(save_fs[0].path(), dir_key))
+                stamp_dct[dir_key] = (
+                    list(stamp) if stamp is not None else None)
+            if stamp_dct[dir_key] is not None:
+                new_dct.setdefault(dir_key, {})[_key.locs_key(locs)] = ene
+        if new_dct:
+            _update(save_fs, thy_key=_key.thy_key(mod_thy_info),
+                    new_dct=new_dct, stamp_dct=stamp_dct, keep=True)
+
+
+def _dir_key(save_fs, locs):
+    """ Path of the directory holding a structure, relative to the root
+        of the layer
+    """
+    return os.path.relpath(
+        os.path.dirname(save_fs[-1].path(locs)), save_fs[0].path())
+
+
+def _energy_file(save_fs, locs):
+    """ The energy file of a structure, whose locators are the level of
+        theory
+    """
+    sp_fs = autofile.fs.single_point(save_fs[-1].path(locs))
+    return sp_fs[-1].file.energy
+
+
+def _read(save_fs):
+    """ Read the database for a filesystem layer, reusing the last read
+        if the file has not changed since
+    """
+    db_path = os.path.join(save_fs[0].path(), DB_NAME)
+    try:
+        mtime = os.stat(db_path).st_mtime_ns
+    except FileNotFoundError:
+        return {}
+
+    if db_path in _DB_DCT and _DB_DCT[db_path][0] == mtime:
+        db_dct = _DB_DCT[db_path][1]
+    else:
+        try:
+            with open(db_path, 'r') as db_obj:
+                db_dct = json.load(db_obj)
+        except ValueError:
+            print(' - Index database at {} is corrupt. Rebuilding...'
+                  .format(db_path))
+            db_dct = {}
+        # Databases written in an older format are rebuilt
+        if db_dct.get('version') != DB_VERSION:
+            db_dct = {}
+        _DB_DCT[db_path] = (mtime, db_dct)
+
+    return db_dct
+
+
+def _update(save_fs, thy_key=None, new_dct=None, stamp_dct=None,
+            keep=False, layer=None):
+    """ Add energies at a level of theory, by directory, to the database,
+        along with the stamps of their directories; the entries of a
+        directory whose stamp has changed are dropped, unless kept (when
+        the change is from the structures being recorded)
+    """
+    db_path = os.path.join(save_fs[0].path(), DB_NAME)
+    with locked(save_fs[0].path()):
+        _DB_DCT.pop(db_path, None)
+        db_dct = _read(save_fs)
+        db_dct['version'] = DB_VERSION
+        dir_dct = db_dct.setdefault('dirs', {})
+        for dir_key, enes in (new_dct or {}).items():
+            ent_dct = dir_dct.get(dir_key)
+            if ent_dct is None or (ent_dct['stamp'] != stamp_dct[dir_key]
+                                   and not keep):
+                ent_dct = {'enes': {}}
+            ent_dct['stamp'] = stamp_dct[dir_key]
+            for key, ene in enes.items():
+                ent_dct['enes'].setdefault(key, {})[thy_key] = ene
+            dir_dct[dir_key] = ent_dct
+        if layer is not None:
+            db_dct['layer'] = layer
+        with open(db_path, 'w') as db_obj:
+            json.dump(db_dct, db_obj)
+        _DB_DCT.pop(db_path, None)
@@ -9,12 +9,17 @@ import automol
 import autofile
 from phydat import phycon
 from phydat import bnd
+from lib.filesys import cache
 
 
 # Functions for locating maxima
 def find_max_1d(typ, grid, ts_zma, dist_name, scn_save_fs,
-                mod_thy_info, constraint_dct):
+                mod_thy_info, constraint_dct, nguess=1, ethresh=0.3):
     """ Find the maxmimum of the grid along one dimension
+
+        With nguess > 1, the zmas at up to nguess-1 other local maxima
+        that could be saddle points (barriers of at least ethresh kcal/mol
+        to a neighbouring minimum) are added, highest first.
     """
 
     # Find the maximum along the scan
@@ -30,7 +35,8 @@ def find_max_1d(typ, grid, ts_zma, dist_name, scn_save_fs,
         if scn_save_fs[-1].exists(locs):
             scn_path = scn_save_fs[-1].path(locs)
             sp_save_fs = autofile.fs.single_point(scn_path)
-            enes.append(sp_save_fs[-1].file.energy.read(mod_thy_info[1:4]))
+            enes.append(
+                cache.read(sp_save_fs[-1].file.energy, mod_thy_info[1:4]))
             locs_lst.append(locs)
     max_ene = max(enes)
     max_idx = enes.index(max_ene)
@@ -41,7 +47,7 @@ def find_max_1d(typ, grid, ts_zma, dist_name, scn_save_fs,
     # Get zma at maximum
     max_locs = locs_lst[max_idx]
     print(scn_save_fs[-1].path(max_locs))
-    max_zma = scn_save_fs[-1].file.zmatrix.read(max_locs)
+    max_zma = cache.read(scn_save_fs[-1].file.zmatrix, max_locs)
     guess_zmas.append(max_zma)
 
     # # Add second guess zma for migrations
@@ -51,6 +57,17 @@ def find_max_1d(typ, grid, ts_zma, dist_name, scn_save_fs,
             ts_zma, {dist_name: max_grid_val})
         guess_zmas.append(mig_zma)
 
+    # Add the zmas at the other potential saddle points
+    if nguess > 1:
+        rel_enes = [(ene - max_ene) * phycon.EH2KCAL for ene in enes]
+        sadpt_idxs, _ = _potential_sadpt(rel_enes, ethresh=ethresh)
+        sadpt_max_idxs = sorted(
+            set(trip[1] for trip in sadpt_idxs) - {max_idx},
+            key=lambda idx: rel_enes[idx], reverse=True)
+        for idx in sadpt_max_idxs[:nguess-1]:
+            guess_zmas.append(
+                cache.read(scn_save_fs[-1].file.zmatrix, locs_lst[idx]))
+
     return guess_zmas
 
 
@@ -76,7 +93,8 @@ def find_max_2d(grid1, grid2, dist_name, brk_name, scn_save_fs,
             if scn_save_fs[-1].exists(locs):
                 scn_path = scn_save_fs[-1].path(locs)
                 sp_save_fs = autofile.fs.single_point(scn_path)
-                enes.append(sp_save_fs[-1].file.energy.read(mod_thy_info[1:4]))
+                enes.append(
+                    cache.read(sp_save_fs[-1].file.energy, mod_thy_info[1:4]))
                 locs_lst.append(locs)
         locs_lst_lst.append(locs_lst)
         if enes:
@@ -108,7 +126,7 @@ def find_max_2d(grid1, grid2, dist_name, brk_name, scn_save_fs,
     max_ene = min_ene
     print('min max loc', max_ene, max_locs)
     print('min max loc', scn_save_fs[-1].path(max_locs))
-    max_zma = scn_save_fs[-1].file.zmatrix.read(max_locs)
+    max_zma = cache.read(scn_save_fs[-1].file.zmatrix, max_locs)
 
     # print('geometry for maximum along scan:', max_zma)
     # print('energy for maximum along scan:', max_ene)
@@ -140,7 +158,7 @@ def vtst_max(grid, dist_name, scn_save_fs,
         sadpt_locs = locs_lst[sadpt_idx]
 
         # Get the max zma
-        sadpt_zma = scn_save_fs[-1].file.zmatrix.read(sadpt_locs)
+        sadpt_zma = cache.read(scn_save_fs[-1].file.zmatrix, sadpt_locs)
     else:
         sadpt_zma = None
 
@@ -169,7 +187,8 @@ def _grid_vals(grid, dist_name, scn_save_fs,
         if scn_save_fs[-1].exists(locs):
             scn_path = scn_save_fs[-1].path(locs)
             sp_save_fs = autofile.fs.single_point(scn_path)
-            enes_lst.append(sp_save_fs[-1].file.energy.read(mod_thy_info[1:4]))
+            enes_lst.append(
+                cache.read(sp_save_fs[-1].file.energy, mod_thy_info[1:4]))
             locs_lst.append(locs)
 
     return locs_lst, enes_lst
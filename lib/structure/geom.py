@@ -91,13 +91,13 @@ def is_unique_coulomb_energy(geo, ene, geo_list, ene_list):
     coulomb spectrum and energy
     """
     unique = True
-    for idx, geoi in enumerate(geo_list):
-        enei = ene_list[idx]
-        etol = 2.e-5
-        if abs(ene-enei) < etol:
-            if automol.geom.almost_equal_coulomb_spectrum(
-                    geo, geoi, rtol=1e-2):
-                unique = False
+    ene_idxs = numpy.nonzero(energy_mask(ene, ene_list))[0]
+    if ene_idxs.size:
+        spec = automol.geom.coulomb_spectrum(geo)
+        specs = [automol.geom.coulomb_spectrum(geo_list[idx])
+                 for idx in ene_idxs]
+        if any(coulomb_spectrum_mask(spec, specs, rtol=1e-2)):
+            unique = False
     return unique
 
 
@@ -106,13 +106,11 @@ def is_unique_dist_mat_energy(geo, ene, geo_list, ene_list):
     distance matrix and energy
     """
     unique = True
-    for idx, geoi in enumerate(geo_list):
-        enei = ene_list[idx]
-        etol = 2.e-5
-        if abs(ene-enei) < etol:
-            if automol.geom.almost_equal_distance_matrix(
-                    geo, geoi, thresh=1e-1):
-                unique = False
+    ene_idxs = numpy.nonzero(energy_mask(ene, ene_list))[0]
+    if ene_idxs.size:
+        xyzs = coordinate_stack([geo_list[idx] for idx in ene_idxs])
+        if any(dist_mat_mask(coordinate_stack([geo])[0], xyzs, thresh=1e-1)):
+            unique = False
     return unique
 
 
@@ -165,22 +163,187 @@ def is_unique_tors_dist_mat_energy(geo, ene, geo_list, ene_list, saddle):
     coulomb spectrum and energy and stereo specific inchi
     """
     unique = True
-    etol = 2.e-5
-    for idx, geoi in enumerate(geo_list):
-        enei = ene_list[idx]
-        # check energy
-        if abs(ene-enei) < etol:
-            # check distance matrix
-            if automol.geom.almost_equal_dist_matrix(
-                    geo, geoi, thresh=3e-1):
-                # check dihedrals
-                # for now only do this for minima
-                # but this can create problems for TSs as well
-                # - e.g., CH2OH = CH2O + H
-                if saddle:
-                    unique = False
-                elif are_torsions_same(geo, geoi):
+    ene_idxs = numpy.nonzero(energy_mask(ene, ene_list))[0]
+    if ene_idxs.size:
+        # check distance matrix
+        geos = [geo_list[idx] for idx in ene_idxs]
+        xyz = coordinate_stack([geo])[0]
+        xyzs = coordinate_stack(geos)
+        dist_idxs = numpy.nonzero(dist_mat_mask(xyz, xyzs, thresh=3e-1))[0]
+        if dist_idxs.size:
+            # check dihedrals
+            # for now only do this for minima
+            # but this can create problems for TSs as well
+            # - e.g., CH2OH = CH2O + H
+            if saddle:
+                unique = False
+            else:
+                tors_mask = torsion_mask(
+                    geo, [geos[idx] for idx in dist_idxs])
+                if any(tors_mask):
                     unique = False
-                # if are_torsions_same(geo, geoi):
-                    # unique = False
     return unique
+
+
+# Batched comparisons of geometries over stacked coordinate arrays
+def coordinate_stack(geo_list):
+    """ Stack the cartesian coordinates of a list of geometries
+        into an (N, natom, 3) array
+    """
+    xyzs = numpy.array([automol.geom.coordinates(geo) for geo in geo_list],
+                       dtype=float)
+    if not geo_list:
+        xyzs = numpy.zeros((0, 0, 3))
+    return xyzs
+
+
+def distance_matrices(xyzs):
+    """ Distance matrices, (N, natom, natom), for a coordinate stack
+    """
+    xyzs = numpy.asarray(xyzs, dtype=float)
+    return numpy.linalg.norm(
+        xyzs[:, :, numpy.newaxis, :] - xyzs[:, numpy.newaxis, :, :], axis=-1)
+
+
+def dihedral_angles(xyzs, keys):
+    """ Dihedral angles, (N, nkeys), in radians for each set of four
+        atom indices in keys for a coordinate stack
+    """
+    xyzs = numpy.asarray(xyzs, dtype=float)
+    keys = numpy.asarray(keys, dtype=int).reshape(-1, 4)
+    pt0, pt1, pt2, pt3 = (xyzs[:, keys[:, i], :] for i in range(4))
+
+    axis = pt2 - pt1
+    axis /= numpy.linalg.norm(axis, axis=-1, keepdims=True)
+    vec1 = pt0 - pt1
+    vec2 = pt3 - pt2
+    vec1 -= numpy.sum(vec1 * axis, axis=-1, keepdims=True) * axis
+    vec2 -= numpy.sum(vec2 * axis, axis=-1, keepdims=True) * axis
+
+    xval = numpy.sum(vec1 * vec2, axis=-1)
+    yval = numpy.sum(numpy.cross(vec1, axis) * vec2, axis=-1)
+
+    return numpy.arctan2(yval, xval)
+
+
+def energy_mask(ene, ene_list, etol=2.e-5):
+    """ Mask of the energies within etol of ene
+    """
+    return numpy.abs(numpy.asarray(ene_list, dtype=float) - ene) < etol
+
+
+def coulomb_spectrum_mask(spec, spec_list, rtol=1e-2):
+    """ Mask of the Coulomb spectra almost equal to spec,
+        in the sense of numpy.allclose
+    """
+    spec = numpy.asarray(spec, dtype=float)
+    specs = numpy.asarray(spec_list, dtype=float).reshape(-1, spec.size)
+    return numpy.all(
+        numpy.abs(specs - spec) <= 1e-8 + rtol * numpy.abs(specs), axis=1)
+
+
+def dist_mat_mask(xyz, xyzs, thresh=3e-1):
+    """ Mask of the structures in a coordinate stack whose distance
+        matrix differs from that of xyz by no more than thresh
+    """
+    xyzs = numpy.asarray(xyzs, dtype=float)
+    if not xyzs.size:
+        return numpy.zeros(len(xyzs), dtype=bool)
+    dmat = distance_matrices([xyz])[0]
+    dmats = distance_matrices(xyzs)
+    return numpy.max(numpy.abs(dmats - dmat), axis=(1, 2)) <= thresh
+
+
+def torsion_mask(geo, geo_list, ts_bnds=(), dtol=0.09):
+    """ Mask of the geometries with all torsional angle values the same as
+        those of geo, within dtol and accounting for the 2pi wrap
+    """
+    if not geo_list:
+        return numpy.zeros(0, dtype=bool)
+
+    keys = torsion_keys(geo, ts_bnds=ts_bnds)
+    if keys is None:
+        # Torsions defined using dummy atoms; compare the z-matrices
+        mask = numpy.array([are_torsions_same(geo, geoi, ts_bnds=ts_bnds)
+                            for geoi in geo_list], dtype=bool)
+    else:
+        xyzs = coordinate_stack([geo] + list(geo_list))
+        mask = dihedral_mask(xyzs[0], xyzs[1:], keys, dtol=dtol)
+
+    return mask
+
+
+def dihedral_mask(xyz, xyzs, keys, dtol=0.09):
+    """ Mask of the structures in a coordinate stack with all dihedral
+        angles for keys within dtol of those for xyz
+    """
+    xyzs = numpy.asarray(xyzs, dtype=float)
+    if not len(keys):
+        return numpy.ones(len(xyzs), dtype=bool)
+    ang = dihedral_angles([xyz], keys)[0]
+    angs = dihedral_angles(xyzs, keys)
+    diff = numpy.abs(
+        numpy.mod(angs - ang + numpy.pi, 2.*numpy.pi) - numpy.pi)
+    return numpy.all(diff <= dtol, axis=1)
+
+
+def torsion_keys(geo, ts_bnds=()):
+    """ Geometry atom indices for each torsion of the z-matrix built
+        from the geometry; None if any torsion involves a dummy atom
+    """
+    zma = automol.geom.zmatrix(geo, ts_bnds=ts_bnds)
+    tors_names = automol.geom.zmatrix_torsion_coordinate_names(
+        geo, ts_bnds=ts_bnds)
+    atm_ord = automol.geom.zmatrix_atom_ordering(geo, ts_bnds)
+    if not isinstance(atm_ord, dict):
+        atm_ord = dict(enumerate(atm_ord))
+    geo_idx_dct = {zma_idx: geo_idx for geo_idx, zma_idx in atm_ord.items()}
+
+    keys = []
+    for tors_name in tors_names:
+        zma_idxs = automol.zmatrix.coord_idxs(zma, tors_name)
+        if not all(idx in geo_idx_dct for idx in zma_idxs):
+            keys = None
+            break
+        keys.append([geo_idx_dct[idx] for idx in zma_idxs])
+
+    return keys
+
+
+def unique_mask(geo_list, ene_list=None, saddle=False,
+                etol=2.e-5, thresh=3e-1, dtol=0.09):
+    """ Mask of the geometries that are unique with respect to all
+        preceding unique geometries in the list, compared by energy (if
+        given), distance matrix and, for minima, torsional angles
+    """
+    mask = numpy.zeros(len(geo_list), dtype=bool)
+    if not geo_list:
+        return mask
+
+    xyzs = coordinate_stack(geo_list)
+    dmats = distance_matrices(xyzs)
+    keys = None if saddle else torsion_keys(geo_list[0])
+    if keys is not None:
+        angs = dihedral_angles(xyzs, keys)
+
+    for idx, geo in enumerate(geo_list):
+        prev_idxs = numpy.nonzero(mask[:idx])[0]
+        if ene_list is not None:
+            prev_idxs = prev_idxs[
+                energy_mask(ene_list[idx],
+                            numpy.asarray(ene_list)[prev_idxs], etol=etol)]
+        same = numpy.max(
+            numpy.abs(dmats[prev_idxs] - dmats[idx]), axis=(1, 2)) <= thresh
+        prev_idxs = prev_idxs[same]
+        if prev_idxs.size and not saddle:
+            if keys is None:
+                same = torsion_mask(geo, [geo_list[i] for i in prev_idxs])
+            else:
+                diff = numpy.abs(numpy.mod(
+                    angs[prev_idxs] - angs[idx] + numpy.pi,
+                    2.*numpy.pi) - numpy.pi)
+                same = numpy.all(diff <= dtol, axis=1)
+            prev_idxs = prev_idxs[same]
+        mask[idx] = not prev_idxs.size
+
+    return mask
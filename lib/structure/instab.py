@@ -40,7 +40,7 @@ def write_instab(conn_zma, disconn_zma,
         instab_fs[-1].create()
         instab_fs[-1].file.geometry_info.write(inf_obj)
         instab_fs[-1].file.geometry_input.write(inp_str)
-        instab_fs[-1].file.geometry.write(conn_geo)
+        filesys.cache.write(instab_fs[-1].file.geometry, conn_geo)
         instab_path = instab_fs[-1].path()
 
         # Grab the zma and instability transformation
@@ -53,7 +53,7 @@ def write_instab(conn_zma, disconn_zma,
         zma_save_fs[-1].create(zma_locs)
         zma_save_fs[-1].file.geometry_info.write(inf_obj, zma_locs)
         zma_save_fs[-1].file.geometry_input.write(inp_str, zma_locs)
-        zma_save_fs[-1].file.zmatrix.write(conn_zma, zma_locs)
+        filesys.cache.write(zma_save_fs[-1].file.zmatrix, conn_zma, zma_locs)
 
         # Write the files into the filesystem
         zma_save_fs[-1].file.transformation.write(tra, zma_locs)
@@ -68,7 +68,7 @@ def write_instab(conn_zma, disconn_zma,
         sp_save_fs[-1].create(thy_locs)
         sp_save_fs[-1].file.input.write(inp_str, thy_locs)
         sp_save_fs[-1].file.info.write(inf_obj, thy_locs)
-        sp_save_fs[-1].file.energy.write(ene, thy_locs)
+        filesys.cache.write(sp_save_fs[-1].file.energy, ene, thy_locs)
 
         if save_cnf:
             # Save the geometry information
@@ -77,7 +77,7 @@ def write_instab(conn_zma, disconn_zma,
             cnf_fs[-1].create(cnf_locs)
             cnf_fs[-1].file.geometry_info.write(inf_obj, cnf_locs)
             cnf_fs[-1].file.geometry_input.write(inp_str, cnf_locs)
-            cnf_fs[-1].file.geometry.write(conn_geo, cnf_locs)
+            filesys.cache.write(cnf_fs[-1].file.geometry, conn_geo, cnf_locs)
             cnf_path = cnf_fs[-1].path(cnf_locs)
 
             # Save zma information seperately, if required
@@ -85,7 +85,8 @@ def write_instab(conn_zma, disconn_zma,
             zma_save_fs[-1].create(zma_locs)
             zma_save_fs[-1].file.geometry_info.write(inf_obj, zma_locs)
             zma_save_fs[-1].file.geometry_input.write(inp_str, zma_locs)
-            zma_save_fs[-1].file.zmatrix.write(conn_zma, zma_locs)
+            filesys.cache.write(
+                zma_save_fs[-1].file.zmatrix, conn_zma, zma_locs)
 
             # Saving the energy to an SP filesys
             print(" - Saving energy...")
@@ -96,7 +97,7 @@ def write_instab(conn_zma, disconn_zma,
             sp_save_fs[-1].create(thy_locs)
             sp_save_fs[-1].file.input.write(inp_str, thy_locs)
             sp_save_fs[-1].file.info.write(inf_obj, thy_locs)
-            sp_save_fs[-1].file.energy.write(ene, thy_locs)
+            filesys.cache.write(sp_save_fs[-1].file.energy, ene, thy_locs)
 
 
 # Write the instability files
@@ -114,12 +115,12 @@ def write_instab2(conn_zma, disconn_zmas,
     save_path = thy_save_fs[-1].path(thy_locs)
     print(" - Saving...")
     print(" - Save path: {}".format(save_path))
-    thy_save_fs[-1].file.geometry.write(conn_geo, thy_locs)
+    filesys.cache.write(thy_save_fs[-1].file.geometry, conn_geo, thy_locs)
 
     # Save the geometry information
     instab_fs = autofile.fs.instab(save_path)
     instab_fs[-1].create()
-    instab_fs[-1].file.geometry.write(conn_geo)
+    filesys.cache.write(instab_fs[-1].file.geometry, conn_geo)
     instab_path = instab_fs[-1].path()
 
     # Grab the zma and instability transformation
@@ -130,7 +131,7 @@ def write_instab2(conn_zma, disconn_zmas,
     # Save zma information seperately, if required
     zma_save_fs = autofile.fs.zmatrix(instab_path)
     zma_save_fs[-1].create(zma_locs)
-    zma_save_fs[-1].file.zmatrix.write(conn_zma, zma_locs)
+    filesys.cache.write(zma_save_fs[-1].file.zmatrix, conn_zma, zma_locs)
 
     # Write the files into the filesystem
     zma_save_fs[-1].file.transformation.write(tra, zma_locs)
@@ -142,13 +143,13 @@ def write_instab2(conn_zma, disconn_zmas,
         cnf_fs = autofile.fs.conformer(save_path)
         cnf_locs = [autofile.schema.generate_new_conformer_id()]
         cnf_fs[-1].create(cnf_locs)
-        cnf_fs[-1].file.geometry.write(conn_geo, cnf_locs)
+        filesys.cache.write(cnf_fs[-1].file.geometry, conn_geo, cnf_locs)
         cnf_path = cnf_fs[-1].path(cnf_locs)
 
         # Save zma information seperately, if required
         zma_save_fs = autofile.fs.zmatrix(cnf_path)
         zma_save_fs[-1].create(zma_locs)
-        zma_save_fs[-1].file.zmatrix.write(conn_zma, zma_locs)
+        filesys.cache.write(zma_save_fs[-1].file.zmatrix, conn_zma, zma_locs)
 
 
 def _instab_info(conn_zma, disconn_zmas):
@@ -12,6 +12,8 @@ from autofile import fs
 import mess_io
 from phydat import phycon
 from lib.structure import vib as vibprep
+from lib.filesys import cache
+from lib.filesys import spcdb
 from lib.submission import run_script
 from lib.submission import DEFAULT_SCRIPT_DCT
 
@@ -244,14 +246,13 @@ def read_hr_pot(tors_names, tors_grids, cnf_save_path,
     else:
         scn_fs = autofile.fs.cscan(zma_path)
 
-    # Read the energies and Hessians from the filesystem
-    for point, vals in zip(grid_points, grid_vals):
+    # Read the energies of the grid
+    locs_lst, enes = read_scan_enes(
+        scn_fs, tors_names, grid_vals, constraint_dct, mod_tors_ene_info)
 
-        locs = [tors_names, vals]
-        if constraint_dct is not None:
-            locs = [constraint_dct] + locs
+    # Read the energies and Hessians from the filesystem
+    for point, locs, ene in zip(grid_points, locs_lst, enes):
 
-        ene = read_tors_ene(scn_fs, locs, mod_tors_ene_info)
         if ene is not None:
             pot[point] = (ene - ref_ene) * phycon.EH2KCAL
         else:
@@ -260,25 +261,25 @@ def read_hr_pot(tors_names, tors_grids, cnf_save_path,
         # print('path test in read_hr_pot:', scn_fs[-1].path(locs))
         if read_geom:
             if scn_fs[-1].file.geometry.exists(locs):
-                geoms[point] = scn_fs[-1].file.geometry.read(locs)
+                geoms[point] = cache.read(scn_fs[-1].file.geometry, locs)
             else:
                 geoms[point] = None
 
         if read_grad:
             if scn_fs[-1].file.gradient.exists(locs):
-                grads[point] = scn_fs[-1].file.gradient.read(locs)
+                grads[point] = cache.read(scn_fs[-1].file.gradient, locs)
             else:
                 grads[point] = None
 
         if read_hess:
             if scn_fs[-1].file.hessian.exists(locs):
-                hessians[point] = scn_fs[-1].file.hessian.read(locs)
+                hessians[point] = cache.read(scn_fs[-1].file.hessian, locs)
             else:
                 hessians[point] = None
 
         if read_zma:
             if scn_fs[-1].file.zmatrix.exists(locs):
-                zmas[point] = scn_fs[-1].file.zmatrix.read(locs)
+                zmas[point] = cache.read(scn_fs[-1].file.zmatrix, locs)
             else:
                 zmas[point] = None
 
@@ -287,6 +288,93 @@ def read_hr_pot(tors_names, tors_grids, cnf_save_path,
     return pot, geoms, grads, hessians, zmas, paths
 
 
+def read_scan_enes(scn_fs, tors_names, grid_vals, constraint_dct,
+                   mod_tors_ene_info):
+    """ Get the locs of the points of a scan grid and their energies,
+        None for the points with no energy
+    """
+
+    # Set the locs of the grid points
+    locs_lst = []
+    for vals in grid_vals:
+        locs = [tors_names, vals]
+        if constraint_dct is not None:
+            locs = [constraint_dct] + locs
+        locs_lst.append(locs)
+
+    # Read the energies of the grid at once if the index database is used
+    if spcdb.is_active():
+        enes = spcdb.energies(scn_fs, locs_lst, mod_tors_ene_info)
+    else:
+        enes = [read_tors_ene(scn_fs, locs, mod_tors_ene_info)
+                for locs in locs_lst]
+
+    return locs_lst, enes
+
+
+# FUNCTIONS FOR ADAPTIVE 1D SCAN GRIDS
+def adapt_ini_idxs(npoints, stride=2):
+    """ Points of a 1D scan grid that an adaptive scan starts from:
+        a coarse grid of every stride-th point, starting at the minimum
+    """
+    return tuple(range(0, npoints, stride))
+
+
+def adapt_next_idxs(enes, ran_idxs, prev_pot=None, tol=0.2):
+    """ Points of a 1D scan grid to run next in an adaptive scan
+
+        The potential at the points not yet run is predicted by a Fourier
+        series fit to the energies of the points run so far, periodic over
+        the grid, and by linear interpolation between the neighbouring
+        points. Points where the two differ by more than tol (kcal/mol),
+        i.e., where the potential is not yet resolved or is strongly
+        curved, are run next. The scan stops when no point needs to be
+        run, or when the predicted potential changes by less than tol
+        from that of the last pass.
+
+        :param enes: energies of the points of the grid, None if not run
+        :param ran_idxs: points that have been run (including failed ones)
+        :param prev_pot: potential predicted by the last pass
+        :return: (points to run, potential predicted by this pass)
+    """
+
+    npoints = len(enes)
+    done_idxs = [idx for idx, ene in enumerate(enes) if ene is not None]
+    if not done_idxs:
+        return (), None
+
+    # Fourier series fit to the energies of the points run so far
+    ref_ene = enes[done_idxs[0]]
+    done_pot = numpy.array(
+        [(enes[idx] - ref_ene) * phycon.EH2KCAL for idx in done_idxs])
+    ang = 2.0 * numpy.pi * numpy.arange(npoints) / npoints
+    basis = [numpy.ones(npoints)]
+    for term in range(1, npoints // 2 + 1):
+        basis.extend([numpy.cos(term * ang), numpy.sin(term * ang)])
+    basis = numpy.array(basis[:len(done_idxs)]).T
+    coeffs = numpy.linalg.pinv(basis[done_idxs]) @ done_pot
+    pot = basis @ coeffs
+    pot[done_idxs] = done_pot
+
+    # Linear interpolation between the neighbouring points run so far
+    lin_pot = numpy.interp(
+        numpy.arange(npoints), done_idxs, done_pot, period=npoints)
+
+    # Run every point left if there are too few points to predict from
+    if len(done_idxs) < 2:
+        next_idxs = tuple(idx for idx in range(npoints)
+                          if idx not in ran_idxs)
+    elif (prev_pot is not None and
+          numpy.max(numpy.abs(pot - prev_pot)) < tol):
+        next_idxs = ()
+    else:
+        next_idxs = tuple(idx for idx in range(npoints)
+                          if idx not in ran_idxs and
+                          abs(pot[idx] - lin_pot[idx]) > tol)
+
+    return next_idxs, pot
+
+
 def calc_hr_frequencies(geoms, grads, hessians, run_path):
     """ Calculate the frequencies
     """
@@ -308,11 +396,14 @@ def read_tors_ene(filesys, locs, mod_tors_ene_info):
     """ read the energy for torsions
     """
 
-    if filesys[-1].exists(locs):
+    if spcdb.is_active():
+        ene = spcdb.energy(filesys, locs, mod_tors_ene_info)
+    elif filesys[-1].exists(locs):
         path = filesys[-1].path(locs)
         sp_fs = autofile.fs.single_point(path)
         if sp_fs[-1].file.energy.exists(mod_tors_ene_info[1:4]):
-            ene = sp_fs[-1].file.energy.read(mod_tors_ene_info[1:4])
+            ene = cache.read(
+                sp_fs[-1].file.energy, mod_tors_ene_info[1:4])
         else:
             ene = None
     else:
@@ -8,6 +8,9 @@ from lib.submission._host import print_host_name
 from lib.submission._host import get_host_node
 from lib.submission._host import get_pid
 from lib.submission._par import qchem_params
+from lib.submission._pool import run_parallel
+from lib.submission._pool import run_graph
+from lib.submission._pool import nproc_avail
 
 
 __all__ = [
@@ -16,5 +19,8 @@ __all__ = [
     'print_host_name',
     'get_host_node',
     'get_pid',
-    'qchem_params'
+    'qchem_params',
+    'run_parallel',
+    'run_graph',
+    'nproc_avail'
 ]
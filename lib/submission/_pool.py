@@ -0,0 +1,271 @@
+""" Run independent tasks at the same time in a bounded pool of processes
+
+    Processes are used (rather than threads) since the electronic structure
+    and MESS runners change the working directory of the process.
+"""
+
+import os
+import sys
+import pickle
+import traceback
+import multiprocessing
+from queue import Empty
+
+
+def nproc_avail():
+    """ Get the number of processors available to spawn workers on,
+        leaving one for the parent process
+    """
+    return max(len(os.sched_getaffinity(0)) - 1, 1)
+
+
+def run_parallel(fxn, args_lst, kwargs_lst=None, nprocs=None,
+                 ignore_failed=False):
+    """ Call fxn(*args, **kwargs) for each set of args and kwargs, keeping
+        at most nprocs processes running at once.
+
+        Workers are forked, so the arguments do not need to be picklable,
+        but the values returned by fxn do. A call fails if it raises an
+        exception, calls sys.exit, or its worker dies (e.g., is killed).
+
+        By default, failures are not hidden: with nprocs=1 the calls are
+        made in the current process and any failure is raised as is, and
+        in parallel a RuntimeError is raised once all of the calls have
+        finished if any of them failed. With ignore_failed, None is
+        returned for each failed call instead, which the caller must check.
+
+        :param fxn: function to call
+        :param args_lst: positional arguments for each call
+        :type args_lst: list(tuple)
+        :param kwargs_lst: keyword arguments for each call
+        :type kwargs_lst: list(dict)
+        :param nprocs: maximum number of concurrent processes
+        :type nprocs: int
+        :param ignore_failed: return None for failed calls, not raise
+        :type ignore_failed: bool
+        :returns: the value returned by each call, in order of args_lst
+        :rtype: list
+    """
+
+    args_lst = list(args_lst)
+    if kwargs_lst is None:
+        kwargs_lst = [{} for _ in args_lst]
+    else:
+        kwargs_lst = list(kwargs_lst)
+    assert len(args_lst) == len(kwargs_lst)
+
+    if nprocs is None:
+        nprocs = nproc_avail()
+    nprocs = max(min(nprocs, len(args_lst)), 1)
+
+    # Run in the current process if there is nothing to run concurrently
+    if nprocs == 1:
+        if ignore_failed:
+            rets = [_call(fxn, args, kwargs)[1]
+                    for args, kwargs in zip(args_lst, kwargs_lst)]
+        else:
+            rets = [fxn(*args, **kwargs)
+                    for args, kwargs in zip(args_lst, kwargs_lst)]
+        return rets
+
+    ctx = multiprocessing.get_context('fork')
+    queue = ctx.Queue()
+    procs = {}
+    rets = [None for _ in args_lst]
+    failed = []
+
+    def _collect():
+        """ wait for one worker to finish and store its value
+        """
+        idx, success, ret = _get(queue, procs)
+        rets[idx] = ret
+        if not success:
+            failed.append(idx)
+
+    for idx, (args, kwargs) in enumerate(zip(args_lst, kwargs_lst)):
+        if len(procs) >= nprocs:
+            _collect()
+        proc = ctx.Process(
+            target=_worker,
+            args=(queue, idx, fxn, args, kwargs))
+        procs[idx] = proc
+        proc.start()
+    while procs:
+        _collect()
+
+    if failed and not ignore_failed:
+        raise RuntimeError(
+            '{} of {} parallel calls of {} failed (calls {})'.format(
+                len(failed), len(args_lst), fxn.__name__, sorted(failed)))
+
+    return rets
+
+
+def _worker(queue, idx, fxn, args, kwargs):
+    """ Call the function in the child process and send back its value
+    """
+    success, ret = _call(fxn, args, kwargs)
+    # Check the value can be sent back before the queue tries to
+    try:
+        pickle.dumps(ret)
+    except Exception:
+        print('Process {} failed: cannot send back {!r}'.format(
+            os.getpid(), ret))
+        success, ret = False, None
+    sys.stdout.flush()
+    queue.put((idx, success, ret))
+
+
+def _call(fxn, args, kwargs):
+    """ Call the function, printing (rather than raising) any failure
+
+        :returns: whether the call succeeded, and its value (None if not)
+    """
+    try:
+        ret = fxn(*args, **kwargs)
+        success = True
+    except (Exception, SystemExit):
+        print('Process {} failed:'.format(os.getpid()))
+        traceback.print_exc()
+        ret = None
+        success = False
+    return success, ret
+
+
+def _get(queue, procs, poll=1.0):
+    """ Wait for the message of one of the running workers, removing it
+        from procs
+
+        The workers that die without sending a message (e.g., killed by
+        a signal or the OOM killer) are found by polling, and their
+        message is a failure: (key, False, None).
+    """
+    while True:
+        try:
+            msg = queue.get(timeout=poll)
+        except Empty:
+            msg = None
+            for key, proc in procs.items():
+                if proc.exitcode is not None and proc.exitcode != 0:
+                    print('Process {} died with exit code {}'.format(
+                        proc.pid, proc.exitcode))
+                    msg = (key, False, None)
+                    break
+        # Skip late messages from workers already found to have died
+        if msg is not None and msg[0] in procs:
+            procs.pop(msg[0]).join()
+            return msg
+
+
+def run_graph(node_dct, dep_dct, nprocs=None, order_dct=None):
+    """ Run a graph of tasks, starting each task as soon as all of the
+        tasks it depends on have finished, keeping at most nprocs
+        processes running at once.
+
+        Ready tasks are started in the order they appear in node_dct, so
+        with nprocs=1 the tasks are run one at a time in that order. If a
+        task fails, the tasks that depend on it are skipped. A task can
+        also be ordered after other tasks without depending on them: it
+        waits for them to finish, but is run whether they fail or not.
+
+        :param node_dct: function, args and kwargs of each task
+        :type node_dct: dict[name: (fxn, tuple, dict)]
+        :param dep_dct: names of the tasks each task depends on
+        :type dep_dct: dict[name: list(name)]
+        :param nprocs: maximum number of concurrent processes
+        :type nprocs: int
+        :param order_dct: names of the tasks each task is run after,
+            without depending on them
+        :type order_dct: dict[name: list(name)]
+        :returns: whether each task ran successfully (None if skipped)
+        :rtype: dict[name: bool]
+    """
+
+    if nprocs is None:
+        nprocs = nproc_avail()
+    nprocs = max(nprocs, 1)
+
+    if order_dct is None:
+        order_dct = {}
+    deps = {name: set(dep_dct.get(name, ())) for name in node_dct}
+    afters = {name: set(order_dct.get(name, ())) | deps[name]
+              for name in node_dct}
+    assert all(dep in node_dct for dep_set in afters.values()
+               for dep in dep_set), ('Tasks depend on unknown tasks')
+
+    ctx = multiprocessing.get_context('fork')
+    queue = ctx.Queue()
+    procs = {}
+    status_dct = {}
+
+    def _finish(name, success):
+        """ store the status of a task and skip the tasks depending on it
+        """
+        status_dct[name] = success
+        if not success:
+            print('Task {} failed. Skipping the tasks depending on it...'
+                  .format(name))
+
+    def _collect():
+        """ wait for one worker to finish and store its status
+        """
+        name, success, _ = _get(queue, procs)
+        _finish(name, success)
+
+    while len(status_dct) < len(node_dct):
+
+        # Skip the tasks that depend on failed or skipped tasks
+        for name in node_dct:
+            if name not in status_dct and name not in procs:
+                if any(status_dct.get(dep, True) is not True
+                       for dep in deps[name]):
+                    print('Skipping task {}'.format(name))
+                    status_dct[name] = None
+
+        # Start the tasks whose dependencies have all finished
+        ready = [name for name in node_dct
+                 if name not in status_dct and name not in procs and
+                 all(dep in status_dct for dep in afters[name])]
+        for name in ready:
+            if len(procs) >= nprocs:
+                break
+            fxn, args, kwargs = node_dct[name]
+            print('\nStarting task {}'.format(name))
+            if nprocs == 1:
+                _finish(name, _call_node(fxn, args, kwargs))
+            else:
+                proc = ctx.Process(
+                    target=_graph_worker,
+                    args=(queue, name, fxn, args, kwargs))
+                procs[name] = proc
+                proc.start()
+
+        if procs:
+            _collect()
+        elif not ready and len(status_dct) < len(node_dct):
+            # Nothing running or ready: the remaining tasks form a cycle
+            raise ValueError('Task graph has a cycle')
+
+    return status_dct
+
+
+def _graph_worker(queue, name, fxn, args, kwargs):
+    """ Call the task function in the child process and send back if it
+        was successful
+    """
+    success = _call_node(fxn, args, kwargs)
+    sys.stdout.flush()
+    queue.put((name, success, None))
+
+
+def _call_node(fxn, args, kwargs):
+    """ Call the task function, printing (rather than raising) any failure
+    """
+    try:
+        fxn(*args, **kwargs)
+        success = True
+    except (Exception, SystemExit):
+        print('Process {} failed:'.format(os.getpid()))
+        traceback.print_exc()
+        success = False
+    return success
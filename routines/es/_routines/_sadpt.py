@@ -1,6 +1,7 @@
 """ Functions for sadpt
 """
 
+import os
 import automol
 import autofile
 from autofile import fs
@@ -10,6 +11,7 @@ from routines.es import runner as es_runner
 from lib import structure
 from lib import filesys
 from lib.reaction import grid as rxngrid
+from lib.submission import run_parallel
 
 
 # SADPT FINDER FUNCTIONS
@@ -120,8 +122,11 @@ def scan_for_guess(rxn_typ, grid, dist_name, brk_name,
                    ts_zma, ts_info, mod_thy_info, thy_save_fs,
                    scn_run_fs, scn_save_fs, opt_script_str,
                    overwrite, update_guess, constraint_dct, scn_typ='relaxed',
-                   **opt_kwargs):
+                   nguess=1, **opt_kwargs):
     """ saddle point scan code
+
+        For 1D scans, up to nguess maxima of the scan are returned as
+        guesses (see find_max_1d).
     """
 
     # Build grid and names appropriate for reaction type
@@ -185,7 +190,7 @@ def scan_for_guess(rxn_typ, grid, dist_name, brk_name,
     else:
         guess_zmas = rxngrid.find_max_1d(
             rxn_typ, grid, ts_zma, dist_name, scn_save_fs,
-            mod_thy_info, constraint_dct)
+            mod_thy_info, constraint_dct, nguess=nguess)
 
     return guess_zmas
 
@@ -251,6 +256,77 @@ def optimize_saddle_point(guess_zmas, ts_info, mod_thy_info,
     return opt_ret
 
 
+def optimize_saddle_points(guess_zmas, ts_info, mod_thy_info,
+                           run_fs, opt_script_str, script_str, overwrite,
+                           njobs=1, **opt_kwargs):
+    """ Optimize all of the guess structures at once, njobs at a time,
+        each in its own run filesystem, and check the Hessian of each
+
+        The guesses are given in order of preference (the global maximum
+        of the scan first), and the first one that optimizes to a saddle
+        point is kept, as when they are optimized one at a time. A lower
+        energy is not preferred: the saddle points of the other guesses
+        may be of another reaction or be conformers of the TS, which the
+        imaginary frequency check does not tell apart.
+
+        :return: (opt_ret, hess_ret, freqs, imags) of the first guess
+            that optimized to a saddle point; None if none did
+    """
+
+    print('\nOptimizing the {} guess Z-Matrices'.format(len(guess_zmas)),
+          '{} at a time...'.format(njobs))
+    args_lst = []
+    for idx, zma in enumerate(guess_zmas):
+        guess_run_fs = autofile.fs.run(
+            os.path.join(run_fs[0].path(), 'GUESS{}'.format(idx)))
+        args_lst.append((zma, ts_info, mod_thy_info, guess_run_fs,
+                         opt_script_str, script_str, overwrite))
+    rets = run_parallel(_optimize_and_check, args_lst,
+                        kwargs_lst=[opt_kwargs for _ in args_lst],
+                        nprocs=njobs, ignore_failed=True)
+
+    # Keep the saddle point of the first guess that gave one
+    sadpt_ret = None
+    for idx, ret in enumerate(rets):
+        if ret is None:
+            print(' - Guess {}: optimization failed'.format(idx+1))
+        elif not ret[1]:
+            print(' - Guess {}: not a saddle point'.format(idx+1))
+        else:
+            print(' - Guess {}: saddle point, E = {}'.format(idx+1, ret[2]))
+            if sadpt_ret is None:
+                print('   Using the saddle point of this guess')
+                sadpt_ret = ret[0]
+
+    return sadpt_ret
+
+
+def _optimize_and_check(zma, ts_info, mod_thy_info,
+                        run_fs, opt_script_str, script_str, overwrite,
+                        **opt_kwargs):
+    """ Optimize one guess structure and check its Hessian
+
+        :return: ((opt_ret, hess_ret, freqs, imags), saddle, ene);
+            None if the optimization failed
+    """
+
+    ret = None
+    opt_ret = optimize_saddle_point(
+        [zma], ts_info, mod_thy_info,
+        run_fs, opt_script_str, overwrite, **opt_kwargs)
+    if opt_ret is not None:
+        hess_ret, freqs, imags = saddle_point_hessian(
+            opt_ret, ts_info, mod_thy_info,
+            run_fs, script_str, overwrite, **opt_kwargs)
+        saddle = saddle_point_checker(imags)
+        opt_inf_obj, _, opt_out_str = opt_ret
+        ene = elstruct.reader.energy(
+            opt_inf_obj.prog, opt_inf_obj.method, opt_out_str)
+        ret = ((opt_ret, hess_ret, freqs, imags), saddle, ene)
+
+    return ret
+
+
 def saddle_point_hessian(opt_ret, ts_info, mod_thy_info,
                          run_fs, script_str, overwrite,
                          **opt_kwargs):
@@ -356,7 +432,7 @@ def save_saddle_point(opt_ret, hess_ret, freqs, imags,
     print(" - Save path: {}".format(ts_save_path))
 
     # Save geom in the upper theory/TS layer
-    ts_save_fs[0].file.geometry.write(geo)
+    filesys.cache.write(ts_save_fs[0].file.geometry, geo)
 
     # Save this structure as first conformer
     locs = [autofile.schema.generate_new_conformer_id()]
@@ -365,9 +441,9 @@ def save_saddle_point(opt_ret, hess_ret, freqs, imags,
     cnf_save_fs[-1].file.geometry_input.write(opt_inp_str, locs)
     cnf_save_fs[-1].file.hessian_info.write(hess_inf_obj, locs)
     cnf_save_fs[-1].file.hessian_input.write(hess_inp_str, locs)
-    cnf_save_fs[-1].file.energy.write(ene, locs)
-    cnf_save_fs[-1].file.geometry.write(geo, locs)
-    cnf_save_fs[-1].file.hessian.write(hess, locs)
+    filesys.cache.write(cnf_save_fs[-1].file.energy, ene, locs)
+    filesys.cache.write(cnf_save_fs[-1].file.geometry, geo, locs)
+    filesys.cache.write(cnf_save_fs[-1].file.hessian, hess, locs)
     cnf_save_fs[-1].file.harmonic_frequencies.write(freqs, locs)
     cnf_save_path = cnf_save_fs[-1].path(locs)
 
@@ -377,7 +453,7 @@ def save_saddle_point(opt_ret, hess_ret, freqs, imags,
     zma_save_fs[-1].create(zma_locs)
     zma_save_fs[-1].file.geometry_info.write(opt_inf_obj, zma_locs)
     zma_save_fs[-1].file.geometry_input.write(opt_inp_str, zma_locs)
-    zma_save_fs[-1].file.zmatrix.write(zma, zma_locs)
+    filesys.cache.write(zma_save_fs[-1].file.zmatrix, zma, zma_locs)
 
     # Save the form and break keys in the filesystem
     tra = (frozenset({frm_bnd_keys}),
@@ -391,4 +467,4 @@ def save_saddle_point(opt_ret, hess_ret, freqs, imags,
     sp_save_fs[-1].create(mod_thy_info[1:4])
     sp_save_fs[-1].file.input.write(opt_inp_str, mod_thy_info[1:4])
     sp_save_fs[-1].file.info.write(opt_inf_obj, mod_thy_info[1:4])
-    sp_save_fs[-1].file.energy.write(ene, mod_thy_info[1:4])
+    filesys.cache.write(sp_save_fs[-1].file.energy, ene, mod_thy_info[1:4])
@@ -10,6 +10,7 @@ from lib.structure import tors as torsprep
 from lib.structure import instab
 from lib import filesys
 from lib.submission import qchem_params
+from lib.submission import run_parallel
 
 
 def run_scan(zma, spc_info, mod_thy_info, thy_save_fs,
@@ -19,26 +20,52 @@ def run_scan(zma, spc_info, mod_thy_info, thy_save_fs,
              update_guess=True, reverse_sweep=True,
              saddle=False,
              constraint_dct=None, retryfail=True,
-             chkstab=False,
+             chkstab=False, njobs=1, grid_idxs=None,
              **kwargs):
     """ run constrained optimization scan
+
+        If grid_idxs are given, only those points of the grid are run.
+
+        The points of a relaxed scan are run in order, since each optimized
+        structure is the guess for the next point. The points of a rigid
+        scan do not depend on each other, so with njobs > 1 they are all
+        run at once, njobs at a time (with no reverse sweep).
     """
 
     # Build the SCANS/CSCANS filesystems
-    if constraint_dct is None:
-        scn_save_fs[1].create([coord_names])
-        print('coord_grids test:', coord_grids)
-        inf_obj = autofile.schema.info_objects.scan_branch(
-            dict(zip(coord_names, coord_grids)))
-        scn_save_fs[1].file.info.write(inf_obj, [coord_names])
-    else:
-        scn_save_fs[1].create([constraint_dct])
-        inf_obj = autofile.schema.info_objects.scan_branch(
-            dict(zip(coord_names, coord_grids)))
-        scn_save_fs[1].file.info.write(inf_obj, [constraint_dct])
+    _write_scan_info(scn_save_fs, coord_names, coord_grids, constraint_dct)
 
     # Build the grid of values
     _, grid_vals = torsprep.set_scan_dims(coord_grids)
+    if grid_idxs is not None:
+        grid_vals = tuple(grid_vals[idx] for idx in grid_idxs)
+
+    if scn_typ == 'rigid' and njobs > 1 and len(grid_vals) > 1:
+        print('\nRunning the {} points of the rigid scan, {} at a time...'
+              .format(len(grid_vals), njobs))
+        run_parallel(
+            _run_scan, [() for _ in grid_vals],
+            kwargs_lst=[
+                dict(guess_zma=zma,
+                     spc_info=spc_info,
+                     mod_thy_info=mod_thy_info,
+                     thy_save_fs=thy_save_fs,
+                     coord_names=coord_names,
+                     grid_vals=(vals,),
+                     scn_run_fs=scn_run_fs,
+                     scn_save_fs=scn_save_fs,
+                     scn_typ=scn_typ,
+                     script_str=script_str,
+                     overwrite=overwrite,
+                     retryfail=retryfail,
+                     update_guess=update_guess,
+                     saddle=saddle,
+                     constraint_dct=constraint_dct,
+                     chkstab=chkstab,
+                     **kwargs)
+                for vals in grid_vals],
+            nprocs=njobs)
+        return
 
     _run_scan(
         guess_zma=zma,
@@ -83,6 +110,22 @@ def run_scan(zma, spc_info, mod_thy_info, thy_save_fs,
         )
 
 
+def _write_scan_info(scn_save_fs, coord_names, coord_grids, constraint_dct):
+    """ Build the SCANS/CSCANS filesystems and write the info of the scan
+    """
+    if constraint_dct is None:
+        scn_save_fs[1].create([coord_names])
+        print('coord_grids test:', coord_grids)
+        inf_obj = autofile.schema.info_objects.scan_branch(
+            dict(zip(coord_names, coord_grids)))
+        scn_save_fs[1].file.info.write(inf_obj, [coord_names])
+    else:
+        scn_save_fs[1].create([constraint_dct])
+        inf_obj = autofile.schema.info_objects.scan_branch(
+            dict(zip(coord_names, coord_grids)))
+        scn_save_fs[1].file.info.write(inf_obj, [constraint_dct])
+
+
 def _run_scan(guess_zma, spc_info, mod_thy_info, thy_save_fs,
               coord_names, grid_vals,
               scn_run_fs, scn_save_fs, scn_typ,
@@ -193,8 +236,9 @@ def _run_scan(guess_zma, spc_info, mod_thy_info, thy_save_fs,
                 _, _ = es_runner.read_job(job=job, run_fs=run_fs)
 
                 # Write initial geos in run fs as they are needed later
-                run_fs[-1].file.zmatrix.write(zma, [job])
-                run_fs[-1].file.geometry.write(
+                filesys.cache.write(run_fs[-1].file.zmatrix, zma, [job])
+                filesys.cache.write(
+                    run_fs[-1].file.geometry,
                     automol.zmatrix.geometry(zma), [job])
 
 
@@ -318,32 +362,43 @@ def run_two_way_scan(ts_zma, ts_info, mod_var_scn_thy_info,
                      saddle=False,
                      constraint_dct=None,
                      retryfail=False,
+                     njobs=1,
                      **opt_kwargs):
     """ Run a two-part scan that goes into two directions, as for rxn path
+
+        The two parts start from the same structure, so with njobs > 1
+        they are run at the same time.
     """
 
-    # Setup and run the first part of the scan to shorter distances
-    for grid in (grid1, grid2):
-        run_scan(
-            zma=ts_zma,
-            spc_info=ts_info,
-            mod_thy_info=mod_var_scn_thy_info,
-            thy_save_fs=thy_save_fs,
-            coord_names=[coord_name],
-            coord_grids=[grid],
-            scn_run_fs=scn_run_fs,
-            scn_save_fs=scn_save_fs,
-            scn_typ='relaxed',
-            script_str=opt_script_str,
-            overwrite=overwrite,
-            update_guess=update_guess,
-            reverse_sweep=reverse_sweep,
-            saddle=saddle,
-            constraint_dct=constraint_dct,
-            retryfail=retryfail,
-            chkstab=False,
-            **opt_kwargs
-        )
+    # Run the parts of the scan to shorter and longer distances
+    scan_kwargs_lst = [
+        dict(zma=ts_zma,
+             spc_info=ts_info,
+             mod_thy_info=mod_var_scn_thy_info,
+             thy_save_fs=thy_save_fs,
+             coord_names=[coord_name],
+             coord_grids=[grid],
+             scn_run_fs=scn_run_fs,
+             scn_save_fs=scn_save_fs,
+             scn_typ='relaxed',
+             script_str=opt_script_str,
+             overwrite=overwrite,
+             update_guess=update_guess,
+             reverse_sweep=reverse_sweep,
+             saddle=saddle,
+             constraint_dct=constraint_dct,
+             retryfail=retryfail,
+             chkstab=False,
+             **opt_kwargs)
+        for grid in (grid1, grid2)]
+    if njobs > 1:
+        run_parallel(run_scan, [(), ()], kwargs_lst=scan_kwargs_lst,
+                     nprocs=njobs)
+        # Leave the info of the second part, as for a sequential run
+        _write_scan_info(scn_save_fs, [coord_name], [grid2], constraint_dct)
+    else:
+        for scan_kwargs in scan_kwargs_lst:
+            run_scan(**scan_kwargs)
 
     print('\nSaving the scans...')
     if constraint_dct is None:
@@ -371,7 +426,7 @@ def multiref_rscan(ts_zma, ts_info,
                    vscnlvl_thy_save_fs,
                    scn_run_fs, scn_save_fs,
                    overwrite, update_guess=True,
-                   constraint_dct=None,
+                   constraint_dct=None, njobs=1,
                    **cas_kwargs):
     """ run constrained optimization scan
     """
@@ -394,6 +449,7 @@ def multiref_rscan(ts_zma, ts_info,
         saddle=False,
         constraint_dct=constraint_dct,
         retryfail=False,
+        njobs=njobs,
         **opt_kwargs
     )
 
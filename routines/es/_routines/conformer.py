@@ -10,10 +10,15 @@ from phydat import bnd
 from routines.es._routines import _util as util
 from routines.es import runner as es_runner
 from lib import filesys
+from lib.submission import run_parallel
 from lib.structure import geom as geomprep
 from lib.structure import ts as tsprep
 
 
+# Energy window for finding saved conformers a new one could match
+ETOL = 2.0e-5
+
+
 def conformer_sampling(zma, spc_info,
                        mod_thy_info, thy_save_fs,
                        cnf_run_fs, cnf_save_fs,
@@ -21,9 +26,9 @@ def conformer_sampling(zma, spc_info,
                        saddle=False, nsamp_par=(False, 3, 3, 1, 50, 50),
                        tors_names='',
                        two_stage=False, retryfail=True,
-                       rxn_class='', **kwargs):
+                       rxn_class='', njobs=1, **kwargs):
     """ Find the minimum energy conformer by optimizing from nsamp random
-    initial torsional states
+    initial torsional states; njobs samples are optimized at once
     """
 
     ich = spc_info[0]
@@ -71,6 +76,7 @@ def conformer_sampling(zma, spc_info,
         saddle=saddle,
         two_stage=two_stage,
         retryfail=retryfail,
+        njobs=njobs,
         **kwargs,
     )
 
@@ -95,11 +101,12 @@ def conformer_sampling(zma, spc_info,
             # print(automol.zmatrix.string(automol.geom.zmatrix(geo)))
             # assert automol.zmatrix.almost_equal(
             #  zma, automol.geom.zmatrix(geo))
-            thy_save_fs[-1].file.geometry.write(geo, mod_thy_info[1:4])
+            filesys.cache.write(
+                thy_save_fs[-1].file.geometry, geo, mod_thy_info[1:4])
             # thy_save_fs[-1].file.zmatrix.write(zma, mod_thy_info[1:4])
         else:
             # thy_save_fs[0].file.zmatrix.write(geo)
-            thy_save_fs[0].file.geometry.write(geo)
+            filesys.cache.write(thy_save_fs[0].file.geometry, geo)
 
     return bool(min_cnf_locs)
 
@@ -144,19 +151,18 @@ def single_conformer(zma, spc_info, mod_thy_info,
         ene = elstruct.reader.energy(prog, method, out_str)
         geo = elstruct.reader.opt_geometry(prog, out_str)
         zma = elstruct.reader.opt_zmatrix(prog, out_str)
-        saved_locs, saved_geos, saved_enes = _saved_cnf_info(
-            cnf_save_fs, mod_thy_info)
+        cnf_idx, _ = filesys.cnfidx.read(cnf_save_fs, mod_thy_info)
+        geo_cands = filesys.cnfidx.window(cnf_idx, ene, ETOL, geo=geo)
+        cands = filesys.cnfidx.window(cnf_idx, ene, ETOL)
 
-        if _geo_unique(geo, ene, saved_geos, saved_enes, saddle):
-            sym_id = _sym_unique(
-                geo, ene, saved_geos, saved_enes)
+        if _geo_unique(geo, ene, cnf_idx, geo_cands, saddle):
+            sym_id = _sym_unique(geo, ene, cnf_idx, cands)
             if sym_id is None:
                 _save_unique_conformer(
                     ret, mod_thy_info, cnf_save_fs, locs,
                     saddle=saddle, zma_locs=(0,))
-                saved_geos.append(geo)
-                saved_enes.append(ene)
-                saved_locs.append(locs)
+                filesys.cnfidx.add(cnf_idx, locs, geo, ene)
+                filesys.cnfidx.write(cnf_save_fs, mod_thy_info, cnf_idx)
 
         # Update the conformer trajectory file
         print('')
@@ -166,9 +172,12 @@ def single_conformer(zma, spc_info, mod_thy_info,
 def run_conformers(
         zma, spc_info, thy_info, nsamp, tors_range_dct,
         cnf_run_fs, cnf_save_fs, script_str, overwrite,
-        saddle, two_stage, retryfail,
+        saddle, two_stage, retryfail, njobs=1,
         **kwargs):
     """ run sampling algorithm to find conformers
+
+        samples are run in batches of njobs optimizations that are run
+        at the same time, with the sample count updated once per batch
     """
     if not tors_range_dct:
         print(" - No torsional coordinates. Setting nsamp to 1.")
@@ -184,15 +193,7 @@ def run_conformers(
     #     assert vma == existing_vma
     # cnf_save_fs[0].file.vmatrix.write(vma)
     nsamp0 = nsamp
-    inf_obj = autofile.schema.info_objects.conformer_trunk(0)
-    if cnf_save_fs[0].file.info2.exists():
-        inf_obj_s = cnf_save_fs[0].file.info2.read()
-        nsampd = inf_obj_s.nsamp
-    elif cnf_run_fs[0].file.info2.exists():
-        inf_obj_r = cnf_run_fs[0].file.info2.read()
-        nsampd = inf_obj_r.nsamp
-    else:
-        nsampd = 0
+    nsampd = _read_nsampd(cnf_run_fs, cnf_save_fs)
 
     tot_samp = nsamp - nsampd
     print(' - Number of samples that have been currently run:', nsampd)
@@ -209,73 +210,98 @@ def run_conformers(
                   'Conformer search complete.')
             break
 
-        # Run the conformer sampling
-        if nsampd > 0:
-            samp_zma, = automol.zmatrix.samples(zma, 1, tors_range_dct)
-        else:
-            samp_zma = zma
-
-        print('\nChecking if ZMA has high repulsion...')
-        # print('zma tests:',
-        #         automol.zmatrix.string(zma), automol.zmatrix.string(zma))
-        bad_geom_count = 0
-        while (not automol.intmol.low_repulsion_struct(zma, samp_zma) and
-               bad_geom_count < 1000):
-            print('  ZMA has high repulsion.')
-            # print('  Bad geometry:')
-            # print(automol.geom.string(automol.zmatrix.geometry(samp_zma)))
-            print('\n  Generating new sample ZMA')
-            samp_zma, = automol.zmatrix.samples(zma, 1, tors_range_dct)
-            bad_geom_count += 1
-        print('  ZMA is fine...')
-
-        cid = autofile.schema.generate_new_conformer_id()
-        locs = [cid]
-
-        cnf_run_fs[-1].create(locs)
-        cnf_run_path = cnf_run_fs[-1].path(locs)
-        run_fs = autofile.fs.run(cnf_run_path)
-
-        print("Run {}/{}".format(samp_idx, tot_samp))
-        tors_names = list(tors_range_dct.keys())
-        if two_stage and tors_names:
-            print('Stage one beginning, holding the coordinates constant',
-                  tors_names)
-            es_runner.run_job(
-                job=elstruct.Job.OPTIMIZATION,
-                script_str=script_str,
-                run_fs=run_fs,
-                geom=samp_zma,
-                spc_info=spc_info,
-                thy_info=thy_info,
-                overwrite=overwrite,
-                frozen_coordinates=[tors_names],
-                saddle=saddle,
-                retryfail=retryfail,
-                **kwargs
-            )
-            # print('Stage one success, reading for stage 2')
-            success, ret = es_runner.read_job(
-                job=elstruct.Job.OPTIMIZATION, run_fs=run_fs)
-            if success:
-                sinf_obj, _, out_str = ret
-                prog = sinf_obj.prog
-                samp_zma = elstruct.reader.opt_zmatrix(prog, out_str)
-                print('Stage one success beginning stage two')
-                # print('Stage one success beginning stage two on', samp_zma)
-                es_runner.run_job(
-                    job=elstruct.Job.OPTIMIZATION,
-                    script_str=script_str,
-                    run_fs=run_fs,
-                    geom=samp_zma,
-                    spc_info=spc_info,
-                    thy_info=thy_info,
-                    overwrite=overwrite,
-                    saddle=saddle,
-                    retryfail=False,
-                    **kwargs
-                )
+        # Generate the batch of samples and their run filesystems
+        samp_zmas = []
+        run_fss = []
+        for _ in range(max(min(njobs, nsamp), 1)):
+            if nsampd > 0 or samp_zmas:
+                samp_zma, = automol.zmatrix.samples(zma, 1, tors_range_dct)
+            else:
+                samp_zma = zma
+            samp_zmas.append(_low_repulsion_sample(
+                zma, samp_zma, tors_range_dct))
+
+            cid = autofile.schema.generate_new_conformer_id()
+            locs = [cid]
+
+            cnf_run_fs[-1].create(locs)
+            cnf_run_path = cnf_run_fs[-1].path(locs)
+            run_fss.append(autofile.fs.run(cnf_run_path))
+
+        # Run the optimizations for the batch
+        samp_args_lst = [
+            (samp_zma, run_fs, spc_info, thy_info, tors_range_dct,
+             script_str, overwrite, saddle, two_stage, retryfail)
+            for samp_zma, run_fs in zip(samp_zmas, run_fss)]
+        if len(samp_args_lst) == 1:
+            print("Run {}/{}".format(samp_idx, tot_samp))
+            _run_conformer_sample(*samp_args_lst[0], **kwargs)
         else:
+            print("Runs {}-{}/{}".format(
+                samp_idx, samp_idx+len(samp_args_lst)-1, tot_samp))
+            run_parallel(
+                _run_conformer_sample, samp_args_lst,
+                kwargs_lst=[kwargs for _ in samp_args_lst],
+                nprocs=njobs)
+
+        nsampd = _add_nsampd(cnf_run_fs, cnf_save_fs, len(samp_args_lst))
+        samp_idx += len(samp_args_lst)
+
+
+def _low_repulsion_sample(zma, samp_zma, tors_range_dct):
+    """ Resample the torsions of a sampled zma until it no longer
+        has a high repulsion (up to 1000 tries)
+    """
+
+    print('\nChecking if ZMA has high repulsion...')
+    # print('zma tests:',
+    #         automol.zmatrix.string(zma), automol.zmatrix.string(zma))
+    bad_geom_count = 0
+    while (not automol.intmol.low_repulsion_struct(zma, samp_zma) and
+           bad_geom_count < 1000):
+        print('  ZMA has high repulsion.')
+        # print('  Bad geometry:')
+        # print(automol.geom.string(automol.zmatrix.geometry(samp_zma)))
+        print('\n  Generating new sample ZMA')
+        samp_zma, = automol.zmatrix.samples(zma, 1, tors_range_dct)
+        bad_geom_count += 1
+    print('  ZMA is fine...')
+
+    return samp_zma
+
+
+def _run_conformer_sample(samp_zma, run_fs, spc_info, thy_info,
+                          tors_range_dct, script_str, overwrite,
+                          saddle, two_stage, retryfail, **kwargs):
+    """ Run the optimization(s) for a single conformer sample
+    """
+
+    tors_names = list(tors_range_dct.keys())
+    if two_stage and tors_names:
+        print('Stage one beginning, holding the coordinates constant',
+              tors_names)
+        es_runner.run_job(
+            job=elstruct.Job.OPTIMIZATION,
+            script_str=script_str,
+            run_fs=run_fs,
+            geom=samp_zma,
+            spc_info=spc_info,
+            thy_info=thy_info,
+            overwrite=overwrite,
+            frozen_coordinates=[tors_names],
+            saddle=saddle,
+            retryfail=retryfail,
+            **kwargs
+        )
+        # print('Stage one success, reading for stage 2')
+        success, ret = es_runner.read_job(
+            job=elstruct.Job.OPTIMIZATION, run_fs=run_fs)
+        if success:
+            sinf_obj, _, out_str = ret
+            prog = sinf_obj.prog
+            samp_zma = elstruct.reader.opt_zmatrix(prog, out_str)
+            print('Stage one success beginning stage two')
+            # print('Stage one success beginning stage two on', samp_zma)
             es_runner.run_job(
                 job=elstruct.Job.OPTIMIZATION,
                 script_str=script_str,
@@ -285,22 +311,52 @@ def run_conformers(
                 thy_info=thy_info,
                 overwrite=overwrite,
                 saddle=saddle,
-                retryfail=retryfail,
+                retryfail=False,
                 **kwargs
             )
+    else:
+        es_runner.run_job(
+            job=elstruct.Job.OPTIMIZATION,
+            script_str=script_str,
+            run_fs=run_fs,
+            geom=samp_zma,
+            spc_info=spc_info,
+            thy_info=thy_info,
+            overwrite=overwrite,
+            saddle=saddle,
+            retryfail=retryfail,
+            **kwargs
+        )
+
+
+def _read_nsampd(cnf_run_fs, cnf_save_fs):
+    """ Read the number of conformer samples run so far
+    """
+    if cnf_save_fs[0].file.info2.exists():
+        inf_obj_s = cnf_save_fs[0].file.info2.read()
+        nsampd = inf_obj_s.nsamp
+    elif cnf_run_fs[0].file.info2.exists():
+        inf_obj_r = cnf_run_fs[0].file.info2.read()
+        nsampd = inf_obj_r.nsamp
+    else:
+        nsampd = 0
+
+    return nsampd
+
 
-        if cnf_save_fs[0].file.info2.exists():
-            inf_obj_s = cnf_save_fs[0].file.info2.read()
-            nsampd = inf_obj_s.nsamp
-        elif cnf_run_fs[0].file.info2.exists():
-            inf_obj_r = cnf_run_fs[0].file.info2.read()
-            nsampd = inf_obj_r.nsamp
-        nsampd += 1
-        samp_idx += 1
+def _add_nsampd(cnf_run_fs, cnf_save_fs, nadd):
+    """ Add to the number of conformer samples run so far, holding a lock
+        on the save filesystem so concurrent updates are not lost
+    """
+    with filesys.locked(cnf_save_fs[0].path()):
+        nsampd = _read_nsampd(cnf_run_fs, cnf_save_fs) + nadd
+        inf_obj = autofile.schema.info_objects.conformer_trunk(0)
         inf_obj.nsamp = nsampd
         cnf_save_fs[0].file.info2.write(inf_obj)
         cnf_run_fs[0].file.info2.write(inf_obj)
 
+    return nsampd
+
 
 def save_conformers(cnf_run_fs, cnf_save_fs, thy_info, saddle=False,
                     rxn_class='', orig_ich=''):
@@ -309,11 +365,14 @@ def save_conformers(cnf_run_fs, cnf_save_fs, thy_info, saddle=False,
         # may need to get geo, ene, etc; maybe make function
     """
 
-    saved_locs, saved_geos, saved_enes = _saved_cnf_info(
-        cnf_save_fs, thy_info)
+    # Only conformers new to the index need to have their inchi checked
+    cnf_idx, new_locs = filesys.cnfidx.read(cnf_save_fs, thy_info)
 
     if not saddle:
-        _check_old_inchi(orig_ich, saved_geos, saved_locs, cnf_save_fs)
+        new_geos = [geo for locs, geo in zip(cnf_idx['locs'], cnf_idx['geos'])
+                    if locs in new_locs]
+        new_locs = [locs for locs in cnf_idx['locs'] if locs in new_locs]
+        _check_old_inchi(orig_ich, new_geos, new_locs, cnf_save_fs)
 
     if not cnf_run_fs[0].exists():
         print(" - No conformers in run filesys to save.")
@@ -350,23 +409,25 @@ def save_conformers(cnf_run_fs, cnf_save_fs, thy_info, saddle=False,
                     # Assess viability of transition state conformer
 
                     # Determine uniqueness of conformer, save if needed
-                    if _geo_unique(geo, ene, saved_geos, saved_enes, saddle):
+                    geo_cands = filesys.cnfidx.window(
+                        cnf_idx, ene, ETOL, geo=geo)
+                    cands = filesys.cnfidx.window(cnf_idx, ene, ETOL)
+                    if _geo_unique(geo, ene, cnf_idx, geo_cands, saddle):
                         # iso check breaks because of zma location
                         # if _is_proper_isomer(cnf_save_fs, zma):
-                        sym_id = _sym_unique(
-                            geo, ene, saved_geos, saved_enes)
+                        sym_id = _sym_unique(geo, ene, cnf_idx, cands)
                         if sym_id is None:
                             _save_unique_conformer(
                                 ret, thy_info, cnf_save_fs,
                                 locs, saddle=saddle)
-                            saved_geos.append(geo)
-                            saved_enes.append(ene)
-                            saved_locs.append(locs)
+                            filesys.cnfidx.add(cnf_idx, locs, geo, ene)
                         else:
-                            sym_locs = saved_locs[sym_id]
+                            sym_locs = cnf_idx['locs'][sym_id]
                             _save_sym_indistinct_conformer(
                                 geo, cnf_save_fs, locs, sym_locs)
 
+        filesys.cnfidx.write(cnf_save_fs, thy_info, cnf_idx)
+
         # Update the conformer trajectory file
         print('')
         filesys.mincnf.traj_sort(cnf_save_fs, thy_info)
@@ -395,10 +456,13 @@ def _geo_connected(geo, saddle):
     return connected
 
 
-def _geo_unique(geo, ene, seen_geos, seen_enes, saddle):
-    """ Assess if a geometry is unique to saved geos
+def _geo_unique(geo, ene, cnf_idx, cands, saddle):
+    """ Assess if a geometry is unique to the saved geos at the
+        candidate positions of the conformer index
     """
 
+    seen_geos = [cnf_idx['geos'][idx] for idx in cands]
+    seen_enes = [cnf_idx['enes'][idx] for idx in cands]
     unique = geomprep.is_unique_tors_dist_mat_energy(
         geo, ene, seen_geos, seen_enes, saddle)
     if not unique:
@@ -439,17 +503,17 @@ def _check_old_inchi(orig_ich, seen_geos, saved_locs, cnf_save_fs):
             print(cnf_save_fs[-1].path(saved_locs[i]))
 
 
-def _sym_unique(geo, ene, saved_geos, saved_enes, ethresh=1.0e-5):
+def _sym_unique(geo, ene, cnf_idx, cands, ethresh=1.0e-5):
     """ Check if a conformer is symmetrically distinct from the
-        existing conformers in the filesystem
+        existing conformers at the candidate positions of the conformer
+        index, using their saved Coulomb spectra
     """
 
+    spec = automol.geom.coulomb_spectrum(geo)
     sym_idx = None
-    for idx, (geoi, enei) in enumerate(zip(saved_geos, saved_enes)):
-        if abs(enei - ene) < ethresh:
-            unique = geomprep.is_unique_coulomb_energy(
-                geo, ene, [geoi], [enei])
-            if not unique:
+    for idx in cands:
+        if abs(cnf_idx['enes'][idx] - ene) < ethresh:
+            if numpy.allclose(spec, cnf_idx['specs'][idx], rtol=1e-2):
                 sym_idx = idx
 
     if sym_idx is not None:
@@ -720,15 +784,15 @@ def _save_unique_conformer(ret, thy_info, cnf_save_fs, locs,
     cnf_save_fs[-1].create(locs)
     cnf_save_fs[-1].file.geometry_info.write(inf_obj, locs)
     cnf_save_fs[-1].file.geometry_input.write(inp_str, locs)
-    cnf_save_fs[-1].file.energy.write(ene, locs)
-    cnf_save_fs[-1].file.geometry.write(geo, locs)
+    filesys.cache.write(cnf_save_fs[-1].file.energy, ene, locs)
+    filesys.cache.write(cnf_save_fs[-1].file.geometry, geo, locs)
 
     # Build the zma filesystem and save the z-matrix
     zma_save_fs = fs.zmatrix(cnf_save_path)
     zma_save_fs[-1].create(zma_locs)
     zma_save_fs[-1].file.geometry_info.write(inf_obj, zma_locs)
     zma_save_fs[-1].file.geometry_input.write(inp_str, zma_locs)
-    zma_save_fs[-1].file.zmatrix.write(zma, zma_locs)
+    filesys.cache.write(zma_save_fs[-1].file.zmatrix, zma, zma_locs)
 
     # Save the tra and gra for a saddle
     if saddle:
@@ -741,7 +805,8 @@ def _save_unique_conformer(ret, thy_info, cnf_save_fs, locs,
     sp_save_fs[-1].create(thy_info[1:4])
     sp_save_fs[-1].file.input.write(inp_str, thy_info[1:4])
     sp_save_fs[-1].file.info.write(inf_obj, thy_info[1:4])
-    sp_save_fs[-1].file.energy.write(ene, thy_info[1:4])
+    filesys.cache.write(sp_save_fs[-1].file.energy, ene, thy_info[1:4])
+    filesys.spcdb.record(cnf_save_fs, locs, thy_info, ene)
 
 
 def _save_sym_indistinct_conformer(geo, cnf_save_fs,
@@ -759,23 +824,6 @@ def _save_sym_indistinct_conformer(geo, cnf_save_fs,
     print(" - Saving structure in a sym directory at path {}".format(
         sym_save_path))
     sym_save_fs[-1].create(cnf_tosave_locs)
-    sym_save_fs[-1].file.geometry.write(geo, cnf_tosave_locs)
+    filesys.cache.write(sym_save_fs[-1].file.geometry, geo, cnf_tosave_locs)
     # sym_save_fs[-1].file.energy.write(ene, cnf_tosave_locs)
     # sym_save_fs[-1].file.zmatrix.write(zma, cnf_tosave_locs)
-
-
-def _saved_cnf_info(cnf_save_fs, mod_thy_info):
-    """ get the locs, geos and enes for saved conformers
-    """
-
-    saved_locs = list(cnf_save_fs[-1].existing())
-    saved_geos = [cnf_save_fs[-1].file.geometry.read(locs)
-                  for locs in saved_locs]
-    saved_enes = []
-    for locs in saved_locs:
-        path = cnf_save_fs[-1].path(locs)
-        sp_save_fs = autofile.fs.single_point(path)
-        saved_enes.append(sp_save_fs[-1].file.energy.read(
-            mod_thy_info[1:4]))
-
-    return saved_locs, saved_geos, saved_enes
@@ -134,6 +134,7 @@ def _obtain_ini_geom(spc_dct_i, ini_thy_save_path,
             cnf_path = ini_cnf_save_fs[-1].path(locs)
             print('Removing {}'.format(cnf_path))
             shutil.rmtree(cnf_path)
+            filesys.cache.invalidate(cnf_path)
 
     if geo_init is None:
         if 'geo_inp' in spc_dct_i:
@@ -293,7 +294,8 @@ def _optimize_molecule(spc_info, zma_init,
     if conf_found:
         thy_save_fs[-1].create(mod_thy_info[1:4])
         thy_save_path = thy_save_fs[-1].path(mod_thy_info[1:4])
-        thy_save_fs[-1].file.geometry.write(geo, mod_thy_info[1:4])
+        filesys.cache.write(
+            thy_save_fs[-1].file.geometry, geo, mod_thy_info[1:4])
 
         print('Saving reference geometry')
         print(" - Save path: {}".format(thy_save_path))
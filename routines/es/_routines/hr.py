@@ -5,6 +5,7 @@ import itertools
 from routines.es._routines import _scan as scan
 from lib import filesys
 from lib.structure import tors as torsprep
+from lib.submission import run_parallel
 
 
 def hindered_rotor_scans(
@@ -14,8 +15,17 @@ def hindered_rotor_scans(
         script_str, overwrite,
         scn_typ='relaxed',
         saddle=False, const_names=None,
-        retryfail=True, chkstab=None, **opt_kwargs):
+        retryfail=True, chkstab=None, njobs=1, adapt=False,
+        **opt_kwargs):
     """ Perform scans over each of the torsional coordinates
+
+        The scans of the rotors do not depend on each other, so with
+        njobs > 1 they are run at the same time, with any jobs left over
+        given to the points of rigid scans.
+
+        With adapt, the 1D rotors are scanned on an adaptive grid: only
+        the points needed to resolve the potential are run, and the rest
+        are left to be filled in when the potential is read.
     """
 
     # Set appropriate value for check stability
@@ -30,39 +40,68 @@ def hindered_rotor_scans(
         if set(list(itertools.chain(*run_tors_names))) == set(const_names):
             print('\nUser requested all torsions of system will be fixed.')
 
-    # for tors_name, tors_grid in zip(tors_names, tors_grids):
-    for tors_names, tors_grids in zip(run_tors_names, run_tors_grids):
-
-        print('\nRunning Rotor: {}...'.format(tors_names))
-
-        # Setting the constraints
-        constraint_dct = torsprep.build_constraint_dct(
-            zma, const_names, tors_names)
-
-        # Setting the filesystem
-        # print('hr constraint dct', constraint_dct)
-        scn_run_fs = filesys.build.scn_fs_from_cnf(
-            zma_run_path, constraint_dct=constraint_dct)
-        scn_save_fs = filesys.build.scn_fs_from_cnf(
-            zma_save_path, constraint_dct=constraint_dct)
-
-        print('\nSaving any HR in run filesys...')
-        if constraint_dct is None:
-            scan.save_scan(
-                scn_run_fs=scn_run_fs,
-                scn_save_fs=scn_save_fs,
-                scn_typ=scn_typ,
-                coo_names=tors_names,
-                mod_thy_info=mod_thy_info,
-                in_zma_fs=True)
-        else:
-            scan.save_cscan(
-                cscn_run_fs=scn_run_fs,
-                cscn_save_fs=scn_save_fs,
-                scn_typ=scn_typ,
-                constraint_dct=constraint_dct,
-                mod_thy_info=mod_thy_info,
-                in_zma_fs=True)
+    rotor_kwargs_lst = [
+        dict(zma=zma,
+             spc_info=spc_info,
+             mod_thy_info=mod_thy_info,
+             thy_save_fs=thy_save_fs,
+             zma_run_path=zma_run_path,
+             zma_save_path=zma_save_path,
+             tors_names=tors_names,
+             tors_grids=tors_grids,
+             script_str=script_str,
+             overwrite=overwrite,
+             scn_typ=scn_typ,
+             saddle=saddle,
+             const_names=const_names,
+             retryfail=retryfail,
+             chkstab=chkstab,
+             adapt=adapt,
+             **opt_kwargs)
+        for tors_names, tors_grids in zip(run_tors_names, run_tors_grids)]
+
+    if njobs > 1 and len(rotor_kwargs_lst) > 1:
+        nrotor_jobs = min(njobs, len(rotor_kwargs_lst))
+        for rotor_kwargs in rotor_kwargs_lst:
+            rotor_kwargs['njobs'] = max(njobs // nrotor_jobs, 1)
+        run_parallel(_rotor_scan, [() for _ in rotor_kwargs_lst],
+                     kwargs_lst=rotor_kwargs_lst, nprocs=nrotor_jobs)
+    else:
+        for rotor_kwargs in rotor_kwargs_lst:
+            _rotor_scan(njobs=njobs, **rotor_kwargs)
+
+
+def _rotor_scan(zma, spc_info, mod_thy_info, thy_save_fs,
+                zma_run_path, zma_save_path,
+                tors_names, tors_grids,
+                script_str, overwrite,
+                scn_typ, saddle, const_names,
+                retryfail, chkstab, njobs=1, adapt=False, **opt_kwargs):
+    """ Save, run and save again the scan of a single rotor
+    """
+
+    print('\nRunning Rotor: {}...'.format(tors_names))
+
+    # Setting the constraints
+    constraint_dct = torsprep.build_constraint_dct(
+        zma, const_names, tors_names)
+
+    # Setting the filesystem
+    # print('hr constraint dct', constraint_dct)
+    scn_run_fs = filesys.build.scn_fs_from_cnf(
+        zma_run_path, constraint_dct=constraint_dct)
+    scn_save_fs = filesys.build.scn_fs_from_cnf(
+        zma_save_path, constraint_dct=constraint_dct)
+
+    print('\nSaving any HR in run filesys...')
+    _save_rotor_scan(scn_run_fs, scn_save_fs, scn_typ,
+                     tors_names, constraint_dct, mod_thy_info)
+
+    # Run the whole grid, or for 1D rotors the points chosen adaptively
+    grid_idxs_lst = _adapt_grid_idxs(
+        scn_save_fs, tors_names, tors_grids, constraint_dct, mod_thy_info,
+        adapt=(adapt and len(tors_names) == 1))
+    for grid_idxs in grid_idxs_lst:
 
         print('\nRunning any HR Scans if needed...')
         scan.run_scan(
@@ -83,23 +122,61 @@ def hindered_rotor_scans(
             constraint_dct=constraint_dct,
             retryfail=retryfail,
             chkstab=chkstab,
+            njobs=njobs,
+            grid_idxs=grid_idxs,
             **opt_kwargs
         )
 
         print('\nSaving any newly run HR scans in run filesys...')
-        if constraint_dct is None:
-            scan.save_scan(
-                scn_run_fs=scn_run_fs,
-                scn_save_fs=scn_save_fs,
-                scn_typ=scn_typ,
-                coo_names=tors_names,
-                mod_thy_info=mod_thy_info,
-                in_zma_fs=True)
-        else:
-            scan.save_cscan(
-                cscn_run_fs=scn_run_fs,
-                cscn_save_fs=scn_save_fs,
-                scn_typ=scn_typ,
-                constraint_dct=constraint_dct,
-                mod_thy_info=mod_thy_info,
-                in_zma_fs=True)
+        _save_rotor_scan(scn_run_fs, scn_save_fs, scn_typ,
+                         tors_names, constraint_dct, mod_thy_info)
+
+
+def _adapt_grid_idxs(scn_save_fs, tors_names, tors_grids, constraint_dct,
+                     mod_thy_info, adapt=False):
+    """ Generate the points of the grid to run in each pass of a scan:
+        the whole grid at once, or for an adaptive scan a coarse grid
+        followed by the points where the potential is not yet resolved,
+        read from the save filesystem after each pass
+    """
+
+    if not adapt:
+        yield None
+    else:
+        _, grid_vals = torsprep.set_scan_dims(tors_grids)
+        grid_idxs = torsprep.adapt_ini_idxs(len(grid_vals))
+        ran_idxs, pot = set(), None
+        while grid_idxs:
+            print('\nAdaptive HR scan: running {} of {} grid points...'
+                  .format(len(grid_idxs), len(grid_vals)))
+            yield grid_idxs
+            ran_idxs.update(grid_idxs)
+            _, enes = torsprep.read_scan_enes(
+                scn_save_fs, tors_names, grid_vals, constraint_dct,
+                mod_thy_info)
+            grid_idxs, pot = torsprep.adapt_next_idxs(
+                enes, ran_idxs, prev_pot=pot)
+        print('\nAdaptive HR scan converged with {} of {} grid points run'
+              .format(len(ran_idxs), len(grid_vals)))
+
+
+def _save_rotor_scan(scn_run_fs, scn_save_fs, scn_typ,
+                     tors_names, constraint_dct, mod_thy_info):
+    """ Save the scan of a rotor from the run filesystem
+    """
+    if constraint_dct is None:
+        scan.save_scan(
+            scn_run_fs=scn_run_fs,
+            scn_save_fs=scn_save_fs,
+            scn_typ=scn_typ,
+            coo_names=tors_names,
+            mod_thy_info=mod_thy_info,
+            in_zma_fs=True)
+    else:
+        scan.save_cscan(
+            cscn_run_fs=scn_run_fs,
+            cscn_save_fs=scn_save_fs,
+            scn_typ=scn_typ,
+            constraint_dct=constraint_dct,
+            mod_thy_info=mod_thy_info,
+            in_zma_fs=True)
@@ -5,6 +5,7 @@ IRC calcs
 import elstruct
 import autofile
 from routines.es import runner as es_runner
+from lib import filesys
 
 
 def scan(zma, ts_info, mod_ini_thy_info, coord_name,
@@ -110,15 +111,19 @@ def save_irc(irc_job, coord_name,
 
             # Save files
             ini_scn_save_fs[-1].create(locs)
-            ini_scn_save_fs[-1].file.energy.write(enes[idx], locs)
-            ini_scn_save_fs[-1].file.geometry.write(geos[idx], locs)
+            filesys.cache.write(
+                ini_scn_save_fs[-1].file.energy, enes[idx], locs)
+            filesys.cache.write(
+                ini_scn_save_fs[-1].file.geometry, geos[idx], locs)
             ini_scn_save_fs[-1].file.geometry_input.write(inp_str, locs)
             ini_scn_save_fs[-1].file.geometry_info.write(inf_obj, locs)
             if gras:
-                ini_scn_save_fs[-1].file.gradient.write(gras[idx], locs)
+                filesys.cache.write(
+                    ini_scn_save_fs[-1].file.gradient, gras[idx], locs)
                 ini_scn_save_fs[-1].file.gradient_info.write(inf_obj, locs)
             if hessians:
-                ini_scn_save_fs[-1].file.hessian.write(hessians[idx], locs)
+                filesys.cache.write(
+                    ini_scn_save_fs[-1].file.hessian, hessians[idx], locs)
                 ini_scn_save_fs[-1].file.hessian_info.write(inf_obj, locs)
 
             scn_save_path = ini_scn_save_fs[-1].path(locs)
@@ -127,7 +132,8 @@ def save_irc(irc_job, coord_name,
             sp_save_fs[-1].create(mod_ini_thy_info[1:4])
             sp_save_fs[-1].file.input.write(inp_str, mod_ini_thy_info[1:4])
             sp_save_fs[-1].file.info.write(inf_obj, mod_ini_thy_info[1:4])
-            sp_save_fs[-1].file.energy.write(enes[idx], mod_ini_thy_info[1:4])
+            filesys.cache.write(
+                sp_save_fs[-1].file.energy, enes[idx], mod_ini_thy_info[1:4])
 
 
 def _irc_ran(ini_scn_save_fs, coord_name, irc_job):
@@ -8,6 +8,8 @@ from phydat import phycon
 from phydat import symm
 from routines.es import runner as es_runner
 from lib import structure
+from lib import filesys
+from lib.submission import run_parallel
 
 
 # _JSON_SAVE = ['TAU']
@@ -17,13 +19,10 @@ _JSON_SAVE = []
 def run_energy(zma, geo, spc_info, thy_info,
                geo_save_fs, geo_run_path, geo_save_path, locs,
                script_str, overwrite,
-               retryfail=True, highspin=False, **kwargs):
-    """ Find the energy for the given structure
+               retryfail=True, highspin=False, record=True, **kwargs):
+    """ Find the energy for the given structure; None if it failed
     """
 
-    # geo_save_fs and locs unneeded for this
-    _, _ = geo_save_fs, locs
-
     # Prepare unique filesystem since many energies may be under same directory
     if not highspin:
         sp_run_fs = autofile.fs.single_point(geo_run_path)
@@ -54,6 +53,7 @@ def run_energy(zma, geo, spc_info, thy_info,
     else:
         _run = False
 
+    ene = None
     if _run:
 
         # Add options matrix for energy runs for molpro
@@ -92,15 +92,96 @@ def run_energy(zma, geo, spc_info, thy_info,
             print(" - Saving energy...")
             sp_save_fs[-1].file.input.write(inp_str, thy_info[1:4])
             sp_save_fs[-1].file.info.write(inf_obj, thy_info[1:4])
-            sp_save_fs[-1].file.energy.write(ene, thy_info[1:4])
+            filesys.cache.write(sp_save_fs[-1].file.energy, ene, thy_info[1:4])
             print(" - Save path: {}".format(sp_save_path))
 
+            # Keep the index database of the structures in sync
+            if (record and not highspin and
+                    geo_save_fs[-1].path(locs) == geo_save_path):
+                filesys.spcdb.record(geo_save_fs, locs, thy_info, ene)
+
     else:
         print('Energy found and saved previously at {}'.format(
             sp_save_path))
         ene = sp_save_fs[-1].file.energy.read(thy_info[1:4])
         print("Energy: {}".format(ene))
 
+    return ene
+
+
+def run_energies(spc_info, thy_info,
+                 cnf_save_fs, cnf_run_fs, locs_lst,
+                 script_str, overwrite,
+                 retryfail=True, njobs=1, **kwargs):
+    """ Find the energies for an ensemble of conformers
+
+        Conformers that already have an energy (found with one query of
+        the index database, if it is used) are skipped, and the rest are
+        run as one batch, njobs at a time. The new energies are added to
+        the index database at once.
+    """
+
+    # Find the conformers with no energy
+    if overwrite:
+        run_locs_lst = list(locs_lst)
+    else:
+        if filesys.spcdb.is_active():
+            enes = filesys.spcdb.energies(cnf_save_fs, locs_lst, thy_info)
+        else:
+            enes = [_saved_energy(cnf_save_fs, locs, thy_info)
+                    for locs in locs_lst]
+        run_locs_lst = [locs for locs, ene in zip(locs_lst, enes)
+                        if ene is None]
+    print('\nEnergies found for {} of {} conformers, running {}...'.format(
+        len(locs_lst) - len(run_locs_lst), len(locs_lst), len(run_locs_lst)))
+
+    for locs in run_locs_lst:
+        cnf_run_fs[-1].create(locs)
+
+    # Run the energies of the conformers
+    args_lst = [(locs, spc_info, thy_info, cnf_save_fs, cnf_run_fs,
+                 script_str, overwrite, retryfail)
+                for locs in run_locs_lst]
+    if njobs > 1 and len(args_lst) > 1:
+        enes = run_parallel(_run_cnf_energy, args_lst,
+                            kwargs_lst=[kwargs for _ in args_lst],
+                            nprocs=njobs, ignore_failed=True)
+    else:
+        enes = [_run_cnf_energy(*args, **kwargs) for args in args_lst]
+
+    # Add the new energies to the index database
+    new_locs_lst, new_enes = [], []
+    for locs, ene in zip(run_locs_lst, enes):
+        if ene is not None:
+            new_locs_lst.append(locs)
+            new_enes.append(ene)
+    filesys.spcdb.records(cnf_save_fs, new_locs_lst, thy_info, new_enes)
+
+
+def _run_cnf_energy(locs, spc_info, thy_info, cnf_save_fs, cnf_run_fs,
+                    script_str, overwrite, retryfail, **kwargs):
+    """ Find the energy of one conformer of an ensemble
+    """
+    print('\n\nRunning task for cnf locs', locs)
+    zma, geo = filesys.inf.cnf_fs_zma_geo(cnf_save_fs, locs)
+    return run_energy(
+        zma, geo, spc_info, thy_info,
+        cnf_save_fs, cnf_run_fs[-1].path(locs), cnf_save_fs[-1].path(locs),
+        locs, script_str, overwrite,
+        retryfail=retryfail, record=False, **kwargs)
+
+
+def _saved_energy(geo_save_fs, locs, thy_info):
+    """ Check if the energy of a structure at a level has been saved,
+        returning it if so
+    """
+    sp_save_fs = autofile.fs.single_point(geo_save_fs[-1].path(locs))
+    if sp_save_fs[-1].file.energy.exists(thy_info[1:4]):
+        ene = sp_save_fs[-1].file.energy.read(thy_info[1:4])
+    else:
+        ene = None
+    return ene
+
 
 def run_gradient(zma, geo, spc_info, thy_info,
                  geo_save_fs, geo_run_path, geo_save_path, locs,
@@ -171,7 +252,8 @@ def run_gradient(zma, geo, spc_info, thy_info,
                         geo_save_fs[-1].file.gradient_info.write(inf_obj, locs)
                         geo_save_fs[-1].file.gradient_input.write(
                             inp_str, locs)
-                        geo_save_fs[-1].file.gradient.write(grad, locs)
+                        filesys.cache.write(
+                            geo_save_fs[-1].file.gradient, grad, locs)
                     print(" - Save path: {}".format(geo_save_path))
 
         else:
@@ -255,7 +337,8 @@ def run_hessian(zma, geo, spc_info, thy_info,
                 else:
                     geo_save_fs[-1].file.hessian_info.write(inf_obj, locs)
                     geo_save_fs[-1].file.hessian_input.write(inp_str, locs)
-                    geo_save_fs[-1].file.hessian.write(hess, locs)
+                    filesys.cache.write(
+                        geo_save_fs[-1].file.hessian, hess, locs)
                 print(" - Save path: {}".format(geo_save_path))
 
                 if thy_info[0] == 'gaussian09':
@@ -546,7 +629,7 @@ def _hess_grad(prog, out_str, geo_save_fs,
             if _json_database(save_path):
                 geo_save_fs[-1].json.gradient.write(grad, locs)
             else:
-                geo_save_fs[-1].file.gradient.write(grad, locs)
+                filesys.cache.write(geo_save_fs[-1].file.gradient, grad, locs)
             print(" - Save path: {}".format(save_path))
 
         else:
@@ -9,15 +9,25 @@ import autofile
 from routines.es._routines import _util as util
 from routines.es import runner as es_runner
 from lib import filesys
+from lib.submission import run_parallel
 from phydat import phycon
 
 
+# Temperatures at which the convergence of the partition function is checked
+TAU_TEMPS = (300., 500., 750., 1000., 1500.)
+
+
 def tau_sampling(zma, ref_ene, spc_info, tors_name_grps, nsamp_par,
                  mod_thy_info,
                  tau_run_fs, tau_save_fs,
                  script_str, overwrite,
-                 saddle=False, **opt_kwargs):
+                 saddle=False, njobs=1, conv_target=None, **opt_kwargs):
     """ Sample over torsions optimizing all other coordinates
+
+        Samples are run njobs at a time. If conv_target is given, the
+        sampling stops once the relative standard error (%) of the Monte
+        Carlo partition function is below it at every temperature of
+        TAU_TEMPS, even if fewer than the requested samples have been run.
     """
 
     # Read the geometry from the initial filesystem and set sampling
@@ -45,6 +55,9 @@ def tau_sampling(zma, ref_ene, spc_info, tors_name_grps, nsamp_par,
         script_str=script_str,
         overwrite=overwrite,
         saddle=saddle,
+        njobs=njobs,
+        ref_ene=ref_ene,
+        conv_target=conv_target,
         **opt_kwargs,
     )
 
@@ -60,8 +73,14 @@ def tau_sampling(zma, ref_ene, spc_info, tors_name_grps, nsamp_par,
 
 def run_tau(zma, spc_info, thy_info, nsamp, tors_range_dct,
             tau_run_fs, tau_save_fs, script_str, overwrite,
-            saddle, **kwargs):
+            saddle, njobs=1, ref_ene=None, conv_target=None, **kwargs):
     """ run sampling algorithm to find tau dependent geometries
+
+        The samples are run in batches of njobs, and the number of samples
+        in the info files is updated after each batch. With conv_target
+        (and ref_ene), the energies of the samples are added to running
+        sums of the partition function, and the sampling stops once it
+        has converged.
     """
     if not tors_range_dct:
         print("No torsional coordinates. Setting nsamp to 1.")
@@ -77,83 +96,128 @@ def run_tau(zma, spc_info, thy_info, nsamp, tors_range_dct,
     idx = 0
     nsamp0 = nsamp
     inf_obj = autofile.schema.info_objects.tau_trunk(0, tors_range_dct)
-    while True:
-        if tau_save_fs[0].file.info.exists():
-            inf_obj_s = tau_save_fs[0].file.info.read()
-            nsampd = inf_obj_s.nsamp
-        elif tau_run_fs[0].file.info.exists():
-            inf_obj_r = tau_run_fs[0].file.info.read()
-            nsampd = inf_obj_r.nsamp
-        else:
-            nsampd = 0
 
+    # Start the sums of the partition function from the saved samples
+    pf_sums = None
+    if conv_target is not None and ref_ene is not None:
+        pf_sums = pf_sums_init(TAU_TEMPS)
+        pf_sums_add(pf_sums, [
+            (tau_save_fs[-1].file.energy.read(locs) - ref_ene)
+            * phycon.EH2KCAL for locs in tau_save_fs[-1].existing()])
+
+    while True:
+        nsampd = _tau_nsampd(tau_run_fs, tau_save_fs)
         nsamp = nsamp0 - nsampd
         if nsamp <= 0:
             print('Reached requested number of samples. '
                   'Tau sampling complete.')
             break
+        if pf_sums is not None and pf_converged(pf_sums, conv_target):
+            print('Monte Carlo partition function converged to within '
+                  '{}% after {} samples. Tau sampling complete.'.format(
+                      conv_target, pf_sums['nsamp']))
+            break
 
         print("    New nsamp is {:d}.".format(nsamp))
 
-        samp_zma, = automol.zmatrix.samples(zma, 1, tors_range_dct)
-        tid = autofile.schema.generate_new_tau_id()
-        locs = [tid]
-
-        tau_run_fs[-1].create(locs)
-        tau_run_prefix = tau_run_fs[-1].path(locs)
-        run_fs = autofile.fs.run(tau_run_prefix)
-
-        idx += 1
-        print("Run {}/{}".format(idx, nsamp0))
-
-        print('\nChecking if ZMA has high repulsion...')
-        if automol.intmol.low_repulsion_struct(zma, samp_zma):
-            print('ZMA fine.')
-            es_runner.run_job(
-                job=elstruct.Job.OPTIMIZATION,
-                script_str=script_str,
-                run_fs=run_fs,
-                geom=samp_zma,
-                spc_info=spc_info,
-                thy_info=thy_info,
-                saddle=saddle,
-                overwrite=overwrite,
-                frozen_coordinates=tors_range_dct.keys(),
-                **kwargs
-            )
+        # Draw the samples of the batch (here, so that the random
+        # structures and ids differ between the processes)
+        args_lst = []
+        for _ in range(min(njobs, nsamp)):
+            samp_zma, = automol.zmatrix.samples(zma, 1, tors_range_dct)
+            locs = [autofile.schema.generate_new_tau_id()]
+            idx += 1
+            args_lst.append((idx, nsamp0, zma, samp_zma, locs,
+                             spc_info, thy_info, tors_range_dct,
+                             tau_run_fs, script_str, overwrite, saddle))
+
+        if len(args_lst) > 1:
+            enes = run_parallel(_run_tau_sample, args_lst,
+                                kwargs_lst=[kwargs for _ in args_lst],
+                                nprocs=njobs, ignore_failed=True)
         else:
-            print('repulsive ZMA:')
-            inp_str = elstruct.writer.optimization(
-                geom=samp_zma,
-                charge=spc_info[1],
-                mult=spc_info[2],
-                method=thy_info[1],
-                basis=thy_info[2],
-                prog=thy_info[0],
-                orb_type=thy_info[3],
-                mol_options=['nosym'],
-                frozen_coordinates=tors_range_dct.keys(),
-            )
-            tau_run_fs[-1].file.geometry_input.write(inp_str, locs)
-            print('geometry for bad ZMA at', tau_run_fs[-1].path(locs))
-
-        # nsampd += 1
-        # inf_obj.nsamp = nsampd
-        # tau_save_fs[0].file.info.write(inf_obj)
-        # tau_run_fs[0].file.info.write(inf_obj)
-
-        if tau_save_fs[0].file.info.exists():
-            inf_obj_s = tau_save_fs[0].file.info.read()
-            nsampd = inf_obj_s.nsamp
-        elif tau_run_fs[0].file.info.exists():
-            inf_obj_r = tau_run_fs[0].file.info.read()
-            nsampd = inf_obj_r.nsamp
-        nsampd += 1
+            enes = [_run_tau_sample(*args, **kwargs) for args in args_lst]
+
+        # Add the new energies to the sums of the partition function
+        if pf_sums is not None:
+            pf_sums_add(pf_sums, [(ene - ref_ene) * phycon.EH2KCAL
+                                  for ene in enes if ene is not None])
+
+        nsampd = _tau_nsampd(tau_run_fs, tau_save_fs)
+        nsampd += len(args_lst)
         inf_obj.nsamp = nsampd
         tau_save_fs[0].file.info.write(inf_obj)
         tau_run_fs[0].file.info.write(inf_obj)
 
 
+def _tau_nsampd(tau_run_fs, tau_save_fs):
+    """ Read the number of samples run so far from the info files
+    """
+    if tau_save_fs[0].file.info.exists():
+        inf_obj_s = tau_save_fs[0].file.info.read()
+        nsampd = inf_obj_s.nsamp
+    elif tau_run_fs[0].file.info.exists():
+        inf_obj_r = tau_run_fs[0].file.info.read()
+        nsampd = inf_obj_r.nsamp
+    else:
+        nsampd = 0
+    return nsampd
+
+
+def _run_tau_sample(idx, nsamp0, zma, samp_zma, locs,
+                    spc_info, thy_info, tors_range_dct,
+                    tau_run_fs, script_str, overwrite, saddle, **kwargs):
+    """ Run the optimization of a single tau sample
+
+        :return: energy of the optimized sample; None if it failed
+    """
+
+    tau_run_fs[-1].create(locs)
+    tau_run_prefix = tau_run_fs[-1].path(locs)
+    run_fs = autofile.fs.run(tau_run_prefix)
+
+    print("Run {}/{}".format(idx, nsamp0))
+
+    ene = None
+    print('\nChecking if ZMA has high repulsion...')
+    if automol.intmol.low_repulsion_struct(zma, samp_zma):
+        print('ZMA fine.')
+        es_runner.run_job(
+            job=elstruct.Job.OPTIMIZATION,
+            script_str=script_str,
+            run_fs=run_fs,
+            geom=samp_zma,
+            spc_info=spc_info,
+            thy_info=thy_info,
+            saddle=saddle,
+            overwrite=overwrite,
+            frozen_coordinates=tors_range_dct.keys(),
+            **kwargs
+        )
+        success, ret = es_runner.read_job(
+            job=elstruct.Job.OPTIMIZATION, run_fs=run_fs)
+        if success:
+            inf_obj, _, out_str = ret
+            ene = elstruct.reader.energy(inf_obj.prog, inf_obj.method, out_str)
+    else:
+        print('repulsive ZMA:')
+        inp_str = elstruct.writer.optimization(
+            geom=samp_zma,
+            charge=spc_info[1],
+            mult=spc_info[2],
+            method=thy_info[1],
+            basis=thy_info[2],
+            prog=thy_info[0],
+            orb_type=thy_info[3],
+            mol_options=['nosym'],
+            frozen_coordinates=tors_range_dct.keys(),
+        )
+        tau_run_fs[-1].file.geometry_input.write(inp_str, locs)
+        print('geometry for bad ZMA at', tau_run_fs[-1].path(locs))
+
+    return ene
+
+
 def save_tau(tau_run_fs, tau_save_fs, mod_thy_info):
     """ save the tau dependent geometries that have been found so far
     """
@@ -193,8 +257,9 @@ def save_tau(tau_run_fs, tau_save_fs, mod_thy_info):
                     tau_save_fs[-1].create(locs)
                     tau_save_fs[-1].file.geometry_info.write(inf_obj, locs)
                     tau_save_fs[-1].file.geometry_input.write(inp_str, locs)
-                    tau_save_fs[-1].file.energy.write(ene, locs)
-                    tau_save_fs[-1].file.geometry.write(geo, locs)
+                    filesys.cache.write(tau_save_fs[-1].file.energy, ene, locs)
+                    filesys.cache.write(
+                        tau_save_fs[-1].file.geometry, geo, locs)
                     # Saving the energy to a SP filesystem
                     save_path = tau_save_fs[-1].path(locs)
                     print(" - Saving...")
@@ -203,7 +268,8 @@ def save_tau(tau_run_fs, tau_save_fs, mod_thy_info):
                     sp_save_fs[-1].create(mod_thy_info[1:4])
                     sp_save_fs[-1].file.input.write(inp_str, mod_thy_info[1:4])
                     sp_save_fs[-1].file.info.write(inf_obj, mod_thy_info[1:4])
-                    sp_save_fs[-1].file.energy.write(ene, mod_thy_info[1:4])
+                    filesys.cache.write(
+                        sp_save_fs[-1].file.energy, ene, mod_thy_info[1:4])
                 elif db_style == 'jsondb':
                     # tau_save_fs[-1].json.geometry_info.write(inf_obj, locs)
                     # tau_save_fs[-1].json.geometry_input.write(inp_str, locs)
@@ -252,33 +318,70 @@ def save_tau(tau_run_fs, tau_save_fs, mod_thy_info):
         filesys.mincnf.traj_sort(tau_save_fs, mod_thy_info)
 
 
-def assess_pf_convergence(tau_save_fs, ref_ene,
-                          temps=(300., 500., 750., 1000., 1500.)):
+def assess_pf_convergence(tau_save_fs, ref_ene, temps=TAU_TEMPS):
     """ Determine how much the partition function has converged
     """
 
+    # Read the energies of the samples once
+    saved_locs = tau_save_fs[-1].existing()
+    enes = [(tau_save_fs[-1].file.energy.read(locs) - ref_ene)
+            * phycon.EH2KCAL for locs in saved_locs]
+
     # Calculate sigma values at various temperatures for the PF
     for temp in temps:
-        sumq = 0.
-        sum2 = 0.
-        idx = 0
         print('integral convergence for T = ', temp)
-        inf_obj_s = tau_save_fs[0].file.info.read()
-        nsamp = inf_obj_s.nsamp
-        saved_locs = tau_save_fs[-1].existing()
-        ratio = float(nsamp) / len(saved_locs)
-        for locs in tau_save_fs[-1].existing():
-            idx += 1
-            ene = tau_save_fs[-1].file.energy.read(locs)
-            ene = (ene - ref_ene) * phycon.EH2KCAL
-            tmp = numpy.exp(-ene*349.7/(0.695*temp))
-            sumq = sumq + tmp
-            sum2 = sum2 + tmp**2
-            sigma = numpy.sqrt(
-                (abs(sum2/float(idx)-(sumq/float(idx))**2))/float(idx))
-            print(sumq/float(idx), sigma, 100.*sigma*float(idx)/sumq, idx)
-        inf_obj_s = tau_save_fs[0].file.info.read()
-        nsamp = inf_obj_s.nsamp
-        saved_locs = tau_save_fs[-1].existing()
-        ratio = len(saved_locs) / float(nsamp)
-        print('ratio of good to sampled geometries', ratio)
+        pf_sums = pf_sums_init([temp])
+        for idx, ene in enumerate(enes):
+            pf_sums_add(pf_sums, [ene])
+            sumq = pf_sums['sumq'][0]
+            sigma = pf_sums_err(pf_sums)[0] * sumq / (idx + 1) / 100.
+            print(sumq/float(idx+1), sigma, 100.*sigma*float(idx+1)/sumq,
+                  idx+1)
+    inf_obj_s = tau_save_fs[0].file.info.read()
+    nsamp = inf_obj_s.nsamp
+    ratio = len(saved_locs) / float(nsamp)
+    print('ratio of good to sampled geometries', ratio)
+
+
+def pf_sums_init(temps):
+    """ Start the running sums of the Boltzmann factors (and their squares)
+        of the samples of a Monte Carlo partition function
+    """
+    return {
+        'temps': numpy.array(temps, dtype=float),
+        'sumq': numpy.zeros(len(temps)),
+        'sumq2': numpy.zeros(len(temps)),
+        'nsamp': 0
+    }
+
+
+def pf_sums_add(pf_sums, enes):
+    """ Add the energies (kcal/mol, relative to the reference) of new
+        samples to the running sums
+    """
+    if enes:
+        qvals = numpy.exp(
+            -numpy.outer(enes, 349.7 / (0.695 * pf_sums['temps'])))
+        pf_sums['sumq'] += qvals.sum(axis=0)
+        pf_sums['sumq2'] += (qvals**2).sum(axis=0)
+        pf_sums['nsamp'] += len(enes)
+
+
+def pf_sums_err(pf_sums):
+    """ Relative standard error (%) of the mean Boltzmann factor at each
+        temperature
+    """
+    nsamp = float(max(pf_sums['nsamp'], 1))
+    mean = pf_sums['sumq'] / nsamp
+    sigma = numpy.sqrt(numpy.abs(pf_sums['sumq2'] / nsamp - mean**2) / nsamp)
+    with numpy.errstate(divide='ignore', invalid='ignore'):
+        err = numpy.where(mean > 0.0, 100.0 * sigma / mean, numpy.inf)
+    return err
+
+
+def pf_converged(pf_sums, conv_target, nsamp_min=10):
+    """ Check if the partition function has converged to within the
+        target relative standard error (%) at every temperature
+    """
+    return (pf_sums['nsamp'] >= nsamp_min and
+            bool(numpy.all(pf_sums_err(pf_sums) < conv_target)))
@@ -175,13 +175,15 @@ def find_vdw(ts_name, spc_dct, thy_info, ini_thy_info, vdw_params,
                 geo = elstruct.reader.opt_geometry(prog, out_str)
                 print('vdw ending geometry')
                 print(automol.geom.xyz_string(geo))
-                thy_save_fs[-1].file.geometry.write(geo, thy_info[1:4])
+                filesys.cache.write(
+                    thy_save_fs[-1].file.geometry, geo, thy_info[1:4])
                 ene = elstruct.reader.energy(prog, method, out_str)
                 if ene < min_ene:
                     min_ene = ene
                     print('ene test in vdw')
                     print(ene)
-                    thy_save_fs[-1].file.energy.write(ene, thy_info[1:4])
+                    filesys.cache.write(
+                        thy_save_fs[-1].file.energy, ene, thy_info[1:4])
                     print('Saving reference geometry')
                     print(" - Save path: {}".format(thy_save_path))
                     vdw_name = label + ts_name.replace('ts', 'vdw')
@@ -213,8 +215,9 @@ def find_vdw(ts_name, spc_dct, thy_info, ini_thy_info, vdw_params,
                         inf_obj, locs)
                     cnf_save_fs[-1].file.geometry_input.write(
                         inp_str, locs)
-                    cnf_save_fs[-1].file.energy.write(ene, locs)
-                    cnf_save_fs[-1].file.geometry.write(geo, locs)
+                    filesys.cache.write(cnf_save_fs[-1].file.energy, ene, locs)
+                    filesys.cache.write(
+                        cnf_save_fs[-1].file.geometry, geo, locs)
         if min_ene:
             new_vdws.append(vdw_name)
 
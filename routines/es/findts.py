@@ -271,6 +271,9 @@ def sadpt_transition_state(
     """ Find a sadddle point
     """
 
+    # Number of guesses to optimize at once
+    njobs = es_keyword_dct.get('njobs', 1)
+
     # Check filesystem for input level of theory
     print('\nSearching save filesys for guess Z-Matrix calculated',
           'at {} level...'.format(es_keyword_dct['inplvl']))
@@ -296,34 +299,48 @@ def sadpt_transition_state(
             typ, grid, dist_name, brk_name, ini_zma, ts_info,
             mod_thy_info, thy_save_fs,
             scn_run_fs, scn_save_fs, opt_script_str,
-            overwrite, update_guess, constraint_dct, **opt_kwargs)
-
-    # Optimize the saddle point
-    print('\nOptimizing guess Z-Matrix obtained from scan or filesys...')
-    opt_ret = sadpt.optimize_saddle_point(
-        guess_zmas, ts_info, mod_thy_info,
-        run_fs, opt_script_str, overwrite, **opt_kwargs)
-
-    # Calculate the Hessian for the optimized structure
-    if opt_ret is not None:
-        print('\nCalculating Hessian for the optimized geometry...')
-        hess_ret, freqs, imags = sadpt.saddle_point_hessian(
-            opt_ret, ts_info, mod_thy_info,
-            run_fs, script_str, overwrite, **opt_kwargs)
-
-        # Assess saddle point, save it if viable
-        print('Assessing the saddle point...')
-        saddle = sadpt.saddle_point_checker(imags)
-        if saddle:
-            sadpt.save_saddle_point(
-                opt_ret, hess_ret, freqs, imags,
-                mod_thy_info,
-                cnf_save_fs,
-                ts_save_fs, ts_save_path,
-                frm_bnd_keys, brk_bnd_keys, rcts_gra,
-                zma_locs=[0])
+            overwrite, update_guess, constraint_dct,
+            nguess=njobs, **opt_kwargs)
+
+    # Optimize all the guesses at once, or one at a time until one converges
+    sadpt_ret = None
+    if njobs > 1 and len(guess_zmas) > 1:
+        sadpt_ret = sadpt.optimize_saddle_points(
+            guess_zmas, ts_info, mod_thy_info,
+            run_fs, opt_script_str, script_str, overwrite,
+            njobs=njobs, **opt_kwargs)
+        if sadpt_ret is None:
+            print('\n No guess optimized to a saddle point. Nothing to save.')
     else:
-        print('\n TS optimization failed. No geom to check and save.')
+        print('\nOptimizing guess Z-Matrix obtained from scan or filesys...')
+        opt_ret = sadpt.optimize_saddle_point(
+            guess_zmas, ts_info, mod_thy_info,
+            run_fs, opt_script_str, overwrite, **opt_kwargs)
+
+        # Calculate the Hessian for the optimized structure
+        if opt_ret is not None:
+            print('\nCalculating Hessian for the optimized geometry...')
+            hess_ret, freqs, imags = sadpt.saddle_point_hessian(
+                opt_ret, ts_info, mod_thy_info,
+                run_fs, script_str, overwrite, **opt_kwargs)
+
+            # Assess saddle point
+            print('Assessing the saddle point...')
+            if sadpt.saddle_point_checker(imags):
+                sadpt_ret = (opt_ret, hess_ret, freqs, imags)
+        else:
+            print('\n TS optimization failed. No geom to check and save.')
+
+    # Save the saddle point if viable
+    if sadpt_ret is not None:
+        opt_ret, hess_ret, freqs, imags = sadpt_ret
+        sadpt.save_saddle_point(
+            opt_ret, hess_ret, freqs, imags,
+            mod_thy_info,
+            cnf_save_fs,
+            ts_save_fs, ts_save_path,
+            frm_bnd_keys, brk_bnd_keys, rcts_gra,
+            zma_locs=[0])
 
 
 # Barrierless finder functions
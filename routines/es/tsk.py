@@ -262,7 +262,8 @@ def conformer_tsk(job, spc_dct, spc_name,
             saddle=saddle, nsamp_par=mc_nsamp,
             tors_names=tors_names,
             two_stage=two_stage, retryfail=retryfail,
-            rxn_class=rxn_class, **opt_kwargs)
+            rxn_class=rxn_class, njobs=es_keyword_dct['njobs'],
+            **opt_kwargs)
 
     elif job == 'opt':
 
@@ -327,17 +328,25 @@ def conformer_tsk(job, spc_dct, spc_name,
             *mod_thy_info[0:2])
 
         # Run the job over all the conformers requested by the user
-        for locs in ini_cnf_save_locs_lst:
-            print('\n\nRunning task for cnf locs', locs)
-            geo_run_path = ini_cnf_run_fs[-1].path(locs)
-            geo_save_path = ini_cnf_save_fs[-1].path(locs)
-            ini_cnf_run_fs[-1].create(locs)
-            zma, geo = filesys.inf.cnf_fs_zma_geo(ini_cnf_save_fs, locs)
-            ES_TSKS[job](
-                zma, geo, spc_info, mod_thy_info,
-                ini_cnf_save_fs, geo_run_path, geo_save_path, locs,
+        if job == 'energy':
+            SP_MODULE.run_energies(
+                spc_info, mod_thy_info,
+                ini_cnf_save_fs, ini_cnf_run_fs, ini_cnf_save_locs_lst,
                 script_str, overwrite,
-                retryfail=retryfail, **kwargs)
+                retryfail=retryfail, njobs=es_keyword_dct['njobs'],
+                **kwargs)
+        else:
+            for locs in ini_cnf_save_locs_lst:
+                print('\n\nRunning task for cnf locs', locs)
+                geo_run_path = ini_cnf_run_fs[-1].path(locs)
+                geo_save_path = ini_cnf_save_fs[-1].path(locs)
+                ini_cnf_run_fs[-1].create(locs)
+                zma, geo = filesys.inf.cnf_fs_zma_geo(ini_cnf_save_fs, locs)
+                ES_TSKS[job](
+                    zma, geo, spc_info, mod_thy_info,
+                    ini_cnf_save_fs, geo_run_path, geo_save_path, locs,
+                    script_str, overwrite,
+                    retryfail=retryfail, **kwargs)
 
 
 def tau_tsk(job, spc_dct, spc_name,
@@ -492,6 +501,12 @@ def tau_tsk(job, spc_dct, spc_name,
             # Set up the script
             _, opt_script_str, _, opt_kwargs = qchem_params(
                 *thy_info[0:2])
+
+            # Target error (%) of the partition function to stop sampling at
+            tau_conv = es_keyword_dct['tau_conv']
+            if tau_conv is not None:
+                tau_conv = float(tau_conv)
+
             # Run sampling
             tau.tau_sampling(
                 zma, ref_ene,
@@ -499,7 +514,8 @@ def tau_tsk(job, spc_dct, spc_name,
                 mod_ini_thy_info,
                 tau_run_fs, tau_save_fs,
                 opt_script_str, overwrite,
-                saddle=saddle, **opt_kwargs)
+                saddle=saddle, njobs=es_keyword_dct['njobs'],
+                conv_target=tau_conv, **opt_kwargs)
 
         elif job in ('energy', 'grad'):
 
@@ -678,7 +694,8 @@ def hr_tsk(job, spc_dct, spc_name,
                 opt_script_str, overwrite,
                 scn_typ=scn_typ,
                 saddle=saddle, const_names=const_names,
-                retryfail=retryfail, **opt_kwargs)
+                retryfail=retryfail, njobs=es_keyword_dct['njobs'],
+                adapt=es_keyword_dct['hr_adapt'], **opt_kwargs)
 
             # Read and print the potential
             sp_fs = autofile.fs.single_point(ini_cnf_save_path)
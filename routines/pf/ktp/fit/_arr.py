@@ -3,23 +3,29 @@
   Arrhenius expressions
 """
 
-import copy
+import numpy
+import scipy.optimize
 import ratefit
 import chemkin_io
-import mess_io
+from phydat import phycon
 from routines.pf.ktp.fit._util import pull_highp_from_dct
 
 
 # Functions to fit rates to Arrhenius/PLOG function
 def perform_fits(ktp_dct, reaction, mess_path,
-                 a_conv_factor, arrfit_thresh):
+                 a_conv_factor, arrfit_thresh, sing_fit=None):
     """ Read the rates for each channel and perform the fits
+
+        The single Arrhenius fits can be given as sing_fit, as returned
+        by single_arr_fits, if they were done beforehand.
     """
 
     # Fit rate constants to single Arrhenius expressions
-    sing_params_dct, sing_fit_temp_dct, sing_fit_success = mod_arr_fit(
-        ktp_dct, mess_path, fit_type='single', fit_method='python',
-        t_ref=1.0, a_conv_factor=a_conv_factor)
+    if sing_fit is None:
+        sing_fit = mod_arr_fit(
+            ktp_dct, mess_path, fit_type='single', fit_method='python',
+            t_ref=1.0, a_conv_factor=a_conv_factor)
+    sing_params_dct, sing_fit_temp_dct, sing_fit_success = sing_fit
     if sing_fit_success:
         print('\nSuccessful fit to Single Arrhenius at all T, P')
 
@@ -78,7 +84,7 @@ def perform_fits(ktp_dct, reaction, mess_path,
         # Fit rate constants to double Arrhenius expressions
         doub_params_dct, doub_fit_temp_dct, doub_fit_suc = mod_arr_fit(
             ktp_dct, mess_path, fit_type='double',
-            fit_method='dsarrfit', t_ref=1.0,
+            fit_method='python', t_ref=1.0,
             a_conv_factor=a_conv_factor,
             inp_param_dct=guess_params_dct)
 
@@ -119,6 +125,9 @@ def mod_arr_fit(ktp_dct, mess_path,
         (1) Grab high-pressure and pressure-dependent rate constants
             from a MESS output file
         (2) Fit rate constants to an Arrhenius expression
+
+    The python fit_method does the fits in-process, while dsarrfit runs
+    the external dsarrfit program in mess_path.
     """
 
     assert fit_type in ('single', 'double'), 'Only single/double fits'
@@ -128,6 +137,10 @@ def mod_arr_fit(ktp_dct, mess_path,
                 list(ktp_dct.keys()), list(inp_param_dct.keys()))
             )
 
+    # Fit all the pressures at once for in-process single fits
+    if fit_type == 'single' and fit_method == 'python':
+        return single_arr_fits([ktp_dct], [a_conv_factor], t_ref=t_ref)[0]
+
     # Dictionaries to store info; indexed by pressure (given in fit_ps)
     fit_param_dct = {}
     fit_temp_dct = {}
@@ -155,10 +168,15 @@ def mod_arr_fit(ktp_dct, mess_path,
             else:
                 arr1_guess, arr2_guess = (8.1e-11, -0.01, 2000.0), ()
 
-            fit_params = ratefit.fit.arrhenius.double(
-                temps, rate_constants, t_ref, fit_method,
-                arr1_guess=arr1_guess, arr2_guess=arr2_guess,
-                dsarrfit_path=mess_path, a_conv_factor=a_conv_factor)
+            if fit_method == 'python':
+                fit_params = double_arr_fit(
+                    temps, rate_constants * a_conv_factor, t_ref,
+                    arr1_guess, arr2_guess)
+            else:
+                fit_params = ratefit.fit.arrhenius.double(
+                    temps, rate_constants, t_ref, fit_method,
+                    arr1_guess=arr1_guess, arr2_guess=arr2_guess,
+                    dsarrfit_path=mess_path, a_conv_factor=a_conv_factor)
 
         # Store the fitting parameters in a dictionary
         fit_param_dct[pressure] = fit_params
@@ -172,6 +190,100 @@ def mod_arr_fit(ktp_dct, mess_path,
     return fit_param_dct, fit_temp_dct, fit_success
 
 
+def single_arr_fits(ktp_dcts, a_conv_factors, t_ref=1.0):
+    """ Fit the k(T)s of a set of reactions at all of their pressures to
+        single Arrhenius expressions, k = A (T/t_ref)^n exp(-Ea/RT),
+        solving the linear least-squares fits of ln k for every reaction
+        and pressure in one stacked call
+
+        As for a single fit, only A is fit to a single k(T), and only A
+        and Ea are fit to two or three k(T)s.
+
+        :return: (fit_param_dct, fit_temp_dct, fit_success) of each reaction
+        :rtype: list
+    """
+
+    # Stack the k(T)s of all reactions and pressures, padded with zeros
+    tk_sets = [(ridx, pressure, tk_arr[0], tk_arr[1] * a_conv_factor)
+               for ridx, (ktp_dct, a_conv_factor)
+               in enumerate(zip(ktp_dcts, a_conv_factors))
+               for pressure, tk_arr in ktp_dct.items()]
+    nsets = len(tk_sets)
+    npts = max((len(temps) for _, _, temps, _ in tk_sets), default=0)
+    temps_arr = numpy.ones((nsets, npts))
+    lnk_arr = numpy.zeros((nsets, npts))
+    mask_arr = numpy.zeros((nsets, npts))
+    for sidx, (_, _, temps, rate_constants) in enumerate(tk_sets):
+        num = len(temps)
+        temps_arr[sidx, :num] = temps
+        lnk_arr[sidx, :num] = numpy.log(rate_constants)
+        mask_arr[sidx, :num] = 1.0
+
+    # Build the design matrices for ln A, n, and Ea, zeroing the padding
+    # and the columns of the parameters that are not fit
+    coeff_arr = numpy.stack((
+        numpy.ones((nsets, npts)),
+        numpy.log(temps_arr / t_ref),
+        -1.0 / (phycon.RC_CAL * temps_arr)), axis=-1)
+    coeff_arr *= mask_arr[:, :, None]
+    nks = mask_arr.sum(axis=1)
+    coeff_arr[nks <= 3, :, 1] = 0.0
+    coeff_arr[nks <= 1, :, 2] = 0.0
+
+    # Solve the least-squares fits of all the sets at once
+    theta_arr = numpy.einsum(
+        'sij,sj->si', numpy.linalg.pinv(coeff_arr), lnk_arr * mask_arr)
+
+    # Sort the fits back into the reactions
+    fits = [({}, {}) for _ in ktp_dcts]
+    for (ridx, pressure, temps, _), theta, nk in zip(tk_sets, theta_arr, nks):
+        a_fit = numpy.exp(theta[0]) if nk > 0 else 0.0
+        fits[ridx][0][pressure] = [a_fit, theta[1], theta[2]]
+        fits[ridx][1][pressure] = [min(temps), max(temps)]
+
+    return [(param_dct, temp_dct, all(param_dct.values()))
+            for param_dct, temp_dct in fits]
+
+
+def double_arr_fit(temps, rate_constants, t_ref, arr1_guess, arr2_guess):
+    """ Fit k(T)s to a double Arrhenius expression with a nonlinear
+        least-squares fit of ln k, starting from the guess parameters
+
+        :return: fit parameters (A1, n1, Ea1, A2, n2, Ea2); None if the
+            fit failed
+    """
+
+    if not arr2_guess:
+        arr2_guess = arr1_guess
+    if arr1_guess[0] <= 0.0 or arr2_guess[0] <= 0.0:
+        return None
+
+    temps = numpy.asarray(temps, dtype=float)
+    lnks = numpy.log(rate_constants)
+    ln_trs = numpy.log(temps / t_ref)
+    inv_rts = 1.0 / (phycon.RC_CAL * temps)
+
+    def _residuals(theta):
+        lnk1 = theta[0] + theta[1] * ln_trs - theta[2] * inv_rts
+        lnk2 = theta[3] + theta[4] * ln_trs - theta[5] * inv_rts
+        return numpy.logaddexp(lnk1, lnk2) - lnks
+
+    guess = (numpy.log(arr1_guess[0]), arr1_guess[1], arr1_guess[2],
+             numpy.log(arr2_guess[0]), arr2_guess[1], arr2_guess[2])
+    try:
+        result = scipy.optimize.least_squares(
+            _residuals, guess, x_scale='jac')
+    except ValueError:
+        return None
+
+    theta = result.x
+    if not result.success or not numpy.all(numpy.isfinite(theta)):
+        return None
+
+    return [numpy.exp(theta[0]), theta[1], theta[2],
+            numpy.exp(theta[3]), theta[4], theta[5]]
+
+
 def make_dbl_fit_guess(params_dct):
     """ Make dbl fit term
     """
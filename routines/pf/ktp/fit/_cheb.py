@@ -1,83 +1,140 @@
 """
   Fit the rate constants read from the MESS output to
-  Arrhenius expressions
+  Chebyshev expressions
 """
 
 
 import numpy
-import ratefit
 import chemkin_io
 
 
-def perform_fits(ktp_dct, inp_temps, reaction, mess_path,
-                 a_conv_factor=1.0, t_ref=1.0, arrfit_method='python',
-                 tdeg=6, pdeg=4):
-    """ Read the rates for each channel and perform the fits
+def perform_fits(reaction, cheb_fit, sing_fit=None, err_thresh=20.0):
+    """ Write the CHEMKIN string for the Chebyshev fit of a reaction,
+        as given by fit_chebyshevs; an empty string if the fit is not
+        viable so that the rates are fit to Arrhenius expressions instead
     """
 
-    # Obtain the fit paramts for the 1-atm rate constants, if available
-    if 1 in ktp_dct.keys():
-        [temps, rate_constants] = ktp_dct[1]
-        one_atm_params = ratefit.fit.arrhenius.single(
-            temps, rate_constants, t_ref, arrfit_method,
-            dsarrfit_path=mess_path, a_conv_factor=a_conv_factor)
-    else:
-        one_atm_params = [1.0, 0.0, 0.0]
-
-    # If there are rates for more than one pressure
-    pressures = tuple(pressure for pressure in ktp_dct.keys()
-                      if pressure != 'high')
-
-    # check existence of rates at all conditions
-    num_kts = []
-    for pressure in pressures:
-        rate_kts = ktp_dct[pressure][1] * a_conv_factor
-        num_kts.append(len(rate_kts))
+    # Check that the rates could be fit, with small enough errors
     fit_viable = True
-    if len(set(num_kts)) != 1:
+    if cheb_fit is None:
         print('Different number of k(T) values at different pressures...')
         fit_viable = False
+    else:
+        alpha, trange, prange, temp_dct, err_dct = cheb_fit
+        if max((vals[1] for vals in err_dct.values())) > err_thresh:
+            print('Errors from Chebyshev fit too large (see string)...')
+            fit_viable = False
 
     if fit_viable:
 
-        # Fit rate constants to Chebyshev polynomial
-        alpha, trange, prange = ratefit.fit.chebyshev.kfit(
-            inp_temps, ktp_dct, tdeg=tdeg, pdeg=pdeg, a_conv_factor=a_conv_factor)
+        # Use the single Arrhenius params of the 1-atm rates, if available
+        one_atm_params = [1.0, 0.0, 0.0]
+        if sing_fit is not None and 1 in sing_fit[0]:
+            one_atm_params = sing_fit[0][1]
+
+        # Write the Chemkin strings
         tmin, tmax = trange
         pmin, pmax = prange
-    
-        # Calculate the fitted rate constants
-        fit_ktps = ratefit.calc.chebyshev(
-            alpha, tmin, tmax, pmin, pmax, inp_temps, pressures)
-    
-        # Calculate errors
-        err_dct, temp_dct = {}, {}
-        # print('reaction in rate fit test:', reaction)
-        for pressure in pressures:
-            rate_kts = ktp_dct[pressure][1] * a_conv_factor
-            fit_kts = numpy.array(fit_ktps[pressure])
-            mean_avg_err, max_avg_err = ratefit.fit.fitting_errors(
-                rate_kts, fit_kts)
-            # print('rate fit test:', pressure, rate_kts, fit_kts)
-    
-            # Add to the dct and lst
-            err_dct[pressure] = [mean_avg_err, max_avg_err]
-    
-        # look at err and same num k(T) at each P
-        if max((vals[1] for vals in err_dct.values())) > 20.0:
-            print('Errors from Chebyshev fit too large (see string)...')
-            fit_viable = False
-    
-        # Write the Chemkin strings
+        print('Chebyshev fit with {} x {} coefficients'.format(*alpha.shape))
         chemkin_str = chemkin_io.writer.reaction.chebyshev(
             reaction, one_atm_params, alpha, tmin, tmax, pmin, pmax)
         chemkin_str += '\n'
         chemkin_str += chemkin_io.writer.reaction.fit_info(
-            pressures, temp_dct, err_dct)
-
-    if not fit_viable:
+            sorted(err_dct), temp_dct, err_dct)
+    else:
         # Print message and reset string to empty to trigger Arrhenius
         print('Chemkin string from Chebyshev fit')
         chemkin_str = ''
 
     return chemkin_str
+
+
+def fit_chebyshevs(ktp_dcts, a_conv_factors, tdeg=6, pdeg=4,
+                   err_target=5.0):
+    """ Fit the k(T,P)s of a set of reactions to Chebyshev expressions
+
+        Reactions with rates on the same T,P grid (normally every reaction
+        of a PES) share the basis matrices, and the fits of all of them at
+        a given order use a single factorization of the basis. The order
+        of each reaction's fit is the lowest, up to tdeg x pdeg, with a
+        maximum error below err_target (%); failing that, the order with
+        the smallest maximum error.
+
+        :return: (alpha, (tmin, tmax), (pmin, pmax), temp_dct, err_dct)
+            of each reaction; None if its rates are not on a single grid
+        :rtype: list
+    """
+
+    # Group the reactions by the grid of their k(T,P)s
+    cheb_fits = [None for _ in ktp_dcts]
+    grid_dct = {}
+    for idx, ktp_dct in enumerate(ktp_dcts):
+        pressures = tuple(sorted(pressure for pressure in ktp_dct
+                                 if pressure != 'high'))
+        temps_set = set(tuple(ktp_dct[pressure][0]) for pressure in pressures)
+        if len(pressures) > 1 and len(temps_set) == 1:
+            grid_dct.setdefault((temps_set.pop(), pressures), []).append(idx)
+
+    for (temps, pressures), idxs in grid_dct.items():
+
+        # log10 k(T,P)s of the reactions, as columns ordered by P then T
+        log_kts = numpy.array([
+            numpy.concatenate([
+                numpy.log10(ktp_dcts[idx][pressure][1] * a_conv_factors[idx])
+                for pressure in pressures])
+            for idx in idxs]).T
+
+        # Fit each order for all reactions, keeping each reaction's best
+        basis = _basis(temps, pressures, tdeg, pdeg)
+        best_fits = [None for _ in idxs]
+        for ntemp, npres in _orders(len(temps), len(pressures), tdeg, pdeg):
+            amat = basis[:, :ntemp, :npres].reshape(len(basis), -1)
+            alphas = numpy.linalg.pinv(amat) @ log_kts
+            errs = numpy.abs(10.0**(amat @ alphas - log_kts) - 1.0) * 100.0
+            for ridx, max_err in enumerate(errs.max(axis=0)):
+                best = best_fits[ridx]
+                if best is None or (best[0] > err_target and
+                                    max_err < best[0]):
+                    best_fits[ridx] = (
+                        max_err,
+                        alphas[:, ridx].reshape(ntemp, npres),
+                        errs[:, ridx].reshape(len(pressures), len(temps)))
+
+        # Sort the fits back into the reactions
+        trange = (min(temps), max(temps))
+        prange = (min(pressures), max(pressures))
+        temp_dct = {pressure: list(trange) for pressure in pressures}
+        for idx, (_, alpha, errs) in zip(idxs, best_fits):
+            err_dct = {pressure: [numpy.mean(perrs), numpy.max(perrs)]
+                       for pressure, perrs in zip(pressures, errs)}
+            cheb_fits[idx] = (alpha, trange, prange, temp_dct, err_dct)
+
+    return cheb_fits
+
+
+def _basis(temps, pressures, tdeg, pdeg):
+    """ Products of the Chebyshev polynomials of the reduced temperatures
+        and pressures of a grid, with rows ordered by P then T
+    """
+
+    inv_temps = 1.0 / numpy.array(temps)
+    log_pres = numpy.log10(pressures)
+    red_temps = ((2.0 * inv_temps - inv_temps.max() - inv_temps.min()) /
+                 (inv_temps.min() - inv_temps.max()))
+    red_pres = ((2.0 * log_pres - log_pres.min() - log_pres.max()) /
+                (log_pres.max() - log_pres.min()))
+    tvander = numpy.polynomial.chebyshev.chebvander(red_temps, tdeg-1)
+    pvander = numpy.polynomial.chebyshev.chebvander(red_pres, pdeg-1)
+
+    basis = numpy.einsum('ti,pj->ptij', tvander, pvander)
+
+    return basis.reshape(len(pressures) * len(temps), tdeg, pdeg)
+
+
+def _orders(ntemps, npres, tdeg, pdeg):
+    """ Orders of the fits that can be done on a grid, lowest first
+    """
+    orders = [(ntemp, npre)
+              for ntemp in range(1, min(tdeg, ntemps) + 1)
+              for npre in range(1, min(pdeg, npres) + 1)]
+    return sorted(orders, key=lambda order: (order[0] * order[1], -order[0]))
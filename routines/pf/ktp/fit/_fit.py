@@ -3,22 +3,31 @@
   Arrhenius, Plog, Troe, and Chebyshev expressions
 """
 
+import os
 import copy
+import itertools
 import numpy
 import ratefit
 import mess_io
 from phydat import phycon
 from lib.amech_io import writer
+from lib.submission import run_parallel
 from routines.pf.ktp.fit import _arr as arr
 from routines.pf.ktp.fit import _cheb as cheb
+from routines.pf.ktp.fit import _rateout as rateout
 
 
 def fit_rates(inp_temps, inp_pressures, inp_tunit, inp_punit,
               pes_formula, label_dct, es_info, pf_model,
               mess_path, inp_fit_method, pdep_fit,
-              arrfit_thresh):
+              arrfit_thresh, nprocs=1, conn_pairs=None):
     """ Parse the MESS output and fit the rates to
         Arrhenius expressions written as CHEMKIN strings
+
+        The MESS output is read once for all reactions, and the rates of
+        the reactions are fit with at most nprocs fits running at once.
+        If conn_pairs is given, only reactions between species connected
+        on the PES are read and fit.
     """
 
     # Initialize chemkin dct with header
@@ -26,77 +35,144 @@ def fit_rates(inp_temps, inp_pressures, inp_tunit, inp_punit,
         'header': writer.ckin.model_header(es_info, pf_model)
     }
 
-    # Loop through reactions, fit rates, and write ckin strings
-    rxn_pairs = gen_reaction_pairs(label_dct)
-    for (name_i, lab_i), (name_j, lab_j) in rxn_pairs:
-
-        # Set the name and A conversion factor
-        reaction = name_i + '=' + name_j
+    # Read the rate constants of all reactions out of the mess output
+    rxn_pairs = tuple(gen_reaction_pairs(label_dct, conn_pairs=conn_pairs))
+    print('\nReading k(T,P)s from MESS output...')
+    mess_temps, rate_table = read_rate_table(
+        inp_temps, inp_pressures, inp_tunit, inp_punit,
+        [(lab_i, lab_j) for (_, lab_i), (_, lab_j) in rxn_pairs],
+        mess_path)
+
+    # Filter the rates of each reaction and fit them all to single
+    # Arrhenius expressions at once
+    ktp_dcts, a_conv_factors = [], []
+    for (_, lab_i), (_, lab_j) in rxn_pairs:
         a_conv_factor = phycon.NAVO if 'W' not in lab_i else 1.00
+        ktp_dcts.append(filter_rates(
+            mess_temps, rate_table[(lab_i, lab_j)], pdep_fit, inp_punit,
+            bimol=numpy.isclose(a_conv_factor, 6.0221e23)))
+        a_conv_factors.append(a_conv_factor)
+    sing_fits = arr.single_arr_fits(ktp_dcts, a_conv_factors)
+
+    # Fit the rates of all reactions to be fit to Chebyshev expressions
+    cheb_idxs = [idx for idx, ktp_dct in enumerate(ktp_dcts)
+                 if _fit_method(ktp_dct, inp_fit_method) == 'chebyshev']
+    cheb_fits = [None for _ in ktp_dcts]
+    if cheb_idxs:
+        for idx, cheb_fit in zip(cheb_idxs, cheb.fit_chebyshevs(
+                [ktp_dcts[idx] for idx in cheb_idxs],
+                [a_conv_factors[idx] for idx in cheb_idxs])):
+            cheb_fits[idx] = cheb_fit
+
+    # Fit the rates of each reaction and write the ckin strings
+    fit_args_lst = []
+    for ((name_i, lab_i), (name_j, lab_j)), ktp_dct, sing_fit, cheb_fit in zip(
+            rxn_pairs, ktp_dcts, sing_fits, cheb_fits):
+        fit_args_lst.append((
+            name_i + '=' + name_j, lab_i, ktp_dct, sing_fit, cheb_fit,
+            mess_path, inp_fit_method, arrfit_thresh))
+    chemkin_strs = run_parallel(_fit_reaction, fit_args_lst, nprocs=nprocs,
+                                ignore_failed=True)
+
+    # Update the chemkin string dct, in the order of the reactions
+    for fit_args, chemkin_str in zip(fit_args_lst, chemkin_strs):
+        if chemkin_str is not None:
+            reaction = fit_args[0]
+            ridx = pes_formula + '_' + reaction.replace('=', '_')
+            chemkin_str_dct.update({ridx: chemkin_str})
 
-        print(('\n--------------------------------------------' +
-               '------------------------------------------'))
-        print('\nReading and Fitting Rates for {}'.format(
-            reaction))
+    return chemkin_str_dct
 
-        # Read the rate constants out of the mess outputs
-        print('\nReading k(T,P)s from MESS output...')
-        ktp_dct = read_rates(
-            inp_temps, inp_pressures, inp_tunit, inp_punit,
-            lab_i, lab_j, mess_path, pdep_fit,
-            bimol=numpy.isclose(a_conv_factor, 6.0221e23))
 
-        # Check the ktp dct and fit_method to see how to fit rates
-        fit_method = _assess_fit_method(ktp_dct, inp_fit_method)
+def _fit_reaction(reaction, rct_lab, ktp_dct, sing_fit, cheb_fit,
+                  mess_path, inp_fit_method, arrfit_thresh):
+    """ Fit the filtered rates of one reaction, starting from its single
+        Arrhenius and Chebyshev fits, returning the CHEMKIN string of the
+        fit (None if there are no valid rates to fit)
+    """
 
-        # Get the desired fits in the form of CHEMKIN strs
-        if fit_method is None:
-            continue
-        if fit_method == 'arrhenius':
+    # Set the A conversion factor
+    a_conv_factor = phycon.NAVO if 'W' not in rct_lab else 1.00
+
+    print(('\n--------------------------------------------' +
+           '------------------------------------------'))
+    print('\nFitting Rates for {}'.format(reaction))
+
+    # Check the ktp dct and fit_method to see how to fit rates
+    fit_method = _assess_fit_method(ktp_dct, inp_fit_method)
+
+    # Get the desired fits in the form of CHEMKIN strs
+    if fit_method is None:
+        return None
+    if fit_method == 'arrhenius':
+        chemkin_str = arr.perform_fits(
+            ktp_dct, reaction, mess_path,
+            a_conv_factor, arrfit_thresh, sing_fit=sing_fit)
+    elif fit_method == 'chebyshev':
+        chemkin_str = cheb.perform_fits(
+            reaction, cheb_fit, sing_fit=sing_fit)
+        if not chemkin_str:
             chemkin_str = arr.perform_fits(
                 ktp_dct, reaction, mess_path,
-                a_conv_factor, arrfit_thresh)
-        elif fit_method == 'chebyshev':
-            chemkin_str = cheb.perform_fits(
-                ktp_dct, inp_temps, reaction, mess_path,
-                a_conv_factor)
-            if not chemkin_str:
-                chemkin_str = arr.perform_fits(
-                    ktp_dct, reaction, mess_path,
-                    a_conv_factor, arrfit_thresh)
-        # elif fit_method == 'troe':
-        #     # chemkin_str += troe.perform_fits(
-        #     #     ktp_dct, reaction, mess_path,
-        #     #     troe_param_fit_lst,
-        #     #     a_conv_factor, err_thresh)
-
-        # Update the chemkin string dct
-        print('\n\nFinal Fitting Parameters in CHEMKIN Format:')
-        print(chemkin_str)
-        ridx = pes_formula + '_' + reaction.replace('=', '_')
-        chemkin_str_dct.update({ridx: chemkin_str})
+                a_conv_factor, arrfit_thresh, sing_fit=sing_fit)
+    # elif fit_method == 'troe':
+    #     # chemkin_str += troe.perform_fits(
+    #     #     ktp_dct, reaction, mess_path,
+    #     #     troe_param_fit_lst,
+    #     #     a_conv_factor, err_thresh)
+
+    print('\n\nFinal Fitting Parameters in CHEMKIN Format:')
+    print(chemkin_str)
+
+    return chemkin_str
 
-    return chemkin_str_dct
 
+def gen_reaction_pairs(label_dct, conn_pairs=None):
+    """ Generate the unordered pairs of the wells and bimolecular species
+        of a PES, in the order of the label dictionary, skipping fake
+        wells, barriers and pairs of the same label
 
-def gen_reaction_pairs(label_dct):
-    """ Generate pairs of reactions
+        If conn_pairs, an iterable of (label, label) pairs connected by a
+        channel of the PES, is given, only pairs of species that are
+        connected by some path of channels are generated
     """
-    rxn_pairs = ()
-    for name_i, lab_i in label_dct.items():
-        if 'F' not in lab_i and 'B' not in lab_i:
-            for name_j, lab_j in label_dct.items():
-                if 'F' not in lab_j and 'B' not in lab_j and lab_i != lab_j:
-                    rxn_pairs += (((name_i, lab_i), (name_j, lab_j)),)
-
-    sorted_rxn_pairs = ()
-    for pair in rxn_pairs:
-        rct, prd = pair
-        if (rct, prd) in sorted_rxn_pairs or (prd, rct) in sorted_rxn_pairs:
+
+    spc_items = [(name, lab) for name, lab in label_dct.items()
+                 if 'F' not in lab and 'B' not in lab]
+    if conn_pairs is not None:
+        comp_dct = _connected_components(conn_pairs)
+
+    for (name_i, lab_i), (name_j, lab_j) in itertools.combinations(
+            spc_items, 2):
+        if lab_i == lab_j:
             continue
-        sorted_rxn_pairs += ((rct, prd),)
+        if conn_pairs is not None:
+            comp_i = comp_dct.get(lab_i, lab_i)
+            if comp_i != comp_dct.get(lab_j, lab_j):
+                continue
+        yield (name_i, lab_i), (name_j, lab_j)
+
+
+def _connected_components(conn_pairs):
+    """ Map each label of a set of connected label pairs to a
+        representative label of its connected component
+    """
+
+    root_dct = {}
+
+    def _root(lab):
+        root_dct.setdefault(lab, lab)
+        while root_dct[lab] != lab:
+            root_dct[lab] = root_dct[root_dct[lab]]
+            lab = root_dct[lab]
+        return lab
 
-    return sorted_rxn_pairs
+    for lab_i, lab_j in conn_pairs:
+        root_i, root_j = _root(lab_i), _root(lab_j)
+        if root_i != root_j:
+            root_dct[root_j] = root_i
+
+    return {lab: _root(lab) for lab in list(root_dct)}
 
 
 # Readers
@@ -106,17 +182,59 @@ def read_rates(inp_temps, inp_pressures, inp_tunit, inp_punit,
         (1) filter out the invalid rates that are negative or undefined
         and obtain the pressure dependent values
     """
+    mess_temps, rate_table = read_rate_table(
+        inp_temps, inp_pressures, inp_tunit, inp_punit,
+        [(rct_lab, prd_lab)], mess_path)
+    return filter_rates(
+        mess_temps, rate_table[(rct_lab, prd_lab)], pdep_fit, inp_punit,
+        bimol=bimol)
+
+
+def read_rate_table(inp_temps, inp_pressures, inp_tunit, inp_punit,
+                    lab_pairs, mess_path):
+    """ Read the rate constants of a set of reactions from the MESS output,
+        reading the file only once
+
+        :return mess_temps: temperatures of the rate constants
+        :return rate_table: rate constants of each reaction at each pressure
+        :rtype: dict[(rct_lab, prd_lab): dict[pressure: rate_ks]]
+    """
 
-    # Dictionaries to store info; indexed by pressure (given in fit_ps)
-    calc_k_dct = {}
-    valid_calc_tk_dct = {}
-    ktp_dct = {}
+    # Index the rate tables of the MESS output, reading the whole output
+    # into a string only if its tables could not be indexed
+    mess_file = os.path.join(mess_path, 'rate.out')
+    print('mess file', mess_file)
+    with rateout.mapped(mess_file) as out_mm:
+        rate_idx = rateout.index(out_mm)
+        if rate_idx is not None:
+            mess_temps, tunit = rate_idx['temps'], rate_idx['tunit']
+            mess_pressures, punit = rate_idx['pressures'], rate_idx['punit']
+            rate_table = {
+                (rct_lab, prd_lab): {
+                    pressure: rateout.rate_ks(
+                        rate_idx, out_mm, rct_lab, prd_lab, pressure)
+                    for pressure in mess_pressures}
+                for rct_lab, prd_lab in lab_pairs}
+    if rate_idx is None:
+        mess_temps, tunit, mess_pressures, punit, rate_table = _read_rate_str(
+            mess_file, lab_pairs)
+
+    assert inp_temps <= mess_temps
+    assert inp_pressures <= mess_pressures
+    assert inp_tunit == tunit
+    assert inp_punit == punit
+
+    return mess_temps, rate_table
+
+
+def _read_rate_str(mess_file, lab_pairs):
+    """ Read the rate constants of a set of reactions from the string of
+        the MESS output
+    """
 
     # Read the MESS output file into a string
-    mess_file = mess_path+'/rate.out'
-    print('mess file', mess_file)
-    with open(mess_file, 'r') as mess_file:
-        output_string = mess_file.read()
+    with open(mess_file, 'r') as mess_obj:
+        output_string = mess_obj.read()
 
     # Read the temperatures and pressures out of the MESS output
     mess_temps, tunit = mess_io.reader.rates.get_temperatures(
@@ -124,24 +242,36 @@ def read_rates(inp_temps, inp_pressures, inp_tunit, inp_punit,
     mess_pressures, punit = mess_io.reader.rates.get_pressures(
         output_string)
 
-    assert inp_temps <= mess_temps
-    assert inp_pressures <= mess_pressures
-    assert inp_tunit == tunit
-    assert inp_punit == punit
+    # Loop over the reactions and the pressures obtained from the output
+    rate_table = {}
+    for rct_lab, prd_lab in lab_pairs:
+        calc_k_dct = {}
+        for pressure in mess_pressures:
 
-    # Loop over the pressures obtained from the MESS output
-    for pressure in mess_pressures:
+            # Read the rate constants
+            if pressure == 'high':
+                rate_ks = mess_io.reader.highp_ks(
+                    output_string, rct_lab, prd_lab)
+            else:
+                rate_ks = mess_io.reader.pdep_ks(
+                    output_string, rct_lab, prd_lab, pressure)
+
+            # Store in a dictionary
+            calc_k_dct[pressure] = rate_ks
+
+        rate_table[(rct_lab, prd_lab)] = calc_k_dct
+
+    return mess_temps, tunit, mess_pressures, punit, rate_table
 
-        # Read the rate constants
-        if pressure == 'high':
-            rate_ks = mess_io.reader.highp_ks(
-                output_string, rct_lab, prd_lab)
-        else:
-            rate_ks = mess_io.reader.pdep_ks(
-                output_string, rct_lab, prd_lab, pressure)
 
-        # Store in a dictionary
-        calc_k_dct[pressure] = rate_ks
+def filter_rates(mess_temps, calc_k_dct, pdep_fit, punit, bimol=False):
+    """ Filter out the invalid rates of a reaction that are negative or
+        undefined and obtain the pressure dependent values
+    """
+
+    # Dictionaries to store info; indexed by pressure (given in fit_ps)
+    valid_calc_tk_dct = {}
+    ktp_dct = {}
 
     # Remove k(T) vals at each P where where k is negative or undefined
     # If ANY valid k(T,P) vals at given pressure, store in dct
@@ -196,18 +326,7 @@ def _assess_fit_method(ktp_dct, inp_fit_method):
         rates exist to be fit.
     """
 
-    if ktp_dct:
-        pressures = list(ktp_dct.keys())
-        npressures = len(pressures)
-        # If only one pressure (outside HighP limit), just run Arrhenius
-        if npressures == 1:
-            fit_method = 'arrhenius'
-        elif npressures == 2 and 'high' in pressures:
-            fit_method = 'arrhenius'
-        else:
-            fit_method = inp_fit_method
-    else:
-        fit_method = None
+    fit_method = _fit_method(ktp_dct, inp_fit_method)
 
     # Print message to say what fitting will be done
     if fit_method == 'arrhenius':
@@ -223,3 +342,23 @@ def _assess_fit_method(ktp_dct, inp_fit_method):
         print('\nSkipping to next reaction...')
 
     return fit_method
+
+
+def _fit_method(ktp_dct, inp_fit_method):
+    """ Get the method to fit the rates with, None if there are no rates
+    """
+
+    if ktp_dct:
+        pressures = list(ktp_dct.keys())
+        npressures = len(pressures)
+        # If only one pressure (outside HighP limit), just run Arrhenius
+        if npressures == 1:
+            fit_method = 'arrhenius'
+        elif npressures == 2 and 'high' in pressures:
+            fit_method = 'arrhenius'
+        else:
+            fit_method = inp_fit_method
+    else:
+        fit_method = None
+
+    return fit_method
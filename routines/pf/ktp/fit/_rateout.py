@@ -0,0 +1,139 @@
+"""
+  Index of the rate tables in a MESS rate output file
+
+  The file is memory-mapped and read in one pass that records where the
+  Temperature-Species rate table of each pressure (and of the high-pressure
+  limit) sits in the file, along with the column of each reaction in it.
+  The rate constants of a reaction are then read from only the rows of the
+  table, which are split the first time the table is used and shared by
+  all reactions.
+"""
+
+import mmap
+import contextlib
+
+
+@contextlib.contextmanager
+def mapped(rate_out_path):
+    """ Memory-map a MESS rate output file for reading, yielding None if
+        the file is empty
+    """
+    with open(rate_out_path, 'rb') as out_obj:
+        try:
+            out_mm = mmap.mmap(out_obj.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            out_mm = None
+    if out_mm is None:
+        yield None
+    else:
+        with out_mm:
+            yield out_mm
+
+
+def index(out_mm):
+    """ Build the index of the rate tables of a memory-mapped MESS rate
+        output file
+
+        :return: index with the 'temps', 'tunit', 'pressures' and 'punit'
+            of the output and its 'tables', keyed by pressure;
+            None if the file has no rate tables that could be indexed
+    """
+
+    rate_idx = {
+        'temps': [], 'tunit': 'K', 'pressures': [], 'punit': None,
+        'tables': {}
+    }
+
+    if out_mm is not None:
+        out_mm.seek(0)
+        block, key, table = None, None, None
+        while True:
+            start = out_mm.tell()
+            line = out_mm.readline()
+            if not line:
+                break
+            line = line.decode()
+            stripped = line.strip()
+
+            # Rows of the table being read
+            if table is not None:
+                tokens = stripped.split()
+                if tokens and _is_float(tokens[0]):
+                    table['rows'].append((start, out_mm.tell()))
+                    continue
+                table = None
+
+            # Section headers
+            if 'High Pressure Rate Coefficients' in stripped:
+                block, key = 'tsrt', 'high'
+            elif 'Temperature-Species Rate Tables' in stripped:
+                block, key = 'tsrt', None
+            elif stripped.endswith('Tables:') or 'Capture/Escape' in stripped:
+                block, key = None, None
+            elif stripped.startswith('Temperature ='):
+                _, _, temp, *tunit = stripped.split()
+                rate_idx['tunit'] = tunit[0] if tunit else rate_idx['tunit']
+                if _is_float(temp) and float(temp) not in rate_idx['temps']:
+                    rate_idx['temps'].append(float(temp))
+            elif block == 'tsrt' and stripped.startswith('Pressure ='):
+                _, _, pressure, *punit = stripped.split()
+                key = float(pressure)
+                rate_idx['punit'] = punit[0] if punit else rate_idx['punit']
+            elif block == 'tsrt' and key is not None and '->' in stripped:
+                table = {
+                    'header': stripped.split(), 'rows': [], 'split': None}
+                rate_idx['tables'][key] = table
+                key = None
+
+    if not rate_idx['tables']:
+        return None
+
+    rate_idx['pressures'] = [key for key in rate_idx['tables']
+                             if key != 'high']
+    if 'high' in rate_idx['tables']:
+        rate_idx['pressures'].append('high')
+    if not rate_idx['temps']:
+        rows = _split_rows(next(iter(rate_idx['tables'].values())), out_mm)
+        rate_idx['temps'] = [float(row[0]) for row in rows]
+
+    return rate_idx
+
+
+def rate_ks(rate_idx, out_mm, rct_lab, prd_lab, pressure):
+    """ Get the rate constants of a reaction at a pressure (or 'high')
+        from the index, as the strings in the output, one per temperature
+    """
+
+    table = rate_idx['tables'].get(pressure)
+    if table is None:
+        return ()
+
+    header = table['header']
+    reaction = rct_lab + '->' + prd_lab
+    if reaction not in header:
+        return ()
+
+    # Rows may have fewer leading columns than the header (e.g. 'T, K')
+    col = header.index(reaction)
+    return tuple(row[col - (len(header) - len(row))]
+                 for row in _split_rows(table, out_mm))
+
+
+def _split_rows(table, out_mm):
+    """ Split the rows of a table into columns, once
+    """
+    if table['split'] is None:
+        table['split'] = [out_mm[row_start:row_end].decode().split()
+                          for row_start, row_end in table['rows']]
+    return table['split']
+
+
+def _is_float(val):
+    """ Check if a string is a float
+    """
+    try:
+        float(val)
+        is_float = True
+    except ValueError:
+        is_float = False
+    return is_float
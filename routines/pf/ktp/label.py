@@ -33,6 +33,21 @@ def make_pes_label_dct(rxn_lst, pes_idx, spc_dct, spc_model_dct):
     return pes_label_dct
 
 
+def make_pes_conn_pairs(rxn_lst, label_dct):
+    """ Get the pairs of labels of the reactants and products of each
+        channel of the PES, which give the connectivity of the PES
+    """
+
+    def _label(spcs):
+        key = '+'.join(spcs)
+        if key not in label_dct:
+            key = '+'.join(spcs[::-1])
+        return label_dct[key]
+
+    return tuple((_label(rxn['reacs']), _label(rxn['prods']))
+                 for rxn in rxn_lst)
+
+
 def _make_channel_label_dct(tsname, chn_idx, label_dct, rxn, spc_dct,
                             rwell_model, pwell_model):
     """ Builds a dictionary that matches the mechanism name to the labels used
@@ -0,0 +1,182 @@
+"""
+  Content-addressed cache of the info dictionaries of the species blocks
+
+  Building the info dictionary of a species reads rotors, hindered-rotor
+  potentials, frequencies and energies from the save filesystem and runs
+  ProjRot and MESS, which is repeated for every channel (and every PES)
+  the species is on. The finished dictionaries are kept in a directory of
+  the save filesystem, one file per species, models and levels. Each is
+  stored with a fingerprint of the files read to build it: the lowest
+  energy conformers of the species and of the basis species used for its
+  heat of formation (and the tau samples for tau models). It is rebuilt
+  if any of those change, or if another conformer becomes the lowest.
+"""
+
+import os
+import copy
+import pickle
+import hashlib
+import autofile
+from lib import filesys
+from routines.pf.thermo import basis
+from lib.filesys._lock import LOCK_NAME
+
+
+CACHE_DIR_NAME = 'INF_CACHE'
+_SKIP_NAMES = (filesys.spcdb.DB_NAME, filesys.cnfidx.INDEX_NAME, LOCK_NAME)
+_MEM_CACHE = {}
+
+
+def read(spc_dct, spc_name, pf_models, pf_levels, key_objs,
+         run_prefix, save_prefix):
+    """ Get the cached info dictionary, and the energies of the basis
+        species used to build it, for a species; None if not cached or if
+        the files read for it have changed since
+    """
+
+    key = _key(spc_dct[spc_name], key_objs)
+    ent = _MEM_CACHE.get(key)
+    if ent is None:
+        cache_file = os.path.join(save_prefix, CACHE_DIR_NAME, key + '.pkl')
+        if os.path.exists(cache_file):
+            try:
+                with open(cache_file, 'rb') as cache_obj:
+                    ent = pickle.load(cache_obj)
+            except (pickle.UnpicklingError, EOFError):
+                print('Info cache at {} is corrupt. Rebuilding...'
+                      .format(cache_file))
+
+    ret = None
+    if ent is not None:
+        fprint = _fingerprint(
+            spc_dct, spc_name, ent['basis_ene_dct'], pf_models, pf_levels,
+            run_prefix, save_prefix)
+        if fprint is not None and ent['fingerprint'] == fprint:
+            _MEM_CACHE[key] = ent
+            ret = copy.deepcopy((ent['inf_dct'], ent['basis_ene_dct']))
+
+    return ret
+
+
+def write(spc_dct, spc_name, pf_models, pf_levels, key_objs,
+          run_prefix, save_prefix, inf_dct, basis_ene_dct):
+    """ Add the info dictionary of a species, and the energies of all of
+        the basis species used to build it, to the cache
+    """
+
+    fprint = _fingerprint(
+        spc_dct, spc_name, basis_ene_dct, pf_models, pf_levels,
+        run_prefix, save_prefix)
+    if fprint is None:
+        return
+
+    key = _key(spc_dct[spc_name], key_objs)
+    ent = {
+        'fingerprint': fprint,
+        'inf_dct': copy.deepcopy(inf_dct),
+        'basis_ene_dct': copy.deepcopy(basis_ene_dct)
+    }
+    _MEM_CACHE[key] = ent
+
+    cache_path = os.path.join(save_prefix, CACHE_DIR_NAME)
+    cache_file = os.path.join(cache_path, key + '.pkl')
+    tmp_file = '{}.{}.tmp'.format(cache_file, os.getpid())
+    os.makedirs(cache_path, exist_ok=True)
+    with open(tmp_file, 'wb') as cache_obj:
+        pickle.dump(ent, cache_obj)
+    os.replace(tmp_file, cache_file)
+
+
+def _key(spc_dct_i, key_objs):
+    """ Hash of the species and the models and levels used for it
+    """
+    return hashlib.sha256(
+        repr((_norm(spc_dct_i), _norm(key_objs))).encode()).hexdigest()
+
+
+def _fingerprint(spc_dct, spc_name, basis_ichs, pf_models, pf_levels,
+                 run_prefix, save_prefix):
+    """ Hash of the paths, sizes and modification times of the files read
+        to build the info of a species; None if it has no conformers
+    """
+
+    spc_dct_lst = [spc_dct[spc_name]]
+    spc_dct_lst.extend(_basis_spc_dct(spc_dct, ich) for ich in basis_ichs)
+
+    stats = []
+    for spc_dct_i in spc_dct_lst:
+        paths = _read_paths(
+            spc_dct_i, pf_models, pf_levels, run_prefix, save_prefix)
+        if not paths:
+            return None
+        for path in paths:
+            stats.extend(_file_stats(path))
+
+    return hashlib.sha256(repr(sorted(stats)).encode()).hexdigest()
+
+
+def _read_paths(spc_dct_i, pf_models, pf_levels, run_prefix, save_prefix):
+    """ Directories read for the info of a species: the lowest energy
+        conformer at each level, with its single points, symmetry samples
+        and scans, and the tau samples for tau models
+    """
+
+    pf_filesystems = filesys.models.pf_filesys(
+        spc_dct_i, pf_levels, run_prefix, save_prefix, False)
+
+    paths = []
+    for _, cnf_path, min_cnf_locs, thy_path, _ in pf_filesystems.values():
+        if not min_cnf_locs:
+            return []
+        paths.append(cnf_path)
+        if 'tau' in (pf_models['vib'], pf_models['tors']):
+            paths.append(autofile.fs.tau(thy_path)[0].path())
+
+    return sorted(set(paths))
+
+
+def _basis_spc_dct(spc_dct, ich):
+    """ The species dictionary used for a basis species, as in
+        basis.basis_energy
+    """
+    for name, spc_dct_i in spc_dct.items():
+        if name != 'global' and 'ts' not in name:
+            if spc_dct_i['inchi'] == ich:
+                return spc_dct_i
+    return basis.create_spec(ich)
+
+
+def _file_stats(path):
+    """ Paths, sizes and modification times of the files under a path,
+        without the index and lock files
+    """
+
+    stats = []
+    for dir_path, _, file_names in os.walk(path):
+        for file_name in file_names:
+            if file_name in _SKIP_NAMES:
+                continue
+            file_path = os.path.join(dir_path, file_name)
+            try:
+                stat = os.stat(file_path)
+            except FileNotFoundError:
+                continue
+            stats.append(
+                (file_path, stat.st_size, stat.st_mtime_ns))
+
+    return stats
+
+
+def _norm(obj):
+    """ Turn an object into nested tuples, sorting dictionaries and sets,
+        so that its repr does not depend on insertion order
+    """
+    if isinstance(obj, dict):
+        obj = tuple(sorted(
+            ((repr(key), _norm(val)) for key, val in obj.items()),
+            key=lambda item: item[0]))
+    elif isinstance(obj, (set, frozenset)):
+        obj = tuple(sorted(repr(_norm(val)) for val in obj))
+    elif isinstance(obj, (list, tuple)):
+        obj = tuple(_norm(val) for val in obj)
+    return obj
@@ -80,7 +80,6 @@ def int_sym_num_from_sampling(sym_geos, frm_bnd_keys=(), brk_bnd_keys=()):
     # Set saddle
     saddle = bool(frm_bnd_keys or brk_bnd_keys)
 
-    int_sym_num = 0
     # modify geometries to remove H's from rotatable XHn end group
     # this will be accounted for separately as multiplicative factor
     mod_sym_geos = []
@@ -88,22 +87,11 @@ def int_sym_num_from_sampling(sym_geos, frm_bnd_keys=(), brk_bnd_keys=()):
         mod_geo_sym_i, end_group_factor = automol.geom.end_group_sym_factor(
             geo_sym_i, frm_bnd_keys, brk_bnd_keys)
         # print('end_group_factor test:', end_group_factor)
+        mod_sym_geos.append(mod_geo_sym_i)
 
-        new_geom = True
-        for mod_geo_sym_j in mod_sym_geos:
-            if automol.geom.almost_equal_dist_matrix(
-                    mod_geo_sym_i, mod_geo_sym_j, thresh=3e-1):
-                if saddle:
-                    new_geom = False
-                    break
-                tors_same = structure.geom.are_torsions_same(
-                    mod_geo_sym_i, mod_geo_sym_j, ts_bnds=())
-                if tors_same:
-                    new_geom = False
-                    break
-        if new_geom:
-            mod_sym_geos.append(mod_geo_sym_i)
-            int_sym_num += 1
+    # count the geometries with distinct distance matrices and torsions
+    int_sym_num = int(sum(structure.geom.unique_mask(
+        mod_sym_geos, saddle=saddle, thresh=3e-1)))
 
     int_sym_num *= end_group_factor
 
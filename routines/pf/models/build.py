@@ -19,6 +19,7 @@ from routines.pf.models import _vib as vib
 from routines.pf.models import _flux as flux
 from routines.pf.models import _pst as pst
 from routines.pf.models import _util as util
+from routines.pf.models import _infcache as infcache
 from routines.pf.thermo import basis 
 from routines.pf.thermo import heatform
 from lib.structure import tors as torsprep
@@ -38,6 +39,24 @@ def read_spc_data(spc_dct, spc_name,
 
     vib_model, tors_model = chn_pf_models['vib'], chn_pf_models['tors']
     spc_dct_i = spc_dct[spc_name]
+
+    # Use the info built for the species before with the same models and
+    # levels, if nothing it was built from has been saved since (atoms are
+    # quick to build and are not cached)
+    cache_objs = (spc_name, chn_pf_models, chn_pf_levels,
+                  ref_pf_models, ref_pf_levels, calc_chn_ene)
+    cached = None
+    if not typ.is_atom(spc_dct_i):
+        cached = infcache.read(
+            spc_dct, spc_name, chn_pf_models, chn_pf_levels, cache_objs,
+            run_prefix, save_prefix)
+    if cached is not None:
+        print(' - Using the cached info for {}'.format(spc_name))
+        inf_dct, basis_ene_dct = cached
+        chn_basis_ene_dct.update(basis_ene_dct)
+        return inf_dct, chn_basis_ene_dct
+    basis_ichs = []
+
     if typ.is_atom(spc_dct_i):
         inf_dct = atm_data(
             spc_dct, spc_name,
@@ -57,12 +76,21 @@ def read_spc_data(spc_dct, spc_name,
                 spc_name, spc_dct,
                 chn_pf_models, chn_pf_levels,
                 ref_pf_models, ref_pf_levels, chn_basis_ene_dct,
-                run_prefix, save_prefix, calc_chn_ene=calc_chn_ene, saddle=False)
+                run_prefix, save_prefix, calc_chn_ene=calc_chn_ene, saddle=False,
+                basis_ichs=basis_ichs)
             writer = 'species_block'
 
     # Add writer to inf dct
     inf_dct['writer'] = writer
 
+    # Only cache species with basis species that can be checked
+    if (not typ.is_atom(spc_dct_i) and
+            all(isinstance(ich, str) for ich in basis_ichs)):
+        infcache.write(
+            spc_dct, spc_name, chn_pf_models, chn_pf_levels, cache_objs,
+            run_prefix, save_prefix, inf_dct,
+            {ich: chn_basis_ene_dct[ich] for ich in basis_ichs})
+
     return inf_dct, chn_basis_ene_dct
 
 
@@ -235,8 +263,11 @@ def atm_data(spc_dct, spc_name,
 
 def mol_data(spc_name, spc_dct,
              chn_pf_models, chn_pf_levels, ref_pf_models, ref_pf_levels, chn_basis_ene_dct,
-             run_prefix, save_prefix, calc_chn_ene=True, saddle=False):
+             run_prefix, save_prefix, calc_chn_ene=True, saddle=False,
+             basis_ichs=None):
     """ Pull all of the neccessary information from the filesystem for a species
+        (the basis species used for the heat of formation are added to
+        basis_ichs, if given)
     """
     
     spc_dct_i = spc_dct[spc_name]
@@ -389,6 +420,8 @@ def mol_data(spc_name, spc_dct,
                     for entry in basprods:
                         spc_basis_i += entry
                 chn_basis_ene_dct[spc_basis_i] = ene_basis_i
+        if basis_ichs is not None:
+            basis_ichs.extend(spc_basis)
         print('ene from thmroutines: ', ene_spc)
 
         # Calculate and store the 0 K Enthalpy
@@ -427,6 +460,8 @@ def mol_data(spc_name, spc_dct,
                         run_prefix, save_prefix)
                     for spc_basis_i, ene_basis_i in zip(spc_basis_trs, ene_basis_trs):
                         chn_basis_ene_dct[spc_basis_i] = ene_basis_i
+                if basis_ichs is not None:
+                    basis_ichs.extend(spc_basis_trs)
                 ene_spc_trs = ene_chnlvl    
                 hf0K_trs = heatform.calc_hform_0k(
                     ene_spc_trs, ene_basis_trs, spc_basis_trs, coeff_basis_trs, ref_set=ref_enes)
@@ -10,7 +10,9 @@ from routines.pf.runner.mess import write_cwd_pf_file
 from routines.pf.runner.mess import read_mess_file
 from routines.pf.runner.mess import read_messpf_temps
 from routines.pf.runner.mess import run_rates
+from routines.pf.runner.mess import run_rates_lst
 from routines.pf.runner.mess import run_pf
+from routines.pf.runner.mess import run_pfs
 from routines.pf.runner.thermo import thermo_paths
 from routines.pf.runner.thermo import run_thermp
 from routines.pf.runner.thermo import run_pac
@@ -26,7 +28,9 @@ __all__ = [
     'read_mess_file',
     'read_messpf_temps',
     'run_rates',
+    'run_rates_lst',
     'run_pf',
+    'run_pfs',
     'thermo_paths',
     'run_thermp',
     'run_pac',
@@ -7,6 +7,7 @@ import numpy
 import automol
 import mess_io
 from lib.submission import run_script
+from lib.submission import run_parallel
 from lib.submission import DEFAULT_SCRIPT_DCT
 
 
@@ -209,6 +210,28 @@ def run_rates(mess_path, script_str=DEFAULT_SCRIPT_DCT['messrate']):
     run_script(script_str, mess_path)
 
 
+def run_rates_lst(mess_paths, script_str=DEFAULT_SCRIPT_DCT['messrate'],
+                  nprocs=1):
+    """ Run a set of independent mess rate files that were written, with
+        at most nprocs of them running at once. A failed run does not
+        stop the others.
+
+        :returns: whether each run succeeded
+        :rtype: list(bool)
+    """
+    rets = run_parallel(
+        _run_rates, [(path, script_str) for path in mess_paths],
+        nprocs=nprocs, ignore_failed=True)
+    return [ret is not None for ret in rets]
+
+
+def _run_rates(mess_path, script_str):
+    """ Run a mess rate file, returning True if it did not fail
+    """
+    run_rates(mess_path, script_str=script_str)
+    return True
+
+
 def run_pf(mess_path, script_str=DEFAULT_SCRIPT_DCT['messpf']):
     """ Run the mess file that was wriiten
     """
@@ -219,3 +242,29 @@ def run_pf(mess_path, script_str=DEFAULT_SCRIPT_DCT['messpf']):
         run_script(script_str, mess_path)
     else:
         print('No MESS input file at path: {}'.format(mess_path))
+
+
+def run_pfs(mess_paths, script_str=DEFAULT_SCRIPT_DCT['messpf'], nprocs=1):
+    """ Run a set of independent mess files that were written, with
+        at most nprocs of them running at once. A failed run does not
+        stop the others.
+
+        :returns: whether each run succeeded
+        :rtype: list(bool)
+    """
+    rets = run_parallel(
+        _run_pf, [(path, script_str) for path in mess_paths],
+        nprocs=nprocs, ignore_failed=True)
+    return [ret is not None for ret in rets]
+
+
+def _run_pf(mess_path, script_str):
+    """ Run a mess file, returning True if it did not fail
+    """
+    success = None
+    if os.path.exists(mess_path):
+        run_pf(mess_path, script_str=script_str)
+        success = True
+    else:
+        print('No MESS input file at path: {}'.format(mess_path))
+    return success
@@ -4,9 +4,10 @@
 
 import sys
 import os
+import copy
 import math
-import multiprocessing
-import random
+import pickle
+import hashlib
 
 import automol.inchi
 import automol.geom
@@ -14,6 +15,8 @@ from routines.pf.models.ene import read_energy
 from routines.pf.thermo import heatform
 from phydat import phycon
 from lib import filesys
+from lib.submission import run_parallel
+from lib.submission import nproc_avail
 
 
 # FUNCTIONS TO PREPARE THE LIST OF REFERENCE SPECIES NEEDED FOR THERM CALCS #
@@ -38,6 +41,93 @@ TS_REF_CALLS = {"basic": "get_basic_ts",
                 "cbh2_1": "get_cbhone_ts",
                 "cbh3": "get_cbhone_ts"}
 
+# Cache of the basis species and coefficients found by each scheme, kept
+# in memory and, if a path is set, in a directory shared by all later runs
+# with one file per call. The version is part of the key: increase it when
+# the scheme functions change so that older entries are not used
+REF_CACHE_DIR_NAME = 'REF_CACHE'
+REF_CACHE_VERSION = 1
+_REF_CACHE = {'path': None, 'dct': {}}
+
+
+def set_ref_cache_path(path):
+    """ Set the directory the reference basis cache directory is kept in
+    """
+    _REF_CACHE['path'] = path
+    _REF_CACHE['dct'] = {}
+
+
+def _cached_ref_fxn(ref_scheme, ref_fxn, *args, **kwargs):
+    """ Call a function getting the basis and coefficients of a species
+        (or TS) for a scheme, or get them from the cache if it has been
+        called with the same species before
+    """
+    key = _ref_cache_key(ref_scheme, ref_fxn.__name__, args, kwargs)
+    ref = _REF_CACHE['dct'].get(key)
+    if ref is None:
+        ref = _read_ref_cache(key)
+    if ref is not None:
+        print('Using cached basis from {}'.format(ref_fxn.__name__))
+    else:
+        ref = ref_fxn(*args, **kwargs)
+        _write_ref_cache(key, ref)
+    _REF_CACHE['dct'][key] = ref
+    # Copy since the basis lists are changed by the callers
+    return copy.deepcopy(ref)
+
+
+def _ref_cache_key(ref_scheme, fxn_name, args, kwargs):
+    """ Build a key for the call of a scheme function: a hash of the cache
+        version, the scheme and function, and the inchi of a species, or
+        the z-matrix, geometry and bond keys of a TS
+    """
+    def _norm(obj):
+        if isinstance(obj, dict):
+            obj = tuple(sorted((key, _norm(val)) for key, val in obj.items()))
+        elif isinstance(obj, (set, frozenset)):
+            obj = tuple(sorted(_norm(val) for val in obj))
+        elif isinstance(obj, (list, tuple)):
+            obj = tuple(_norm(val) for val in obj)
+        return obj
+    return hashlib.sha256(repr(
+        (REF_CACHE_VERSION, ref_scheme, fxn_name, _norm(args), _norm(kwargs))
+    ).encode()).hexdigest()
+
+
+def _ref_cache_file(key):
+    """ The file of an entry of the reference basis cache
+    """
+    return os.path.join(_REF_CACHE['path'], REF_CACHE_DIR_NAME, key + '.pkl')
+
+
+def _read_ref_cache(key):
+    """ Read an entry of the reference basis cache, if there is one
+    """
+    ref = None
+    if _REF_CACHE['path'] is not None:
+        cache_file = _ref_cache_file(key)
+        if os.path.exists(cache_file):
+            try:
+                with open(cache_file, 'rb') as cache_obj:
+                    ref = pickle.load(cache_obj)
+            except (pickle.UnpicklingError, EOFError):
+                print('Reference basis cache at {} is corrupt. Rebuilding...'
+                      .format(cache_file))
+    return ref
+
+
+def _write_ref_cache(key, ref):
+    """ Write an entry of the reference basis cache to its own file
+    """
+    if _REF_CACHE['path'] is not None:
+        cache_file = _ref_cache_file(key)
+        tmp_file = '{}.{}.tmp'.format(cache_file, os.getpid())
+        os.makedirs(os.path.dirname(cache_file), exist_ok=True)
+        with open(tmp_file, 'wb') as cache_obj:
+            pickle.dump(ref, cache_obj)
+        os.replace(tmp_file, cache_file)
+
+
 IMPLEMENTED_CBH_TS_CLASSES = ['hydrogen abstraction high', 
                               # 'hydrogen migration', 
                               'beta scission',
@@ -47,63 +137,83 @@ IMPLEMENTED_CBH_TS_CLASSES = ['hydrogen abstraction high',
 #IMPLEMENTED_CBH_TS_CLASSES = []
                               # 'hydrogen migration', 'addition high', 'elimination high']
 
-def prepare_refs(ref_scheme, spc_dct, spc_queue, repeats=False, parallel=False, ts_geom=None):
+def prepare_refs(ref_scheme, spc_dct, spc_queue, repeats=False, parallel=False,
+                 ts_geom=None, nprocs=None):
     """ add refs to species list as necessary
+
+        For a parallel run, the species are split over at most nprocs
+        processes and the reference species found by each are merged,
+        in the order of the species queue.
     """
     spc_names = [spc[0] for spc in spc_queue]
 
     if parallel:
-        nproc_avail = len(os.sched_getaffinity(0)) - 1
-
-        num_spc = len(spc_names)
-        spc_per_proc = math.floor(num_spc / nproc_avail)
-
-        queue = multiprocessing.Queue()
-        procs = []
-        random.shuffle(spc_names)
-        for proc_n in range(nproc_avail):
-            spc_start = proc_n*spc_per_proc
-            if proc_n == nproc_avail - 1:
-                spc_end = num_spc
-            else:
-                spc_end = (proc_n+1)*spc_per_proc
-
-            spc_lst = spc_names[spc_start:spc_end]
-
-            proc = multiprocessing.Process(
-                target=_prepare_refs,
-                args=(queue, ref_scheme, spc_dct, spc_lst,
-                      repeats, parallel, ts_geom))
-            procs.append(proc)
-            proc.start()
-
+        if nprocs is None:
+            nprocs = nproc_avail()
+        nprocs = max(min(nprocs, len(spc_names)), 1)
+
+        # Split the species queue into contiguous blocks, one per process
+        nspc_per_proc = math.ceil(len(spc_names) / nprocs)
+        spc_lsts = [spc_names[idx:idx+nspc_per_proc]
+                    for idx in range(0, len(spc_names), nspc_per_proc)]
+        rets = run_parallel(
+            _prepare_refs,
+            [(ref_scheme, spc_dct, spc_lst, repeats, ts_geom)
+             for spc_lst in spc_lsts],
+            nprocs=nprocs, ignore_failed=True)
+        if any(ret is None for ret in rets):
+            print('*ERROR: Failed to determine the basis of some species')
+            sys.exit()
+
+        # Merge the dcts, renaming the reference species found by more
+        # than one process only once
         basis_dct = {}
         unique_refs_dct = {}
-        for _ in procs:
-            bas_dct, unq_dct = queue.get()
+        ref_keys = set()
+        for bas_dct, unq_dct in rets:
             basis_dct.update(bas_dct)
-            bas_ichs = [unique_refs_dct[spc]['inchi'] if 'inchi' in unique_refs_dct[spc]
-                        else unique_refs_dct['reacs'] for spc in unique_refs_dct.keys()]
-            for spc in unq_dct:
-                new_ich = unq_dct[spc]['inchi'] if 'inchi' in unq_dct[spc] else unq_dct[spc]['reacs']
-                if new_ich not in bas_ichs:
-                    cnt = len(list(unique_refs_dct.keys())) + 1
-                    if isinstance(new_ich, str):
+            for spec in unq_dct.values():
+                ref_key = _spec_ref_key(spec)
+                if ref_key not in ref_keys:
+                    ref_keys.add(ref_key)
+                    cnt = len(unique_refs_dct) + 1
+                    if 'inchi' in spec:
                         ref_name = 'REF_{}'.format(cnt)
-                        unique_refs_dct[ref_name] = unq_dct[spc]
                     else:
                         ref_name = 'TS_REF_{}'.format(cnt)
-                        unique_refs_dct[ref_name] = unq_dct[spc]
-        for proc in procs:
-            proc.join()
+                    unique_refs_dct[ref_name] = spec
     else:
         basis_dct, unique_refs_dct = _prepare_refs(
-            None, ref_scheme, spc_dct, spc_names, repeats=repeats, parallel=parallel,
-            ts_geom=ts_geom)
+            ref_scheme, spc_dct, spc_names, repeats=repeats, ts_geom=ts_geom)
     return basis_dct, unique_refs_dct
 
-def _prepare_refs(queue, ref_scheme, spc_dct, spc_names, repeats=False, parallel=False,
+
+def _ref_key(ref):
+    """ Hashable key of a reference species (inchi) or TS (inchis of the
+        reactants and products)
+    """
+    if isinstance(ref, str):
+        key = ref
+    else:
+        key = (tuple(ref[0]), tuple(ref[1]))
+    return key
+
+
+def _spec_ref_key(spec):
+    """ Key of the reference species (or TS) a species dct was built for
+    """
+    if 'inchi' in spec:
+        key = spec['inchi']
+    else:
+        key = (tuple(spec['reacs']), tuple(spec['prods']))
+    return key
+
+
+def _prepare_refs(ref_scheme, spc_dct, spc_names, repeats=False,
                   ts_geom=None):
+    """ Determine the basis of each species and the reference species
+        needed for them that are not in the species dct
+    """
     print('Processor {} will prepare species: {}'.format(os.getpid(), ', '.join(spc_names)))
     spc_ichs = [spc_dct[spc]['inchi'] for spc in spc_names]
     dct_ichs = [spc_dct[spc]['inchi'] for spc in spc_dct.keys()
@@ -123,6 +233,10 @@ def _prepare_refs(queue, ref_scheme, spc_dct, spc_names, repeats=False, parallel
 
     basis_dct = {}
     unique_refs_dct = {}
+    # Index the inchis to check the reference species against
+    ref_keys = set()
+    spc_ich_set = set(spc_ichs)
+    dct_ich_set = set(dct_ichs)
     # print('spc dct: ', spc_dct.keys())
     run_prefix = None
     save_prefix = None
@@ -143,7 +257,8 @@ def _prepare_refs(queue, ref_scheme, spc_dct, spc_names, repeats=False, parallel
                     print('geo geo', automol.geom.string(geo))
                     print('keys1', frm_bnd_keys, brk_bnd_keys)
                     print('keys2', spc_dct[spc_name]['frm_bnd_keys'], spc_dct[spc_name]['brk_bnd_keys'])
-                    spc_basis, coeff_basis = get_ts_ref_fxn(
+                    spc_basis, coeff_basis = _cached_ref_fxn(
+                        ref_scheme, get_ts_ref_fxn,
                         spc_dct[spc_name]['zma'], spc_dct[spc_name]['class'],
                         frm_bnd_keys, brk_bnd_keys, 
                         geo=geo, backup_zma=zma, backup_frm_key=spc_dct[spc_name]['frm_bnd_keys'],
@@ -153,7 +268,8 @@ def _prepare_refs(queue, ref_scheme, spc_dct, spc_names, repeats=False, parallel
                           spc_dct[spc_name]['brk_bnd_keys'])
                     print(automol.geom.string(automol.zmatrix.geometry(
                         spc_dct[spc_name]['zma'])))
-                    spc_basis, coeff_basis = get_ts_ref_fxn(
+                    spc_basis, coeff_basis = _cached_ref_fxn(
+                        ref_scheme, get_ts_ref_fxn,
                         spc_dct[spc_name]['zma'], spc_dct[spc_name]['class'],
                         spc_dct[spc_name]['frm_bnd_keys'],
                         spc_dct[spc_name]['brk_bnd_keys'])
@@ -176,7 +292,8 @@ def _prepare_refs(queue, ref_scheme, spc_dct, spc_names, repeats=False, parallel
                                 if bas_i == bas_j:
                                     coeff_basis[j] += c_bas_i
         else:
-            spc_basis, coeff_basis = get_ref_fxn(spc_ich)
+            spc_basis, coeff_basis = _cached_ref_fxn(
+                ref_scheme, get_ref_fxn, spc_ich)
         for i in range(len(spc_basis)):
             if isinstance(spc_basis[i], str):
                 spc_basis[i] = automol.inchi.add_stereo(spc_basis[i])[0]
@@ -190,32 +307,31 @@ def _prepare_refs(queue, ref_scheme, spc_dct, spc_names, repeats=False, parallel
 
         # Add to the dct with reference dct if it is not in the spc dct
         for ref in spc_basis:
-            bas_ichs = [unique_refs_dct[spc]['inchi'] if 'inchi' in unique_refs_dct[spc]
-                        else unique_refs_dct[spc]['reacs'] for spc in unique_refs_dct.keys()]
-            cnt = len(list(unique_refs_dct.keys())) + 1
+            ref_key = _ref_key(ref)
+            if ref_key in ref_keys:
+                continue
+            cnt = len(unique_refs_dct) + 1
             if isinstance(ref, str):
-                if ((ref not in spc_ichs and ref not in dct_ichs)
-                        or repeats) and ref not in bas_ichs:
+                if ((ref not in spc_ich_set and ref not in dct_ich_set)
+                        or repeats):
                     ref_name = 'REF_{}'.format(cnt)
                     msg += '\nAdding reference species {}, InChI string:{}'.format(
                         ref, ref_name)
                     unique_refs_dct[ref_name] = create_spec(ref)
+                    ref_keys.add(ref_key)
             else:
-                if (((((ref not in spc_ichs and ref not in dct_ichs) or repeats) and ref not in bas_ichs) or
-                      (ref[::-1] not in spc_ichs and ref[::-1] not in dct_ichs) or repeats) and ref not in bas_ichs[::-1]):
-                    ref_name = 'TS_REF_{}'.format(cnt)
-                    msg += '\nAdding reference species {}, InChI string:{}'.format(
-                        ref, ref_name)
-                    unique_refs_dct[ref_name] = create_ts_spc(
-                        ref, spc_dct, spc_dct[spc_name]['mult'], run_prefix, save_prefix,
-                        rxnclass)
+                ref_name = 'TS_REF_{}'.format(cnt)
+                msg += '\nAdding reference species {}, InChI string:{}'.format(
+                    ref, ref_name)
+                unique_refs_dct[ref_name] = create_ts_spc(
+                    ref, spc_dct, spc_dct[spc_name]['mult'], run_prefix, save_prefix,
+                    rxnclass)
+                ref_keys.add(ref_key)
     print(msg)
-    if parallel:
-        queue.put((basis_dct, unique_refs_dct))
-    else:
-        return basis_dct, unique_refs_dct
 
- #   return basis_dct, unique_refs_dct
+    return basis_dct, unique_refs_dct
+
+
 def create_ts_spc(ref, spc_dct, mult, run_prefix, save_prefix, rxnclass):
     """ add a ts species to the species dictionary
     """
@@ -18,6 +18,9 @@ EH2KCAL = qcc.conversion_factor('hartree', 'kcal/mol')
 # Path  the database files (stored in the thermo src directory)
 SRC_PATH = os.path.dirname(os.path.realpath(__file__))
 
+# Thermo database files read so far in the process
+_REF_TABLE_DCT = {}
+
 
 def calc_hform_0k(hzero_mol, hzero_basis, basis, coeff, ref_set):
     """ calculates the heat-of-formation at 0 K
@@ -44,33 +47,57 @@ def calc_hform_0k(hzero_mol, hzero_basis, basis, coeff, ref_set):
 def get_ref_h(species, ref, temp, ts=False):
     """ gets a reference value
     """
+    return get_ref_hs([species], ref, temp, ts=ts)[0]
+
+
+def get_ref_hs(species_lst, ref, temp, ts=False):
+    """ gets the reference values for a list of species (or TSs), reading
+        the thermo database file only the first time it is used
+    """
+
+    ref_table = _ref_table(temp, ts)
+
+    h_species_lst = []
+    for species in species_lst:
+        # Find the energy value for the given species and enery type
+        if ts:
+            rcts, prds = species
+            rct_str = '+'.join(rcts)
+            prd_str = '+'.join(prds)
+            species = '='.join([rct_str, prd_str])
+        val = ref_table.get(species, {}).get(ref)
+        h_species = float(val) if val else None
+        assert h_species is not None, (
+            'Could not find heat of formation for {} '.format(species)
+            )
+        h_species_lst.append(h_species)
+
+    return h_species_lst
+
+
+def _ref_table(temp, ts):
+    """ Read the thermo database file into a dct of the rows of each
+        species, keyed by inchi and reference set, or get the one read
+        before in this process
+    """
 
     # Set path and name to thermo database file
     if ts:
         thermodb_name = 'tsthermodb_{}K.csv'.format(str(int(temp)))
-    else:    
+    else:
         thermodb_name = 'thermodb_{}K.csv'.format(str(int(temp)))
-    thermodb_file = os.path.join(SRC_PATH, thermodb_name)
-    # Find the energy value for the given species and enery type
-    h_species = None
-    if ts:
-        rcts, prds = species
-        rct_str = '+'.join(rcts)
-        prd_str = '+'.join(prds)
-        species = '='.join([rct_str, prd_str])
-    with open(thermodb_file, 'r') as db_file:
-        reader = csv.DictReader(db_file)
-        for row in reader:
-            if row['inchi'] == species:
-                val = row[ref]
-                if val == '':
-                    val = None
-                h_species = float(val)
-    assert h_species is not None, (
-        'Could not find heat of formation for {} '.format(species)
-        )
-
-    return h_species
+
+    if thermodb_name not in _REF_TABLE_DCT:
+        thermodb_file = os.path.join(SRC_PATH, thermodb_name)
+        ref_table = {}
+        with open(thermodb_file, 'r') as db_file:
+            reader = csv.DictReader(db_file)
+            for row in reader:
+                # Later rows for a species replace earlier ones
+                ref_table[row['inchi']] = row
+        _REF_TABLE_DCT[thermodb_name] = ref_table
+
+    return _REF_TABLE_DCT[thermodb_name]
 
 
 def select_basis(atom_dct):
@@ -8,12 +8,45 @@ import thermp_io
 import pac99_io
 from routines.pf import runner as pfrunner
 from lib.amech_io import writer
+from lib.submission import run_parallel
 from lib import pathtools
 
 
+def build_polynomials(spc_names, spc_dct, temps_lst,
+                      pf_paths, nasa_paths, nprocs=1):
+    """ Build the nasa polynomials for several species, with at most
+        nprocs fits running at once
+
+        :returns: the strings, in the order of the species (None for a
+            fit that failed), and the names of the species that failed
+        :rtype: (list(str), list(str))
+    """
+
+    # Fit once for each NASA path, in case a species is given twice
+    args_lst, path_idxs = [], {}
+    for spc_name, temps, pf_path, nasa_path in zip(
+            spc_names, temps_lst, pf_paths, nasa_paths):
+        if nasa_path not in path_idxs:
+            path_idxs[nasa_path] = len(args_lst)
+            args_lst.append((spc_name, spc_dct, temps, pf_path, nasa_path))
+
+    poly_strs = run_parallel(build_polynomial, args_lst, nprocs=nprocs,
+                             ignore_failed=True)
+
+    poly_strs = [poly_strs[path_idxs[nasa_path]] for nasa_path in nasa_paths]
+    failed_names = [spc_name
+                    for spc_name, poly_str in zip(spc_names, poly_strs)
+                    if poly_str is None]
+    for spc_name in failed_names:
+        print('*ERROR: NASA polynomial fit failed for', spc_name)
+
+    return poly_strs, failed_names
+
+
 def build_polynomial(spc_name, spc_dct, temps,
-                     pf_path, nasa_path, starting_path):
-    """ Build a nasa polynomial
+                     pf_path, nasa_path):
+    """ Build a nasa polynomial, running ThermP and PAC99 in the nasa path
+        (without changing the working directory of the process)
     """
 
     print('Generating NASA polynomials at path: {}'.format(nasa_path))
@@ -24,13 +57,12 @@ def build_polynomial(spc_name, spc_dct, temps,
     formula_dct = automol.inchi.formula(spc_dct_i['inchi'])
     hform0 = spc_dct_i['Hfs'][0]
 
-    # Go to NASA path
+    # Build the NASA path
     if not os.path.exists(nasa_path):
         os.makedirs(nasa_path)
-    pathtools.go_to(nasa_path)
 
     # Write and run ThermP to get the Hf298K and coefficients
-    write_thermp_inp(formula, hform0, temps)
+    write_thermp_inp(formula, hform0, temps, thermp_path=nasa_path)
     pfrunner.run_thermp(pf_path, nasa_path)
     thermp_out_str = pathtools.read_file(nasa_path, 'thermp.out')
     hform298 = thermp_io.reader.hf298k(thermp_out_str)
@@ -55,15 +87,12 @@ def build_polynomial(spc_name, spc_dct, temps,
     print('\nCHEMKIN Polynomial:')
     print(full_ckin_str)
 
-    # Go back to starting path
-    pathtools.go_to(starting_path)
-
     return full_ckin_str
 
 
 def write_thermp_inp(formula, hform0, temps,
                      enthalpyt=0.0, breakt=1000.0,
-                     thermp_file_name='thermp.dat'):
+                     thermp_file_name='thermp.dat', thermp_path='.'):
     """ write the thermp input file
     """
 
@@ -76,6 +105,7 @@ def write_thermp_inp(formula, hform0, temps,
         break_temp=breakt)
 
     # Write the file
+    thermp_file_name = os.path.join(thermp_path, thermp_file_name)
     with open(thermp_file_name, 'w') as thermp_file:
         thermp_file.write(thermp_str)
 
@@ -0,0 +1,75 @@
+"""
+Tests for the running convergence of Monte Carlo (tau) partition functions
+"""
+
+import numpy
+from routines.es._routines import tau
+
+
+# Energies (kcal/mol) of the samples, relative to the reference
+TEMPS = (300., 500., 750., 1000., 1500.)
+ENES = numpy.random.RandomState(11).exponential(3.0, size=200)
+
+
+def _sigma_errs(enes, temp):
+    """ Relative error (%) of the partition function at a temperature
+        after each sample, summed one sample at a time
+    """
+    sumq = 0.
+    sum2 = 0.
+    errs = []
+    for idx, ene in enumerate(enes, start=1):
+        tmp = numpy.exp(-ene*349.7/(0.695*temp))
+        sumq = sumq + tmp
+        sum2 = sum2 + tmp**2
+        sigma = numpy.sqrt(
+            (abs(sum2/float(idx)-(sumq/float(idx))**2))/float(idx))
+        errs.append(100.*sigma*float(idx)/sumq)
+    return errs
+
+
+def test__pf_sums():
+    """ adds batches of samples to the running sums, matching the errors
+        of summing one sample at a time
+    """
+    ref_errs = numpy.array([_sigma_errs(ENES, temp) for temp in TEMPS]).T
+
+    pf_sums = tau.pf_sums_init(TEMPS)
+    nsamp = 0
+    for batch in (1, 4, 15, 30, 50, 100):
+        tau.pf_sums_add(pf_sums, list(ENES[nsamp:nsamp+batch]))
+        nsamp += batch
+        assert pf_sums['nsamp'] == nsamp
+        assert numpy.allclose(tau.pf_sums_err(pf_sums), ref_errs[nsamp-1])
+
+    # Adding no samples leaves the sums as they are
+    tau.pf_sums_add(pf_sums, [])
+    assert pf_sums['nsamp'] == len(ENES)
+    assert numpy.allclose(tau.pf_sums_err(pf_sums), ref_errs[-1])
+
+
+def test__pf_converged():
+    """ checks convergence to a target error at every temperature
+    """
+    pf_sums = tau.pf_sums_init(TEMPS)
+    assert numpy.all(numpy.isinf(tau.pf_sums_err(pf_sums)))
+    assert not tau.pf_converged(pf_sums, 100.0)
+
+    # Identical samples have no error, but are too few to be converged
+    tau.pf_sums_add(pf_sums, [1.0 for _ in range(5)])
+    assert numpy.allclose(tau.pf_sums_err(pf_sums), 0.0)
+    assert not tau.pf_converged(pf_sums, 1.0)
+    assert tau.pf_converged(pf_sums, 1.0, nsamp_min=5)
+
+    # The error at the lowest temperature is the last to converge
+    pf_sums = tau.pf_sums_init(TEMPS)
+    tau.pf_sums_add(pf_sums, list(ENES))
+    errs = tau.pf_sums_err(pf_sums)
+    assert numpy.argmax(errs) == 0
+    assert not tau.pf_converged(pf_sums, errs[0])
+    assert tau.pf_converged(pf_sums, errs[0] * 1.01)
+
+
+if __name__ == '__main__':
+    test__pf_sums()
+    test__pf_converged()
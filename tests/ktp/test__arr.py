@@ -0,0 +1,118 @@
+"""
+Tests for fitting the rate constants of a MESS rate output to
+Arrhenius expressions
+"""
+
+import os
+import numpy
+from phydat import phycon
+from routines.pf.ktp.fit import _fit as fit
+from routines.pf.ktp.fit import _arr as arr
+
+
+# Input data
+PATH = os.path.dirname(os.path.realpath(__file__))
+DATA_PATH = os.path.join(PATH, 'data')
+TEMPS = [300.0, 400.0, 500.0, 600.0, 700.0, 800.0, 900.0, 1000.0,
+         1250.0, 1500.0, 1750.0, 2000.0]
+PRESSURES = [0.1, 1.0, 10.0, 100.0, 'high']
+BIMOL_CONV_FACTOR = 6.0221e23
+
+# Parameters the rate constants of the output were made from
+W1P1_PARAMS = {
+    0.1: (1.2e8, 1.1, 30000.0),
+    1.0: (4.5e9, 0.8, 31000.0),
+    10.0: (3.1e11, 0.4, 32500.0),
+    100.0: (6.0e12, 0.1, 33000.0),
+    'high': (1.5e13, 0.0, 33500.0)
+}
+W1P2_PARAMS = (1.0e10, 0.5, 40000.0, 3.0e5, 2.0, 15000.0)
+P1P2_PARAMS = (4.2e-13 * 300.0**(-1.5) * BIMOL_CONV_FACTOR, 1.5, 2500.0)
+
+
+def _ktp_dct(rct_lab, prd_lab):
+    """ Read the k(T,P)s of a reaction, without the undefined ones, as
+        they are read for fitting
+    """
+    return fit.read_rates(
+        TEMPS, PRESSURES, 'K', 'atm', rct_lab, prd_lab, DATA_PATH, None,
+        bimol=('W' not in rct_lab))
+
+
+def _arr_ks(params, temps, t_ref=1.0):
+    """ Rate constants of a sum of Arrhenius expressions
+    """
+    temps = numpy.asarray(temps)
+    return sum(
+        params[idx] * (temps / t_ref)**params[idx+1] *
+        numpy.exp(-params[idx+2] / (phycon.RC_CAL * temps))
+        for idx in range(0, len(params), 3))
+
+
+def test__single_arr_fits():
+    """ fits the rates of several reactions at all pressures at once
+    """
+
+    ktp_dcts = [_ktp_dct('W1', 'P1'), _ktp_dct('P1', 'P2')]
+    (w1p1_fit, p1p2_fit) = arr.single_arr_fits(
+        ktp_dcts, [1.0, BIMOL_CONV_FACTOR], t_ref=1.0)
+
+    params_dct, temp_dct, success = w1p1_fit
+    assert success
+    for pressure, params in W1P1_PARAMS.items():
+        assert numpy.isclose(params_dct[pressure][0], params[0], rtol=1e-3)
+        assert numpy.isclose(params_dct[pressure][1], params[1], atol=1e-4)
+        assert numpy.isclose(params_dct[pressure][2], params[2], atol=0.1)
+        assert temp_dct[pressure] == [300.0, 2000.0]
+
+    # The undefined rate at 300 K and 0.1 atm is not fit
+    params_dct, temp_dct, success = p1p2_fit
+    assert success
+    for params in params_dct.values():
+        assert numpy.allclose(params, P1P2_PARAMS, rtol=1e-3, atol=1e-4)
+    assert temp_dct[0.1] == [400.0, 2000.0]
+    assert temp_dct[1.0] == [300.0, 2000.0]
+
+
+def test__single_arr_fits_few_ks():
+    """ fits only A to a single k(T), and only A and Ea to three k(T)s
+    """
+
+    temps = numpy.array([500.0, 1000.0, 1500.0])
+    ktp_dct = {
+        1.0: [temps[:1], _arr_ks((2.0e10, 0.0, 0.0), temps[:1])],
+        10.0: [temps, _arr_ks((2.0e10, 0.0, 12000.0), temps)]
+    }
+    [(params_dct, _, success)] = arr.single_arr_fits([ktp_dct], [1.0])
+
+    assert success
+    assert numpy.allclose(params_dct[1.0], (2.0e10, 0.0, 0.0))
+    assert numpy.allclose(params_dct[10.0], (2.0e10, 0.0, 12000.0))
+
+
+def test__double_arr_fit():
+    """ fits the rates of a reaction to a double Arrhenius expression,
+        starting from the guess made from its single Arrhenius fit
+    """
+
+    ktp_dct = _ktp_dct('W1', 'P2')
+    temps, rate_ks = ktp_dct[1.0]
+
+    [(sing_params_dct, _, _)] = arr.single_arr_fits([ktp_dct], [1.0])
+    guess = arr.make_dbl_fit_guess(sing_params_dct)[1.0]
+    params = arr.double_arr_fit(temps, rate_ks, 1.0, guess[:3], guess[3:])
+
+    assert params is not None
+    assert numpy.allclose(
+        _arr_ks(params, temps), _arr_ks(W1P2_PARAMS, temps), rtol=1e-3)
+
+    # The fit is not done from a guess with a nonpositive A
+    assert arr.double_arr_fit(
+        temps, rate_ks, 1.0, (0.0, 0.5, 40000.0), (3.0e5, 2.0, 15000.0)
+    ) is None
+
+
+if __name__ == '__main__':
+    test__single_arr_fits()
+    test__single_arr_fits_few_ks()
+    test__double_arr_fit()
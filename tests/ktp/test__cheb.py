@@ -0,0 +1,74 @@
+"""
+Tests for fitting the rate constants of a MESS rate output to
+Chebyshev expressions
+"""
+
+import os
+import numpy
+from routines.pf.ktp.fit import _fit as fit
+from routines.pf.ktp.fit import _cheb as cheb
+
+
+# Input data
+PATH = os.path.dirname(os.path.realpath(__file__))
+DATA_PATH = os.path.join(PATH, 'data')
+TEMPS = [300.0, 400.0, 500.0, 600.0, 700.0, 800.0, 900.0, 1000.0,
+         1250.0, 1500.0, 1750.0, 2000.0]
+PRESSURES = [0.1, 1.0, 10.0, 100.0, 'high']
+BIMOL_CONV_FACTOR = 6.0221e23
+
+# Chebyshev coefficients the P1->W1 rate constants were made from
+P1W1_ALPHA = numpy.array([[-11.5, 0.8], [1.2, -0.3], [-0.4, 0.1]])
+
+
+def _ktp_dct(rct_lab, prd_lab):
+    """ Read the k(T,P)s of a reaction, without the undefined ones, as
+        they are read for fitting
+    """
+    return fit.read_rates(
+        TEMPS, PRESSURES, 'K', 'atm', rct_lab, prd_lab, DATA_PATH, None,
+        bimol=('W' not in rct_lab))
+
+
+def test__fit_chebyshevs():
+    """ fits the rates of several reactions on the same T,P grid to
+        Chebyshev expressions at once
+    """
+
+    ktp_dcts = [_ktp_dct('P1', 'W1'), _ktp_dct('W1', 'P1'),
+                _ktp_dct('P1', 'P2')]
+    conv_factors = [BIMOL_CONV_FACTOR, 1.0, BIMOL_CONV_FACTOR]
+    p1w1_fit, w1p1_fit, p1p2_fit = cheb.fit_chebyshevs(
+        ktp_dcts, conv_factors, err_target=0.01)
+
+    # The lowest order that reproduces the rates is fit
+    alpha, trange, prange, temp_dct, err_dct = p1w1_fit
+    ref_alpha = P1W1_ALPHA.copy()
+    ref_alpha[0, 0] += numpy.log10(BIMOL_CONV_FACTOR)
+    assert alpha.shape == (3, 2)
+    assert numpy.allclose(alpha, ref_alpha, atol=1e-4)
+    assert trange == (300.0, 2000.0)
+    assert prange == (0.1, 100.0)
+    assert sorted(temp_dct) == sorted(err_dct) == [0.1, 1.0, 10.0, 100.0]
+    assert max(errs[1] for errs in err_dct.values()) < 0.01
+
+    # Failing the target, the order with the smallest error is fit
+    alpha, _, _, _, err_dct = w1p1_fit
+    assert alpha.shape[0] <= 6 and alpha.shape[1] <= 4
+    assert max(errs[1] for errs in err_dct.values()) > 0.01
+
+    # The rates at 0.1 atm are not on the same temperatures
+    assert p1p2_fit is None
+
+    # Each reaction is fit as it would be on its own
+    for ktp_dct, conv_factor, fit in zip(
+            ktp_dcts, conv_factors, (p1w1_fit, w1p1_fit)):
+        [sing_fit] = cheb.fit_chebyshevs(
+            [ktp_dct], [conv_factor], err_target=0.01)
+        assert numpy.allclose(sing_fit[0], fit[0])
+        for pressure, errs in fit[4].items():
+            assert numpy.allclose(sing_fit[4][pressure], errs)
+
+
+if __name__ == '__main__':
+    test__fit_chebyshevs()
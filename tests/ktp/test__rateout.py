@@ -0,0 +1,126 @@
+"""
+Tests for indexing the rate tables of a MESS rate output
+"""
+
+import os
+import tempfile
+from routines.pf.ktp.fit import _rateout as rateout
+
+
+# Input data
+PATH = os.path.dirname(os.path.realpath(__file__))
+RATE_OUT_PATH = os.path.join(PATH, 'data', 'rate.out')
+TEMPS = [300.0, 400.0, 500.0, 600.0, 700.0, 800.0, 900.0, 1000.0,
+         1250.0, 1500.0, 1750.0, 2000.0]
+PRESSURES = [0.1, 1.0, 10.0, 100.0, 'high']
+LAB_PAIRS = (('W1', 'W1'), ('W1', 'P1'), ('W1', 'P2'),
+             ('P1', 'W1'), ('P1', 'P1'), ('P1', 'P2'))
+
+
+def _line_rate_ks(out_str, rct_lab, prd_lab, pressure):
+    """ Read the rate constants of a reaction at a pressure by scanning
+        the lines of the output for its Temperature-Species rate table
+    """
+
+    lines = out_str.splitlines()
+    tsrt_idx = lines.index('Temperature-Species Rate Tables:')
+    if pressure == 'high':
+        start = next(idx for idx, line in enumerate(lines)
+                     if 'High Pressure Rate Coefficients' in line)
+    else:
+        start = next(idx for idx, line in enumerate(lines)
+                     if idx > tsrt_idx and line.startswith('Pressure =') and
+                     float(line.split()[2]) == pressure)
+
+    # Count the column of the reaction from the right of the header
+    header = lines[start+1].split()
+    col = header.index(rct_lab + '->' + prd_lab) - len(header)
+    rate_ks = []
+    for line in lines[start+2:]:
+        if not line.strip():
+            break
+        rate_ks.append(line.split()[col])
+
+    return tuple(rate_ks)
+
+
+def test__index():
+    """ indexes the rate tables of the output
+    """
+
+    with rateout.mapped(RATE_OUT_PATH) as out_mm:
+        rate_idx = rateout.index(out_mm)
+
+    assert rate_idx['temps'] == TEMPS
+    assert rate_idx['tunit'] == 'K'
+    assert rate_idx['pressures'] == PRESSURES
+    assert rate_idx['punit'] == 'atm'
+    assert set(rate_idx['tables']) == set(PRESSURES)
+    for table in rate_idx['tables'].values():
+        assert len(table['rows']) == len(TEMPS)
+
+
+def test__rate_ks():
+    """ reads the rate constants of each reaction at each pressure,
+        compared to those read line by line
+    """
+
+    with open(RATE_OUT_PATH, 'r') as out_obj:
+        out_str = out_obj.read()
+
+    with rateout.mapped(RATE_OUT_PATH) as out_mm:
+        rate_idx = rateout.index(out_mm)
+        for rct_lab, prd_lab in LAB_PAIRS:
+            for pressure in PRESSURES:
+                rate_ks = rateout.rate_ks(
+                    rate_idx, out_mm, rct_lab, prd_lab, pressure)
+                assert len(rate_ks) == len(TEMPS)
+                assert rate_ks == _line_rate_ks(
+                    out_str, rct_lab, prd_lab, pressure)
+
+        # Undefined rates are kept as the strings of the output
+        assert set(rateout.rate_ks(
+            rate_idx, out_mm, 'W1', 'W1', 1.0)) == {'***'}
+        assert rateout.rate_ks(
+            rate_idx, out_mm, 'P1', 'P2', 0.1)[0] == '***'
+
+        # Reactions and pressures not in the output
+        assert rateout.rate_ks(rate_idx, out_mm, 'W1', 'P3', 1.0) == ()
+        assert rateout.rate_ks(rate_idx, out_mm, 'W1', 'P1', 3.0) == ()
+
+
+def test__split_rows():
+    """ splits the rows of a table into columns once for all reactions
+    """
+
+    with rateout.mapped(RATE_OUT_PATH) as out_mm:
+        rate_idx = rateout.index(out_mm)
+        table = rate_idx['tables'][1.0]
+        assert table['split'] is None
+
+        rows = rateout._split_rows(table, out_mm)
+        assert rows is rateout._split_rows(table, out_mm)
+        assert [float(row[0]) for row in rows] == TEMPS
+        assert all(len(row) == 1 + len(LAB_PAIRS) for row in rows)
+
+        # The high-pressure header has two leading columns ('T, K')
+        high_table = rate_idx['tables']['high']
+        high_rows = rateout._split_rows(high_table, out_mm)
+        assert len(high_table['header']) == len(high_rows[0]) + 1
+
+
+def test__empty():
+    """ indexes an empty output
+    """
+
+    with tempfile.NamedTemporaryFile(suffix='.out') as out_obj:
+        with rateout.mapped(out_obj.name) as out_mm:
+            assert out_mm is None
+            assert rateout.index(out_mm) is None
+
+
+if __name__ == '__main__':
+    test__index()
+    test__rate_ks()
+    test__split_rows()
+    test__empty()
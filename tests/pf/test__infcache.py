@@ -0,0 +1,206 @@
+"""
+Tests for the cache of the info dictionaries of the species blocks,
+on save filesystems written for each test
+"""
+
+import os
+import tempfile
+import automol
+import autofile
+from routines.pf.models import _infcache as infcache
+
+
+# Species, models and levels
+CH4_ICH = 'InChI=1S/CH4/h1H4'
+H2O_ICH = 'InChI=1S/H2O/h1H2'
+SPC_DCT = {
+    'CH4': {'inchi': CH4_ICH, 'charge': 0, 'mult': 1}
+}
+THY_INFO = ['gaussian', 'b3lyp', '6-31g*', 'RU']
+MOD_THY_INFO = ['gaussian', 'b3lyp', '6-31g*', 'R']
+PF_MODELS = {'vib': 'harm', 'tors': 'rigid'}
+PF_LEVELS = {'harm': ('lvl_b3', THY_INFO),
+             'sym': None, 'tors': None, 'vpt2': None}
+KEY_OBJS = ('CH4', PF_MODELS, PF_LEVELS, (), (), True)
+
+# Info built for CH4, with the energy of its basis species
+INF_DCT = {'writer': 'species_block', 'ene_chnlvl': -0.0251,
+           'freqs': [1306.0, 1306.0, 1306.0, 1534.0, 1534.0,
+                     2917.0, 3019.0, 3019.0, 3019.0]}
+BASIS_ENE_DCT = {H2O_ICH: -76.4089}
+
+
+def _prefixes():
+    """ Make empty run and save prefixes, clearing the in-memory cache
+    """
+    infcache._MEM_CACHE.clear()
+    prefix = tempfile.mkdtemp()
+    return os.path.join(prefix, 'run'), os.path.join(prefix, 'save')
+
+
+def _write_conformer(save_prefix, ich, ene):
+    """ Save a conformer of a species, with its energy at the level of
+        theory; returns the path of its energy file
+    """
+
+    spc_info = [ich, 0, 1]
+    spc_save_fs = autofile.fs.species(save_prefix)
+    spc_save_fs[-1].create(spc_info)
+    thy_save_fs = autofile.fs.theory(spc_save_fs[-1].path(spc_info))
+    thy_save_fs[-1].create(MOD_THY_INFO[1:4])
+    cnf_save_fs = autofile.fs.conformer(
+        thy_save_fs[-1].path(MOD_THY_INFO[1:4]))
+
+    locs = [autofile.schema.generate_new_conformer_id()]
+    cnf_save_fs[-1].create(locs)
+    cnf_save_fs[-1].file.geometry.write(automol.inchi.geometry(ich), locs)
+    sp_save_fs = autofile.fs.single_point(cnf_save_fs[-1].path(locs))
+    sp_save_fs[-1].create(MOD_THY_INFO[1:4])
+    sp_save_fs[-1].file.energy.write(ene, MOD_THY_INFO[1:4])
+
+    return sp_save_fs[-1].file.energy.path(MOD_THY_INFO[1:4])
+
+
+def _read(run_prefix, save_prefix, key_objs=KEY_OBJS):
+    """ Read the cached info of CH4
+    """
+    return infcache.read(SPC_DCT, 'CH4', PF_MODELS, PF_LEVELS, key_objs,
+                         run_prefix, save_prefix)
+
+
+def _write(run_prefix, save_prefix, basis_ene_dct=BASIS_ENE_DCT):
+    """ Cache the info of CH4
+    """
+    infcache.write(SPC_DCT, 'CH4', PF_MODELS, PF_LEVELS, KEY_OBJS,
+                   run_prefix, save_prefix, INF_DCT, basis_ene_dct)
+
+
+def _cache_files(save_prefix):
+    """ Files of the cache directory
+    """
+    cache_path = os.path.join(save_prefix, infcache.CACHE_DIR_NAME)
+    return (sorted(os.listdir(cache_path)) if os.path.exists(cache_path)
+            else [])
+
+
+def test__read_write():
+    """ reads the info cached for a species, from memory and from disk
+    """
+
+    run_prefix, save_prefix = _prefixes()
+    _write_conformer(save_prefix, CH4_ICH, -40.5187)
+    _write_conformer(save_prefix, H2O_ICH, -76.4089)
+    assert _read(run_prefix, save_prefix) is None
+
+    _write(run_prefix, save_prefix)
+    assert len(_cache_files(save_prefix)) == 1
+    inf_dct, basis_ene_dct = _read(run_prefix, save_prefix)
+    assert inf_dct == INF_DCT
+    assert basis_ene_dct == BASIS_ENE_DCT
+
+    # The info read is a copy of that in the cache
+    inf_dct['freqs'].append(4000.0)
+    assert _read(run_prefix, save_prefix)[0] == INF_DCT
+
+    # The info is read from disk by a new process
+    infcache._MEM_CACHE.clear()
+    assert _read(run_prefix, save_prefix) == (INF_DCT, BASIS_ENE_DCT)
+
+    # Other models or levels are not the same entry
+    assert _read(run_prefix, save_prefix, key_objs=('CH4', {}, {})) is None
+
+
+def test__key():
+    """ hashes the species and models whatever the order of their items
+    """
+    rev_pf_models = dict(reversed(list(PF_MODELS.items())))
+    rev_pf_levels = dict(reversed(list(PF_LEVELS.items())))
+    key_objs = ('CH4', rev_pf_models, rev_pf_levels, (), (), True)
+    assert (infcache._key(SPC_DCT['CH4'], key_objs) ==
+            infcache._key(SPC_DCT['CH4'], KEY_OBJS))
+    assert (infcache._key(SPC_DCT['CH4'], key_objs[:-1] + (False,)) !=
+            infcache._key(SPC_DCT['CH4'], KEY_OBJS))
+
+
+def test__no_conformers():
+    """ does not cache the info of a species, or of a species with basis
+        species, that has no conformers
+    """
+
+    run_prefix, save_prefix = _prefixes()
+    _write(run_prefix, save_prefix, basis_ene_dct={})
+    assert not _cache_files(save_prefix)
+
+    _write_conformer(save_prefix, CH4_ICH, -40.5187)
+    _write(run_prefix, save_prefix)
+    assert not _cache_files(save_prefix)
+    assert _read(run_prefix, save_prefix) is None
+
+    _write(run_prefix, save_prefix, basis_ene_dct={})
+    assert _read(run_prefix, save_prefix) == (INF_DCT, {})
+
+
+def test__invalidation():
+    """ rebuilds the info when the files of the lowest conformer change,
+        or another conformer becomes the lowest
+    """
+
+    run_prefix, save_prefix = _prefixes()
+    ene_path = _write_conformer(save_prefix, CH4_ICH, -40.5187)
+    _write_conformer(save_prefix, H2O_ICH, -76.4089)
+    _write(run_prefix, save_prefix)
+
+    # A conformer higher in energy than the lowest is not read
+    _write_conformer(save_prefix, CH4_ICH, -40.5102)
+    assert _read(run_prefix, save_prefix) == (INF_DCT, BASIS_ENE_DCT)
+
+    # The energy of the lowest conformer is saved again
+    with open(ene_path, 'w') as ene_obj:
+        ene_obj.write('-40.51870000001\n')
+    stat = os.stat(ene_path)
+    os.utime(ene_path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+    assert _read(run_prefix, save_prefix) is None
+    _write(run_prefix, save_prefix)
+    assert _read(run_prefix, save_prefix) == (INF_DCT, BASIS_ENE_DCT)
+
+    # A new lowest conformer
+    _write_conformer(save_prefix, CH4_ICH, -40.5211)
+    assert _read(run_prefix, save_prefix) is None
+    _write(run_prefix, save_prefix)
+    assert _read(run_prefix, save_prefix) == (INF_DCT, BASIS_ENE_DCT)
+
+    # A new lowest conformer of the basis species
+    _write_conformer(save_prefix, H2O_ICH, -76.4102)
+    assert _read(run_prefix, save_prefix) is None
+
+
+def test__corrupt():
+    """ rebuilds the info when the cache file cannot be read
+    """
+
+    run_prefix, save_prefix = _prefixes()
+    _write_conformer(save_prefix, CH4_ICH, -40.5187)
+    _write_conformer(save_prefix, H2O_ICH, -76.4089)
+    _write(run_prefix, save_prefix)
+
+    [cache_name] = _cache_files(save_prefix)
+    cache_file = os.path.join(
+        save_prefix, infcache.CACHE_DIR_NAME, cache_name)
+    for cache_str in (b'', b'not a pickle'):
+        with open(cache_file, 'wb') as cache_obj:
+            cache_obj.write(cache_str)
+        infcache._MEM_CACHE.clear()
+        assert _read(run_prefix, save_prefix) is None
+
+    _write(run_prefix, save_prefix)
+    infcache._MEM_CACHE.clear()
+    assert _read(run_prefix, save_prefix) == (INF_DCT, BASIS_ENE_DCT)
+    assert _cache_files(save_prefix) == [cache_name]
+
+
+if __name__ == '__main__':
+    test__read_write()
+    test__key()
+    test__no_conformers()
+    test__invalidation()
+    test__corrupt()
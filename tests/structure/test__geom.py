@@ -0,0 +1,161 @@
+"""
+Tests for the batched comparisons of geometries, checked against the
+comparisons of one pair of geometries at a time
+"""
+
+import numpy
+import automol
+from lib.structure import geom
+
+
+# Butane and conformers of it along its central CCCC torsion
+BUT_ICH = 'InChI=1S/C4H10/c1-3-4-2/h3-4H2,1-2H3'
+BUT_GEO = automol.inchi.geometry(BUT_ICH)
+TORS_VALS = (numpy.pi, 1.1, -1.1, 1.12, -numpy.pi + 0.02,
+             2.*numpy.pi - 1.1, 2.0)
+ENES = (-158.1002, -158.0990, -158.0990, -158.0990, -158.1002,
+        -158.0990, -158.0975)
+
+RAND = numpy.random.RandomState(7)
+
+
+def _conformers(tors_vals):
+    """ Rotate the central torsion of butane to each of a set of values
+    """
+    zma = automol.geom.zmatrix(BUT_GEO)
+    symbs = automol.zmatrix.symbols(zma)
+    [tors_name] = [
+        name for name in automol.geom.zmatrix_torsion_coordinate_names(
+            BUT_GEO)
+        if all(symbs[idx] == 'C'
+               for idx in automol.zmatrix.coord_idxs(zma, name))]
+    return [automol.zmatrix.geometry(
+        automol.zmatrix.set_values(zma, {tors_name: val}))
+            for val in tors_vals]
+
+
+def _is_unique_tors_dist_mat_energy(geo, ene, geo_list, ene_list):
+    """ Compare a geometry with a list of geometries one pair at a time
+    """
+    unique = True
+    for geoi, enei in zip(geo_list, ene_list):
+        if abs(ene-enei) < 2.e-5:
+            if automol.geom.almost_equal_dist_matrix(geo, geoi, thresh=3e-1):
+                if geom.are_torsions_same(geo, geoi):
+                    unique = False
+    return unique
+
+
+def test__energy_mask():
+    """ compares energies
+    """
+    enes = -158.1 + RAND.uniform(-5e-5, 5e-5, size=50)
+    for ene in enes[:10]:
+        ref_mask = [abs(ene-enei) < 2.e-5 for enei in enes]
+        assert list(geom.energy_mask(ene, enes)) == ref_mask
+    assert not geom.energy_mask(-158.1, []).size
+
+
+def test__coulomb_spectrum_mask():
+    """ compares Coulomb spectra in the sense of numpy.allclose
+    """
+    spec = numpy.sort(RAND.uniform(1.0, 40.0, size=14))
+    specs = spec * (1.0 + RAND.uniform(-2e-2, 2e-2, size=(50, 14)))
+    specs[:5] = spec
+    ref_mask = [numpy.allclose(spec, speci, rtol=1e-2) for speci in specs]
+    mask = geom.coulomb_spectrum_mask(spec, specs, rtol=1e-2)
+    assert list(mask) == ref_mask
+    assert any(mask) and not all(mask)
+
+    # Spectra of geometries
+    geos = _conformers(TORS_VALS)
+    spec = automol.geom.coulomb_spectrum(geos[0])
+    specs = [automol.geom.coulomb_spectrum(geoi) for geoi in geos]
+    ref_mask = [automol.geom.almost_equal_coulomb_spectrum(
+        geos[0], geoi, rtol=1e-2) for geoi in geos]
+    assert list(geom.coulomb_spectrum_mask(spec, specs)) == ref_mask
+
+
+def test__dist_mat_mask():
+    """ compares distance matrices
+    """
+    geos = _conformers(TORS_VALS)
+    xyzs = geom.coordinate_stack(geos)
+    for geo, xyz in zip(geos, xyzs):
+        ref_mask = [automol.geom.almost_equal_dist_matrix(
+            geo, geoi, thresh=3e-1) for geoi in geos]
+        assert list(geom.dist_mat_mask(xyz, xyzs, thresh=3e-1)) == ref_mask
+
+
+def test__torsion_keys():
+    """ gets the geometry atoms of each torsion of the z-matrix, for
+        a geometry whose atoms are not in z-matrix order
+    """
+
+    # Reverse the order of the atoms of the geometry
+    symbs = automol.geom.symbols(BUT_GEO)[::-1]
+    xyzs = automol.geom.coordinates(BUT_GEO)[::-1]
+    geo = automol.geom.from_data(symbs, xyzs)
+
+    # The torsions read from the geometry atoms of the keys match those
+    # read from the z-matrix geometry with the z-matrix atoms
+    zma = automol.geom.zmatrix(geo)
+    zma_geo = automol.zmatrix.geometry(zma)
+    tors_names = automol.geom.zmatrix_torsion_coordinate_names(geo)
+    keys = geom.torsion_keys(geo)
+    assert len(keys) == len(tors_names)
+    zma_keys = [automol.zmatrix.coord_idxs(zma, name) for name in tors_names]
+    angs = geom.dihedral_angles(geom.coordinate_stack([geo]), keys)[0]
+    zma_angs = geom.dihedral_angles(
+        geom.coordinate_stack([zma_geo]), zma_keys)[0]
+    assert numpy.allclose(numpy.cos(angs), numpy.cos(zma_angs), atol=1e-4)
+    assert numpy.allclose(numpy.sin(angs), numpy.sin(zma_angs), atol=1e-4)
+    for key, zma_key in zip(keys, zma_keys):
+        assert ([automol.geom.symbols(geo)[idx] for idx in key] ==
+                [automol.zmatrix.symbols(zma)[idx] for idx in zma_key])
+
+
+def test__torsion_mask():
+    """ compares torsions, including across the 2pi wrap
+    """
+    geos = _conformers(TORS_VALS)
+    for geo in geos:
+        ref_mask = [geom.are_torsions_same(geo, geoi) for geoi in geos]
+        assert list(geom.torsion_mask(geo, geos)) == ref_mask
+
+    # Anti at pi and -pi, and gauche at -1.1 and 2pi - 1.1
+    mask = geom.torsion_mask(geos[0], geos)
+    assert mask[4] and not mask[1]
+    assert geom.torsion_mask(geos[2], geos)[5]
+
+
+def test__unique_mask():
+    """ finds the unique conformers of a list, compared to checking each
+        against the unique ones found before it
+    """
+    geos = _conformers(TORS_VALS)
+
+    ref_mask = []
+    uni_geos, uni_enes = [], []
+    for geo, ene in zip(geos, ENES):
+        unique = _is_unique_tors_dist_mat_energy(geo, ene, uni_geos, uni_enes)
+        ref_mask.append(unique)
+        if unique:
+            uni_geos.append(geo)
+            uni_enes.append(ene)
+
+    assert list(geom.unique_mask(geos, ENES)) == ref_mask
+    assert ref_mask == [True, True, True, False, False, False, True]
+    for geo, ene in zip(geos, ENES):
+        assert (geom.is_unique_tors_dist_mat_energy(
+            geo, ene, uni_geos, uni_enes, False) ==
+                _is_unique_tors_dist_mat_energy(geo, ene, uni_geos, uni_enes))
+
+
+if __name__ == '__main__':
+    test__energy_mask()
+    test__coulomb_spectrum_mask()
+    test__dist_mat_mask()
+    test__torsion_keys()
+    test__torsion_mask()
+    test__unique_mask()
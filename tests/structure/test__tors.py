@@ -0,0 +1,78 @@
+"""
+Tests for the adaptive grids of hindered-rotor scans
+"""
+
+import numpy
+from phydat import phycon
+from lib.structure import tors
+
+
+# Threefold rotor, V = V3/2 (1 - cos 3phi), on a 10 degree grid
+NPOINTS = 36
+V3 = 3.0
+REF_ENE = -158.1
+ANGS = 2.0 * numpy.pi * numpy.arange(NPOINTS) / NPOINTS
+POT = V3 / 2.0 * (1.0 - numpy.cos(3.0 * ANGS))
+
+
+def _adaptive_scan(pot):
+    """ Run the passes of an adaptive scan of a potential (kcal/mol)
+    """
+    enes = [None for _ in pot]
+    ran_idxs, pred_pot = set(), None
+    grid_idxs = tors.adapt_ini_idxs(len(pot))
+    npasses = 0
+    while grid_idxs:
+        npasses += 1
+        ran_idxs.update(grid_idxs)
+        for idx in grid_idxs:
+            enes[idx] = REF_ENE + pot[idx] / phycon.EH2KCAL
+        grid_idxs, pred_pot = tors.adapt_next_idxs(
+            enes, ran_idxs, prev_pot=pred_pot)
+    return ran_idxs, pred_pot, npasses
+
+
+def test__adapt_ini_idxs():
+    """ starts from every other point of the grid
+    """
+    assert tors.adapt_ini_idxs(NPOINTS) == tuple(range(0, NPOINTS, 2))
+    assert tors.adapt_ini_idxs(7, stride=3) == (0, 3, 6)
+
+
+def test__adapt_threefold_rotor():
+    """ converges the scan of a threefold rotor on half of the grid
+    """
+    ran_idxs, pred_pot, npasses = _adaptive_scan(POT)
+
+    assert len(ran_idxs) == NPOINTS // 2
+    assert npasses == 1
+    assert numpy.allclose(pred_pot, POT, atol=0.2)
+
+
+def test__adapt_next_idxs():
+    """ runs the points where the potential is not yet resolved
+    """
+
+    # No energies, or too few to predict from
+    enes = [None for _ in range(NPOINTS)]
+    assert tors.adapt_next_idxs(enes, set()) == ((), None)
+    enes[0] = REF_ENE
+    next_idxs, _ = tors.adapt_next_idxs(enes, {0, 2})
+    assert next_idxs == tuple(idx for idx in range(NPOINTS)
+                              if idx not in (0, 2))
+
+    # A narrow barrier on the slope of the rotor is resolved by running
+    # the points around it that the coarse grid skipped
+    pot = POT + 4.0 * numpy.exp(
+        -0.5 * ((numpy.arange(NPOINTS) - 5) / 1.5)**2)
+    ran_idxs, pred_pot, npasses = _adaptive_scan(pot)
+    assert 5 in ran_idxs
+    assert npasses > 1
+    assert len(ran_idxs) < NPOINTS
+    assert numpy.allclose(pred_pot, pot, atol=0.2)
+
+
+if __name__ == '__main__':
+    test__adapt_ini_idxs()
+    test__adapt_threefold_rotor()
+    test__adapt_next_idxs()